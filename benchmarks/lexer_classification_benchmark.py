@@ -0,0 +1,156 @@
+# Micro-benchmark of the token classification of the PyWright script tokenizer.
+# Compares the previous classification (linear searches in the keyword and macro lists) against the current one
+# (a single dictionary lookup), on a big generated script. It does not need Qt.
+#
+# Usage, from the root folder of PyWright IDE: python benchmarks/lexer_classification_benchmark.py [line count]
+
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from data.PyWrightScriptTokenizer import (PyWrightScriptTokenizer, commands, parameters, special_variables, cases,
+                                          named_parameters, logic_operators, _TOKEN_REGEX, _QUESTION_MARK_REGEX)
+
+BUILTIN_MACROS = ["builtin_macro_{}".format(i) for i in range(300)]
+GAME_MACROS = ["game_macro_{}".format(i) for i in range(150)]
+CASE_MACROS = ["case_macro_{}".format(i) for i in range(50)]
+
+
+def generate_script(line_count: int) -> bytes:
+    """Generates a script looking like a real case script: dialogue, commands with parameters, macros and comments."""
+    rng = random.Random(1234)
+    words = ["objection", "the", "witness", "is", "lying", "about", "evidence", "court", "Phoenix", "Edgeworth"]
+    lines = []
+
+    for i in range(line_count):
+        kind = rng.random()
+        if kind < 0.35:
+            lines.append('"{} {{c 900}}{}{{c}} {}."'.format(" ".join(rng.choices(words, k=6)), rng.choice(words),
+                                                            " ".join(rng.choices(words, k=4))))
+        elif kind < 0.65:
+            lines.append("{} {} {} {} {}".format(rng.choice(commands), rng.choice(words), rng.choice(parameters),
+                                                 rng.choice(named_parameters) + str(rng.randint(-50, 300)),
+                                                 rng.choice(parameters)))
+        elif kind < 0.80:
+            lines.append("{} {} {}".format(rng.choice(BUILTIN_MACROS + GAME_MACROS + CASE_MACROS),
+                                           rng.choice(words), rng.uniform(-10, 10)))
+        elif kind < 0.90:
+            lines.append("is {} == {} label_{}?".format(rng.choice(special_variables), rng.randint(0, 9), i))
+        else:
+            lines.append("# {}".format(" ".join(rng.choices(words, k=8))))
+
+    return "\n".join(lines).encode("utf-8")
+
+
+def _legacy_is_string_number(string: str) -> bool:
+    if string.startswith("-"):
+        return _legacy_is_string_number(string[1:])
+
+    return string.isnumeric() or _legacy_is_string_float(string)
+
+
+def _legacy_is_string_float(string: str) -> bool:
+    try:
+        float(string)
+        return True
+    except ValueError:
+        return False
+
+
+class LegacyClassificationTokenizer(PyWrightScriptTokenizer):
+    """The tokenizer, with the token classification the lexer used before the dictionary based one."""
+
+    def set_macros(self, builtin_macros: list[str], game_macros: list[str], case_macros: list[str]):
+        super().set_macros(builtin_macros, game_macros, case_macros)
+        self.builtin_macros = builtin_macros
+        self.game_macros = game_macros
+        self.case_macros = case_macros
+
+    def _style_token(self, token: str, offset: int, length: int, isFirstOfLine: bool = False):
+        if token.endswith("?") and len(token) > 1 and not (token.startswith("//") or token.startswith("#")):
+            question_marks = _QUESTION_MARK_REGEX.findall(token)
+
+            if len(question_marks[0]) == 1:
+                token_split = token.rsplit("?", maxsplit=1)
+                self._style_token(token_split[0], offset, len(token_split[0]))
+                self._add_run(offset + len(token_split[0]), 1, 2)
+                return
+
+        if token in commands:
+            if token in parameters and not isFirstOfLine:
+                self._add_run(offset, length, 3)
+                return
+            self._add_run(offset, length, 1)
+        elif token in logic_operators:
+            self._add_run(offset, length, 2)
+        elif token in special_variables or token in cases:
+            self._add_run(offset, length, 2)
+        elif token.startswith("$") and (token[1:] in special_variables
+                                        or token[1:] in parameters
+                                        or token[1:].isdigit()):
+            self._add_run(offset, length, 2)
+        elif token.startswith(named_parameters):
+            param_name = token.split("=", maxsplit=1)
+            param_0_len = len(param_name[0]) + 1
+            self._add_run(offset, param_0_len, 3)
+            self._style_token(param_name[1], offset + param_0_len, len(param_name[1]))
+        elif token in parameters:
+            self._add_run(offset, length, 3)
+        elif token.startswith("{") and "}" in token and ' ' in token:
+            self._style_macro_call_token(token, offset)
+        elif token == "}" or token.startswith("{") and token.endswith("}"):
+            self._add_run(offset, length, 3)
+        elif token.startswith("//") or token.startswith("#"):
+            self._add_run(offset, length, 4)
+        elif token.startswith("\"") or token.startswith('“'):
+            self._style_string_token(token, offset)
+        elif _legacy_is_string_number(token):
+            self._add_run(offset, length, 6)
+        elif token in self.builtin_macros:
+            self._add_run(offset, length, 7)
+        elif token in self.game_macros:
+            self._add_run(offset, length, 8)
+        elif token in self.case_macros:
+            self._add_run(offset, length, 8)
+        else:
+            self._add_run(offset, length, 0)
+
+
+def measure(tokenizer: PyWrightScriptTokenizer, lines: list[bytes], rounds: int = 3) -> float:
+    """Returns the best time, in seconds, taken to style every line (without any help from the line cache)."""
+    best = float("inf")
+    for _ in range(rounds):
+        start = time.perf_counter()
+        for line in lines:
+            tokenizer.tokenize_line(line)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    line_count = int(sys.argv[1]) if len(sys.argv) > 1 else 30000
+
+    script = generate_script(line_count)
+    lines = script.splitlines(keepends=True)
+    token_count = sum(len(_TOKEN_REGEX.findall(line.decode("utf-8"))) for line in lines)
+
+    print("Generated script: {} lines, {} tokens, {:.1f} KB".format(len(lines), token_count, len(script) / 1024))
+
+    results = []
+    for name, tokenizer_class in (("before (list searches)", LegacyClassificationTokenizer),
+                                  ("after (dictionary)", PyWrightScriptTokenizer)):
+        tokenizer = tokenizer_class()
+        tokenizer.set_macros(BUILTIN_MACROS, GAME_MACROS, CASE_MACROS)
+
+        elapsed = measure(tokenizer, lines)
+        results.append(elapsed)
+        print("{:<24} {:8.3f} s  {:12,.0f} tokens/s".format(name, elapsed, token_count / elapsed))
+
+    print("Speedup: {:.2f}x".format(results[0] / results[1]))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,135 @@
+# Benchmark of the way the PyWright script lexer applies its styles on the editor.
+# Compares the previous way (one setStyling() call per style run) against the current one
+# (one SCI_SETSTYLINGEX call per restyled range), on a big generated script.
+# Both are measured without any help from the line cache, and with ranges of the size Scintilla usually asks for.
+#
+# Usage, from the root folder of PyWright IDE: python benchmarks/lexer_styling_benchmark.py [line count]
+
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+from PyQt6.QtWidgets import QApplication
+from PyQt6.Qsci import QsciScintilla
+
+from data.PyWrightScriptLexer import PyWrightScriptLexer
+from lexer_classification_benchmark import generate_script, BUILTIN_MACROS, GAME_MACROS, CASE_MACROS
+
+# Size of the ranges given to styleText(), close to what Scintilla asks for while scrolling through a document
+RANGE_SIZE = 16 * 1024
+
+
+class CountingLexer(PyWrightScriptLexer):
+    """The lexer, counting the calls it makes to Scintilla to apply its styles."""
+
+    def __init__(self, parent: QsciScintilla):
+        super().__init__(parent)
+        self.calls = 0
+        self.counting = False
+
+    def setStyling(self, length: int, style: int):
+        if self.counting:
+            self.calls += 1
+        super().setStyling(length, style)
+
+    def styleText(self, start, end):
+        if self.counting and end > start:
+            self.calls += 1  # SCI_SETSTYLINGEX
+        super().styleText(start, end)
+
+
+class PerRunStylingLexer(CountingLexer):
+    """The lexer, applying its styles with one setStyling() call for each style run, like it used to."""
+
+    def styleText(self, start, end):
+        if end <= start:
+            return
+
+        text = bytes(self.parent().bytes(start, end))[:end - start]
+
+        self.startStyling(start)
+
+        position = 0
+        for offset, length, style in self._tokenizer.tokenize(text):
+            if offset > position:
+                self.setStyling(offset - position, 0)
+            self.setStyling(length, style)
+            position = offset + length
+        if position < len(text):
+            self.setStyling(len(text) - position, 0)
+
+
+def get_ranges(script: bytes) -> list[tuple[int, int]]:
+    """Splits the script into ranges of about RANGE_SIZE bytes, each one starting at the beginning of a line."""
+    ranges = []
+    start = 0
+    while start < len(script):
+        end = script.find(b"\n", start + RANGE_SIZE)
+        end = len(script) if end < 0 else end + 1
+        ranges.append((start, end))
+        start = end
+    return ranges
+
+
+def style_document(lexer: CountingLexer, ranges: list[tuple[int, int]]):
+    lexer.clear_line_cache()
+    for start, end in ranges:
+        lexer.styleText(start, end)
+
+
+def measure(lexer: CountingLexer, ranges: list[tuple[int, int]], rounds: int = 3) -> float:
+    """Returns the best time, in seconds, taken to style the whole document."""
+    best = float("inf")
+    for _ in range(rounds):
+        start = time.perf_counter()
+        style_document(lexer, ranges)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def count_calls(lexer: CountingLexer, ranges: list[tuple[int, int]]) -> int:
+    """Returns the number of calls made to Scintilla to style the whole document."""
+    lexer.calls = 0
+    lexer.counting = True
+    style_document(lexer, ranges)
+    lexer.counting = False
+    return lexer.calls
+
+
+def main():
+    line_count = int(sys.argv[1]) if len(sys.argv) > 1 else 30000
+
+    app = QApplication(sys.argv)
+
+    script = generate_script(line_count)
+    ranges = get_ranges(script)
+    size_kb = len(script) / 1024
+
+    print("Generated script: {} lines, {:.1f} KB, styled in {} ranges".format(line_count, size_kb, len(ranges)))
+
+    results = []
+    for name, lexer_class in (("before (setStyling)", PerRunStylingLexer),
+                              ("after (SCI_SETSTYLINGEX)", CountingLexer)):
+        sci = QsciScintilla()
+        lexer = lexer_class(sci)
+        lexer.set_builtin_macros(BUILTIN_MACROS)
+        lexer.set_game_macros(GAME_MACROS)
+        lexer.set_case_macros(CASE_MACROS)
+        sci.setLexer(lexer)
+        sci.setText(script.decode("utf-8"))
+
+        calls = count_calls(lexer, ranges)
+        elapsed = measure(lexer, ranges)
+        results.append(elapsed)
+        print("{:<26} {:8.3f} s  {:10,} calls  {:10.1f} calls/KB".format(name, elapsed, calls, calls / size_kb))
+
+    print("Speedup: {:.2f}x".format(results[0] / results[1]))
+
+    app.quit()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+# Benchmark of Replace All in a single file.
+# Compares the previous way (one search and one SCI_REPLACESEL per match, each search copying the whole document)
+# against the current one (every match found in one pass, and the replaced text built in Python then written
+# with a single SCI_REPLACETARGET inside one undo action),
+# on generated scripts with 1k, 10k and 100k matches.
+# The previous way takes quadratic time, so it is only measured up to LEGACY_MAX_MATCHES matches unless --all is given.
+#
+# Usage, from the root folder of PyWright IDE: python benchmarks/replace_all_benchmark.py [--all]
+
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+from PyQt6.QtWidgets import QApplication
+from PyQt6.Qsci import QsciScintilla
+
+from gui.FileEditWidget import FileEditWidget
+
+MATCH_COUNTS = (1000, 10000, 100000)
+LEGACY_MAX_MATCHES = 10000
+
+TEXT_TO_FIND = "oldname"
+TEXT_TO_REPLACE = "a_longer_new_name"
+
+
+def generate_script(match_count: int) -> str:
+    """Returns a script with the given number of matches, one every other line."""
+    lines = []
+    for i in range(match_count):
+        lines.append("char {} e=normal".format(TEXT_TO_FIND))
+        lines.append('"Line {} of the script, with no match in it"'.format(i))
+    return "\n".join(lines) + "\n"
+
+
+def legacy_replace_all(file_edit_widget: FileEditWidget, text_to_find: str, text_to_replace: str) -> int:
+    """Replace All the way it used to be done, without the message box at the end of the file."""
+    sci = file_edit_widget.sci
+    encoded_text_to_find = text_to_find.encode("utf-8")
+    encoded_text_to_replace = text_to_replace.encode("utf-8")
+    count = 0
+
+    sci.SendScintilla(QsciScintilla.SCI_SETCURRENTPOS, 0, 0)
+    while True:
+        cursor_pos = sci.SendScintilla(QsciScintilla.SCI_GETCURRENTPOS, 0, 0)
+        sci.SendScintilla(QsciScintilla.SCI_SETTARGETSTART, cursor_pos, 0)
+        sci.SendScintilla(QsciScintilla.SCI_SETTARGETEND, len(sci.text()), 0)
+        pos = sci.SendScintilla(QsciScintilla.SCI_SEARCHINTARGET, len(encoded_text_to_find), encoded_text_to_find)
+        if pos == -1:
+            return count
+
+        sci.SendScintilla(QsciScintilla.SCI_SETSEL, pos, pos + len(encoded_text_to_find))
+        sci.SendScintilla(QsciScintilla.SCI_REPLACESEL, 0, encoded_text_to_replace)
+        count += 1
+
+
+def count_undo_steps(file_edit_widget: FileEditWidget, original_text: str) -> int:
+    """Undoes until the original text is back, and returns how many steps it took."""
+    steps = 0
+    while file_edit_widget.sci.text() != original_text and file_edit_widget.sci.isUndoAvailable():
+        file_edit_widget.sci.undo()
+        steps += 1
+    return steps
+
+
+def measure(replace_all, match_count: int) -> tuple[float, int, int]:
+    """Returns the time taken to replace all the matches, the number of replacements, and the number of undo steps."""
+    file_edit_widget = FileEditWidget("")
+    script = generate_script(match_count)
+    file_edit_widget.sci.setText(script)
+    file_edit_widget.sci.SendScintilla(QsciScintilla.SCI_EMPTYUNDOBUFFER)
+
+    start = time.perf_counter()
+    count = replace_all(file_edit_widget, TEXT_TO_FIND, TEXT_TO_REPLACE)
+    elapsed = time.perf_counter() - start
+
+    return elapsed, count, count_undo_steps(file_edit_widget, script)
+
+
+def main():
+    measure_all = "--all" in sys.argv
+
+    app = QApplication(sys.argv)
+
+    for match_count in MATCH_COUNTS:
+        print("{:,} matches:".format(match_count))
+
+        elapsed, count, undo_steps = measure(FileEditWidget.replace_all_in_file, match_count)
+        print("  {:<8} {:10.3f} s  {:8,} replaced  {:8,} undo steps".format("after", elapsed, count, undo_steps))
+
+        if match_count > LEGACY_MAX_MATCHES and not measure_all:
+            print("  {:<8} skipped (use --all)".format("before"))
+            continue
+
+        legacy_elapsed, count, undo_steps = measure(legacy_replace_all, match_count)
+        print("  {:<8} {:10.3f} s  {:8,} replaced  {:8,} undo steps".format("before", legacy_elapsed, count, undo_steps))
+        print("  Speedup: {:.1f}x".format(legacy_elapsed / elapsed))
+
+    app.quit()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,5 +1,7 @@
 # Mainly for storing the key names
-from PyQt6.QtCore import QSettings, QByteArray
+from pathlib import Path
+
+from PyQt6.QtCore import QSettings, QByteArray, QStandardPaths
 
 IDE_VERSION_STRING = "1.5"
 IDE_BUILD_STRING = "25.11.30"
@@ -25,6 +27,7 @@ ENABLE_AUTOCOMPLETION_KEY = "enable_autocompletion"
 AUTOCOMPLETION_THRESHOLD_KEY = "autocompletion_suggestions_threshold"
 HIGHLIGHT_MATCHING_TEXT_KEY = "editor/highlight_matching_text"
 HIGHLIGHT_FILL_RECT_KEY = "editor/highlight_fill_rect"
+BACKGROUND_STYLING_KEY = "editor/background_styling"
 IMAGE_VIEWER_USE_CONTROL_TO_ZOOM_KEY = "image_viewer/use_control_to_zoom"
 
 # Functions
@@ -198,6 +201,14 @@ def set_highlight_fill_rect(new_value: bool):
     __program_settings.setValue(HIGHLIGHT_FILL_RECT_KEY, new_value)
 
 
+def get_background_styling() -> bool:
+    return __program_settings.value(BACKGROUND_STYLING_KEY, False, bool)
+
+
+def set_background_styling(new_value: bool):
+    __program_settings.setValue(BACKGROUND_STYLING_KEY, new_value)
+
+
 def get_image_viewer_zoom_style() -> bool:
     return __program_settings.value(IMAGE_VIEWER_USE_CONTROL_TO_ZOOM_KEY, False, bool)
 
@@ -206,6 +217,11 @@ def set_image_viewer_zoom_style(new_value: bool):
     __program_settings.setValue(IMAGE_VIEWER_USE_CONTROL_TO_ZOOM_KEY, new_value)
 
 
+def get_cache_folder_path() -> Path:
+    """Folder where the IDE keeps what it can compute again if lost (such as indexes)."""
+    return Path(QStandardPaths.writableLocation(QStandardPaths.StandardLocation.GenericCacheLocation)) / "PyWrightIDE"
+
+
 def all_keys() -> list[str]:
     return __program_settings.allKeys()
 
@@ -237,4 +253,5 @@ def reset_settings():
     __program_settings.setValue(AUTOCOMPLETION_THRESHOLD_KEY, 1)
     __program_settings.setValue(HIGHLIGHT_MATCHING_TEXT_KEY, True)
     __program_settings.setValue(HIGHLIGHT_FILL_RECT_KEY, True)
+    __program_settings.setValue(BACKGROUND_STYLING_KEY, False)
     __program_settings.setValue(IMAGE_VIEWER_USE_CONTROL_TO_ZOOM_KEY, False)
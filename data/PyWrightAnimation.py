@@ -0,0 +1,75 @@
+# Holds the information regarding one PyWright animation
+# An animation is a single image holding all its frames in a grid, described by a .txt file of the same name.
+
+from pathlib import Path
+
+# PyWright counts delays in ticks, at 60 ticks per second
+_TICKS_PER_SECOND = 60
+
+# Delay of the frames that don't have one of their own, in ticks
+_DEFAULT_FRAME_DELAY = 6
+
+
+class PyWrightAnimationInfo:
+    """Layout and timing of the frames of an animation, as read from its .txt file"""
+
+    def __init__(self):
+        self.horizontal: int = 1  # Frames per row of the image
+        self.vertical: int = 1  # Rows of frames in the image
+        self.length: int = 0  # Number of frames, 0 meaning all the cells of the grid
+        self.loops: int = 1  # 0 if the animation stops on its last frame
+        self.global_delay: int = _DEFAULT_FRAME_DELAY
+        self.frame_delays: dict[int, int] = {}  # Maps frames to their own delays, in ticks
+
+    @staticmethod
+    def get_animation_file_path(image_path: Path) -> Path:
+        """Returns the .txt file describing the animation of an image, which exists only for animations."""
+        return Path(image_path).with_suffix(".txt")
+
+    @staticmethod
+    def load_from_file(file_path: Path):
+        result = PyWrightAnimationInfo()
+
+        with open(file_path, "r") as f:
+            for line in f.readlines():
+                line_splitted = line.split()
+
+                if len(line_splitted) < 2:
+                    continue
+
+                try:
+                    match line_splitted[0]:
+                        case "horizontal":
+                            result.horizontal = max(1, int(line_splitted[1]))
+                        case "vertical":
+                            result.vertical = max(1, int(line_splitted[1]))
+                        case "length":
+                            result.length = max(0, int(line_splitted[1]))
+                        case "loops":
+                            result.loops = int(line_splitted[1])
+                        case "globaldelay":
+                            result.global_delay = max(1, int(line_splitted[1]))
+                        case "framedelay":
+                            if len(line_splitted) >= 3:
+                                result.frame_delays[int(line_splitted[1])] = max(1, int(line_splitted[2]))
+                except ValueError:
+                    # PyWright ignores the values it can't read as well
+                    continue
+
+        return result
+
+    def get_frame_count(self) -> int:
+        grid_size = self.horizontal * self.vertical
+        return grid_size if self.length <= 0 else min(self.length, grid_size)
+
+    def get_frame_size(self, image_width: int, image_height: int) -> tuple[int, int]:
+        return image_width // self.horizontal, image_height // self.vertical
+
+    def get_frame_rect(self, frame: int, image_width: int, image_height: int) -> tuple[int, int, int, int]:
+        """Returns where a frame is in the image, as (x, y, width, height). Frames go left to right, then top to bottom."""
+        frame_width, frame_height = self.get_frame_size(image_width, image_height)
+        return (frame % self.horizontal) * frame_width, (frame // self.horizontal) * frame_height, frame_width, frame_height
+
+    def get_frame_delay_ms(self, frame: int) -> int:
+        """Returns how long a frame is shown, in milliseconds."""
+        return self.frame_delays.get(frame, self.global_delay) * 1000 // _TICKS_PER_SECOND
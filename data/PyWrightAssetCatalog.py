@@ -0,0 +1,422 @@
+# Catalog of the assets (art, music and sound effects) of the PyWright installation, the open game and its cases.
+# The asset folders are scanned once in a background thread when a game is opened, then kept up to date folder by
+# folder from the notifications of the file system, so the asset browsers, the pickers and the autocompletion
+# never have to read the folders themselves.
+# Files are stored as parallel arrays of (root, folder, name, size, modification time), roots and folders being
+# indexes into small tables, which keeps tens of thousands of assets in a few megabytes.
+# The indexes of the files of each folder are kept too, so listing a folder only goes through its own files.
+
+import os
+from array import array
+from bisect import bisect_left
+from pathlib import Path
+
+from PyQt6.QtCore import QObject, QRunnable, QThreadPool, QFileSystemWatcher, pyqtSignal
+
+# Roots of the asset folders, besides the case names
+ROOT_GLOBAL = ""  # The PyWright installation
+ROOT_GAME = "/"   # The game folder
+
+# Folders of each root that are cataloged, with all their subfolders
+CATALOGED_FOLDERS = ("art", "music", "sfx")
+
+# Asset kinds
+ASSET_BACKGROUND = "bg"      # art/bg
+ASSET_FOREGROUND = "fg"      # art/fg
+ASSET_EVIDENCE = "ev"        # art/ev
+ASSET_PORTRAIT = "port"      # art/port, the character folders
+ASSET_MUSIC = "music"        # music
+ASSET_SOUND_EFFECT = "sfx"   # sfx
+
+# Folder of each kind, relative to a root
+_ASSET_KIND_FOLDERS = {
+    ASSET_BACKGROUND: "art/bg",
+    ASSET_FOREGROUND: "art/fg",
+    ASSET_EVIDENCE: "art/ev",
+    ASSET_PORTRAIT: "art/port",
+    ASSET_MUSIC: "music",
+    ASSET_SOUND_EFFECT: "sfx",
+}
+
+IMAGE_SUFFIXES = (".png", ".jpg", ".jpeg", ".gif")
+AUDIO_SUFFIXES = (".ogg", ".wav", ".mp3")
+
+
+class AssetFile:
+    """A file of the catalog, as returned by its queries."""
+
+    __slots__ = ("root", "folder", "name", "size", "mtime_ns")
+
+    def __init__(self, root: str, folder: str, name: str, size: int, mtime_ns: int):
+        self.root = root          # ROOT_GLOBAL, ROOT_GAME or a case name
+        self.folder = folder      # Relative to the root, with / separators, like "art/bg"
+        self.name = name          # With its extension
+        self.size = size
+        self.mtime_ns = mtime_ns
+
+    def __repr__(self):
+        return "AssetFile({!r}, {}/{})".format(self.root, self.folder, self.name)
+
+    @property
+    def stem(self) -> str:
+        return os.path.splitext(self.name)[0]
+
+
+def scan_asset_folder(folder_path: str) -> tuple[list[tuple[str, int, int]], list[str]]:
+    """Reads the contents of a single folder.
+    :return: The (name, size, modification time in ns) of its files, and the names of its subfolders,
+    both empty if the folder doesn't exist."""
+    files: list[tuple[str, int, int]] = []
+    subfolders: list[str] = []
+    try:
+        with os.scandir(folder_path) as entries:
+            for entry in entries:
+                try:
+                    if entry.is_dir():
+                        subfolders.append(entry.name)
+                    else:
+                        stat = entry.stat()
+                        files.append((entry.name, stat.st_size, stat.st_mtime_ns))
+                except OSError:
+                    continue
+    except OSError:
+        pass
+    return files, subfolders
+
+
+def list_game_folder_names(pywright_path: str) -> list[str]:
+    """Returns the names of the game folders of a PyWright installation, before any game is opened."""
+    files, subfolders = scan_asset_folder(os.path.join(pywright_path, "games"))
+    return sorted(subfolders)
+
+
+class PyWrightAssetCatalog:
+    """Every asset file and folder available to the scripts of a game."""
+
+    def __init__(self, pywright_path: Path, game_path: Path, case_names: list[str]):
+        self.pywright_path = Path(pywright_path)
+        self.game_path = Path(game_path)
+
+        self._root_names = [ROOT_GLOBAL, ROOT_GAME, *case_names]
+        self._root_paths = [self.pywright_path, self.game_path, *[self.game_path / case_name for case_name in case_names]]
+        self._root_ids = {root: idx for idx, root in enumerate(self._root_names)}
+
+        # Folder table: the files refer to their folder by index
+        self._folder_names: list[str] = []
+        self._folder_ids: dict[str, int] = {}
+
+        # One entry per file
+        self._file_root_ids = array("H")
+        self._file_folder_ids = array("I")
+        self._file_names: list[str] = []
+        self._file_sizes = array("q")
+        self._file_mtimes = array("q")
+        # Maps (root id, folder id) to the indexes of the files of the folder
+        self._folder_file_indexes: dict[tuple[int, int], array] = {}
+
+        # Folders that exist, including the empty ones, as (root, folder)
+        self._folders: set[tuple[str, str]] = set()
+
+        # Maps (root, asset kind) to the sorted names used in the scripts, built when first needed
+        self._asset_names: dict[tuple[str, str], list[str]] = {}
+
+    def build(self):
+        """Scans every cataloged folder. Slow, meant to be run in a background thread."""
+        for root in self._root_names:
+            self.apply_folder_scan(root, "", *scan_asset_folder(str(self.get_folder_path(root, ""))))
+
+            folders_to_scan = [folder for folder in CATALOGED_FOLDERS if (root, folder) in self._folders]
+            while len(folders_to_scan) > 0:
+                folder = folders_to_scan.pop()
+                files, subfolders = scan_asset_folder(str(self.get_folder_path(root, folder)))
+                folders_to_scan += self.apply_folder_scan(root, folder, files, subfolders)
+
+    def get_roots(self) -> list[str]:
+        return list(self._root_names)
+
+    def get_folder_path(self, root: str, folder: str) -> Path:
+        root_path = self._root_paths[self._root_ids[root]]
+        return root_path / folder if folder != "" else root_path
+
+    def get_watched_folders(self) -> dict[str, tuple[str, str]]:
+        """Returns the roots and the existing cataloged folders, by path: the folders whose changes must be applied."""
+        result = {os.path.normpath(self.get_folder_path(root, "")): (root, "") for root in self._root_names}
+        for root, folder in self._folders:
+            if folder != "":
+                result[os.path.normpath(self.get_folder_path(root, folder))] = (root, folder)
+        return result
+
+    def has_folder(self, root: str, folder: str) -> bool:
+        return (root, folder) in self._folders
+
+    def get_subfolders(self, root: str, folder: str) -> list[str]:
+        """Returns the sorted names of the subfolders of a folder."""
+        prefix = folder + "/" if folder != "" else ""
+        return sorted(subfolder[len(prefix):] for subfolder_root, subfolder in self._folders
+                      if subfolder_root == root and subfolder != folder and subfolder.startswith(prefix)
+                      and "/" not in subfolder[len(prefix):])
+
+    def get_files(self, root: str, folder: str, suffixes: tuple[str, ...] | None = None) -> list[AssetFile]:
+        """Returns the files of a folder sorted by name, only the ones with one of the given suffixes if any."""
+        root_id = self._root_ids.get(root)
+        folder_id = self._folder_ids.get(folder)
+        if root_id is None or folder_id is None:
+            return []
+
+        result = [AssetFile(root, folder, self._file_names[idx], self._file_sizes[idx], self._file_mtimes[idx])
+                  for idx in self._folder_file_indexes.get((root_id, folder_id), ())
+                  if suffixes is None or self._file_names[idx].lower().endswith(suffixes)]
+        result.sort(key=lambda asset_file: asset_file.name)
+        return result
+
+    def get_file_count(self) -> int:
+        return len(self._file_names)
+
+    def find_names(self, kind: str, prefix: str, case_name: str | None = None) -> list[str]:
+        """Returns the sorted names of the assets of a kind starting with prefix, as used in the scripts:
+        relative to the folder of the kind, with / separators and without extension.
+        :param kind: One of the ASSET_ constants.
+        :param prefix: What the names must start with.
+        :param case_name: Case of the script, whose own assets are included too."""
+        roots = [ROOT_GLOBAL, ROOT_GAME]
+        if case_name in self._root_ids:
+            roots.append(case_name)
+
+        result = set()
+        for root in roots:
+            names = self._get_asset_names(root, kind)
+            start = bisect_left(names, prefix)
+            end = bisect_left(names, prefix + "\U0010ffff", start)
+            result.update(names[start:end])
+        return sorted(result)
+
+    def _get_asset_names(self, root: str, kind: str) -> list[str]:
+        names = self._asset_names.get((root, kind))
+        if names is not None:
+            return names
+
+        kind_folder = _ASSET_KIND_FOLDERS[kind]
+        if kind == ASSET_PORTRAIT:
+            # Characters are folders holding their emotions
+            names = self.get_subfolders(root, kind_folder)
+        else:
+            suffixes = AUDIO_SUFFIXES if kind in (ASSET_MUSIC, ASSET_SOUND_EFFECT) else IMAGE_SUFFIXES
+            root_id = self._root_ids[root]
+            # Maps the folders of the kind to what the names of their files start with
+            name_prefixes = {folder_id: folder[len(kind_folder) + 1:] + "/" if folder != kind_folder else ""
+                             for folder_id, folder in enumerate(self._folder_names)
+                             if folder == kind_folder or folder.startswith(kind_folder + "/")}
+            names = sorted({name_prefix + os.path.splitext(self._file_names[idx])[0]
+                            for folder_id, name_prefix in name_prefixes.items()
+                            for idx in self._folder_file_indexes.get((root_id, folder_id), ())
+                            if self._file_names[idx].lower().endswith(suffixes)})
+
+        self._asset_names[(root, kind)] = names
+        return names
+
+    def apply_folder_scan(self, root: str, folder: str, files: list[tuple[str, int, int]], subfolders: list[str]) -> list[str]:
+        """Replaces what the catalog knows about a single folder by what scan_asset_folder() found in it.
+        :param root: Root of the folder.
+        :param folder: The folder, relative to its root, "" for the root itself (whose files aren't cataloged).
+        :return: The subfolders that weren't known yet, relative to the root, which must be scanned too."""
+        self._asset_names.clear()
+
+        if folder == "":
+            # Only the cataloged folders of a root are of interest
+            files = []
+            subfolders = [subfolder for subfolder in subfolders if subfolder in CATALOGED_FOLDERS]
+        subfolder_paths = {folder + "/" + subfolder if folder != "" else subfolder for subfolder in subfolders}
+
+        # Forget the files of the folder, and the folders that are gone with all their contents
+        removed_folders = {known_folder for known_root, known_folder in self._folders
+                           if known_root == root and self._get_parent_folder(known_folder) == folder
+                           and known_folder not in subfolder_paths and known_folder != folder}
+        self._remove_files(root, folder, removed_folders)
+        self._folders = {(known_root, known_folder) for known_root, known_folder in self._folders
+                         if known_root != root or not any(known_folder == removed or known_folder.startswith(removed + "/")
+                                                          for removed in removed_folders)}
+
+        # Then add what is there now
+        self._folders.add((root, folder))
+        root_id = self._root_ids[root]
+        folder_id = self._get_folder_id(folder)
+        file_indexes = self._folder_file_indexes.setdefault((root_id, folder_id), array("I"))
+        for name, size, mtime_ns in files:
+            file_indexes.append(len(self._file_names))
+            self._file_root_ids.append(root_id)
+            self._file_folder_ids.append(folder_id)
+            self._file_names.append(name)
+            self._file_sizes.append(size)
+            self._file_mtimes.append(mtime_ns)
+
+        new_folders = sorted(subfolder for subfolder in subfolder_paths if (root, subfolder) not in self._folders)
+        self._folders.update((root, subfolder) for subfolder in new_folders)
+        return new_folders
+
+    def remove_folder(self, root: str, folder: str):
+        """Forgets a folder that was removed, with all its contents."""
+        self._asset_names.clear()
+        self._remove_files(root, None, {folder})
+        self._folders = {(known_root, known_folder) for known_root, known_folder in self._folders
+                         if known_root != root or (known_folder != folder and not known_folder.startswith(folder + "/"))}
+
+    @staticmethod
+    def _get_parent_folder(folder: str) -> str:
+        return folder.rsplit("/", maxsplit=1)[0] if "/" in folder else ""
+
+    def _get_folder_id(self, folder: str) -> int:
+        folder_id = self._folder_ids.get(folder)
+        if folder_id is None:
+            folder_id = len(self._folder_names)
+            self._folder_names.append(folder)
+            self._folder_ids[folder] = folder_id
+        return folder_id
+
+    def _remove_files(self, root: str, folder: str | None, removed_folders: set[str]):
+        """Removes the files of a folder, and of removed folders and their subfolders."""
+        root_id = self._root_ids[root]
+        removed_folder_ids = {folder_id for folder_id, known_folder in enumerate(self._folder_names)
+                              if known_folder == folder
+                              or any(known_folder == removed or known_folder.startswith(removed + "/") for removed in removed_folders)}
+        removed_indexes = set()
+        for folder_id in removed_folder_ids:
+            removed_indexes.update(self._folder_file_indexes.pop((root_id, folder_id), ()))
+        if len(removed_indexes) == 0:
+            return
+
+        kept = [idx for idx in range(len(self._file_names)) if idx not in removed_indexes]
+
+        self._file_root_ids = array("H", (self._file_root_ids[idx] for idx in kept))
+        self._file_folder_ids = array("I", (self._file_folder_ids[idx] for idx in kept))
+        self._file_names = [self._file_names[idx] for idx in kept]
+        self._file_sizes = array("q", (self._file_sizes[idx] for idx in kept))
+        self._file_mtimes = array("q", (self._file_mtimes[idx] for idx in kept))
+
+        # The files after the removed ones moved
+        self._folder_file_indexes = {}
+        for idx in range(len(self._file_names)):
+            self._folder_file_indexes.setdefault((self._file_root_ids[idx], self._file_folder_ids[idx]),
+                                                 array("I")).append(idx)
+
+
+class _AssetCatalogSignals(QObject):
+    catalog_built = pyqtSignal(object)  # PyWrightAssetCatalog
+    folder_scanned = pyqtSignal(object, str, str, object, object)  # Catalog, root, folder, files, subfolders
+
+
+class _AssetCatalogBuildingTask(QRunnable):
+
+    def __init__(self, catalog: PyWrightAssetCatalog):
+        super().__init__()
+        self.signals = _AssetCatalogSignals()
+        self._catalog = catalog
+
+    def run(self):
+        self._catalog.build()
+        self.signals.catalog_built.emit(self._catalog)
+
+
+class _AssetFolderScanningTask(QRunnable):
+
+    def __init__(self, catalog: PyWrightAssetCatalog, root: str, folder: str):
+        super().__init__()
+        self.signals = _AssetCatalogSignals()
+        self._catalog = catalog
+        self._root = root
+        self._folder = folder
+        self._folder_path = str(catalog.get_folder_path(root, folder))
+
+    def run(self):
+        files, subfolders = scan_asset_folder(self._folder_path)
+        self.signals.folder_scanned.emit(self._catalog, self._root, self._folder, files, subfolders)
+
+
+class PyWrightAssetCatalogService(QObject):
+    """Builds the asset catalog of the open game in a background thread, then keeps it up to date
+    as the asset folders change. Use get_asset_catalog_service() to get the one shared by the whole IDE."""
+
+    # Emitted with the new catalog once it is ready
+    catalog_ready = pyqtSignal(object)
+    # Emitted with the root and the folder (relative to the root) whose files or subfolders changed
+    folder_changed = pyqtSignal(str, str)
+
+    def __init__(self, parent: QObject | None = None):
+        super().__init__(parent)
+        self.catalog: PyWrightAssetCatalog | None = None
+        self._game_path: Path | None = None
+
+        # Maps the watched folder paths to their root and folder in the catalog
+        self._watched_folders: dict[str, tuple[str, str]] = {}
+        self._file_system_watcher = QFileSystemWatcher(self)
+        self._file_system_watcher.directoryChanged.connect(self._handle_directory_changed)
+
+    def load_game(self, pywright_path: Path, game_path: Path, case_names: list[str]):
+        """Starts cataloging the assets of a game, the previous catalog being dropped."""
+        self.catalog = None
+        self._game_path = Path(game_path)
+        self._unwatch_folders()
+
+        task = _AssetCatalogBuildingTask(PyWrightAssetCatalog(pywright_path, game_path, case_names))
+        task.signals.catalog_built.connect(self._handle_catalog_built)
+        QThreadPool.globalInstance().start(task)
+
+    def _handle_catalog_built(self, catalog: PyWrightAssetCatalog):
+        # Another game may have been opened in the meantime
+        if catalog.game_path != self._game_path:
+            return
+
+        self.catalog = catalog
+        self._watched_folders = catalog.get_watched_folders()
+        self._file_system_watcher.addPaths(list(self._watched_folders.keys()))
+        self.catalog_ready.emit(catalog)
+
+    def _unwatch_folders(self):
+        if len(self._watched_folders) > 0:
+            self._file_system_watcher.removePaths(list(self._watched_folders.keys()))
+        self._watched_folders = {}
+
+    def _handle_directory_changed(self, path: str):
+        root_and_folder = self._watched_folders.get(os.path.normpath(path))
+        if self.catalog is None or root_and_folder is None:
+            return
+        self._scan_folder(*root_and_folder)
+
+    def _scan_folder(self, root: str, folder: str):
+        task = _AssetFolderScanningTask(self.catalog, root, folder)
+        task.signals.folder_scanned.connect(self._handle_folder_scanned)
+        QThreadPool.globalInstance().start(task)
+
+    def _handle_folder_scanned(self, catalog: PyWrightAssetCatalog, root: str, folder: str,
+                               files: list[tuple[str, int, int]], subfolders: list[str]):
+        if catalog is not self.catalog:
+            return
+
+        # A removed folder is forgotten with everything it contained
+        if folder != "" and not os.path.isdir(catalog.get_folder_path(root, folder)):
+            catalog.remove_folder(root, folder)
+        else:
+            for new_folder in catalog.apply_folder_scan(root, folder, files, subfolders):
+                self._scan_folder(root, new_folder)
+
+        # Watch the new folders, and stop watching the removed ones
+        watched_folders = catalog.get_watched_folders()
+        removed_paths = [path for path in self._watched_folders.keys() if path not in watched_folders]
+        added_paths = [path for path in watched_folders.keys() if path not in self._watched_folders]
+        if len(removed_paths) > 0:
+            self._file_system_watcher.removePaths(removed_paths)
+        if len(added_paths) > 0:
+            self._file_system_watcher.addPaths(added_paths)
+        self._watched_folders = watched_folders
+
+        self.folder_changed.emit(root, folder)
+
+
+_asset_catalog_service: PyWrightAssetCatalogService | None = None
+
+
+def get_asset_catalog_service() -> PyWrightAssetCatalogService:
+    """Returns the asset catalog service shared by the whole IDE, creating it the first time."""
+    global _asset_catalog_service
+    if _asset_catalog_service is None:
+        _asset_catalog_service = PyWrightAssetCatalogService()
+    return _asset_catalog_service
@@ -0,0 +1,226 @@
+# Autocompletion candidates of PyWright scripts, for each place the cursor can be in a line.
+# Candidates are kept sorted, so that the ones starting with what was typed are found with a binary search,
+# and are only rebuilt when the macros change.
+
+from bisect import bisect_left
+from pathlib import Path
+
+from data.PyWrightAssetCatalog import (PyWrightAssetCatalog, ASSET_BACKGROUND, ASSET_FOREGROUND, ASSET_EVIDENCE, ASSET_PORTRAIT,
+                                       ASSET_MUSIC, ASSET_SOUND_EFFECT)
+from data.PyWrightScriptTokenizer import commands, special_variables, named_parameters, parameters, logic_operators
+from data.PyWrightSymbolIndex import PyWrightSymbolIndex, SYMBOL_LABEL
+
+# Completion contexts
+CONTEXT_COMMAND = "command"                  # First word of a line
+CONTEXT_BRACED_MACRO = "braced_macro"        # First word of a line, starting with {
+CONTEXT_PARAMETER = "parameter"              # Any word after the first one
+CONTEXT_STRING_TOKEN = "string_token"        # { token in a text line
+CONTEXT_STRING_VARIABLE = "string_variable"  # {$ variable in a text line
+
+# Following are string tokens with pattern for autocompletion
+# Notes: {c} is reset color, {c} is also allowed to have args immediatly after the c
+# {n} is a newline
+# {$variable} introduces a variable
+# others are either special commands, or macros.
+# All commands + args + description:
+# sfx            str:sound                Play a sound effect.
+# sound          str:clicksound           Change blipping sound.
+# delay          int:multiplier           Changes the delay mutliplier per character (aka relative speed), and also does {wait manual}.
+# spd            float:speed              Change speed of dialogue. Also bypasses {_fullspeed} and {_endfullspeed}, not present in the documentation.
+# _fullspeed     (none) (automatic)       Begin instant text. Unofficially supported, internally used when returning from a macro, not present in the documentation.
+# _endfullspeed  (none) (automatic)       Restore previous speed after instant text. Unofficially supported, internally used when returning from a macro, not present in the documentation.
+# wait           str: "manual" or "auto"  Change the waiting mode to specified arguments.
+# center         (none) (preparsed)       Centers the text.
+# type           (none)                   Change blipping sound to typewriter.ogg, set delay to 2 (according to code, but 5 according to doc) and wait mode to "manual".
+# next           (none)                   Automatically goes to the next 3 lines of text.
+# e              str:emotion              Set the current character's emotion.
+# f              int:duration str:color   Flashes the screen to a specific duration & color. Both arguments are optional.
+# s              int:duration int:power   Shakes the screen. Both arguments are optional.
+# p              int:next_char            Pauses for a number of frames (game runs at 60 fps, so 1 frame is 1/60 seconds)
+# c              hex:color                Changes the color. Color can be 3 hex-digits RGB, or 6 hex-digits RRGGBB or last part of the name of a variable named "color_something", or nothing to reset the color.
+# tbon           (none)                   Forces Testimony Blink On.
+# tboff          (none)                   Forces Testimony Blink Off.
+# n              (none) (preparsed)       New line character.
+# $variable      (none)                   Value of variable.
+string_tokens = ["{sfx /%path/to/sound%}", "{sound %blipping sound%}", "{delay %delay:int%}", "{spd %speed:float%}", "{_fullspeed}", "{_endfullspeed}",
+                 "{wait manual}", "{wait auto}", "{center}", "{type}", "{next}", "{e %emotion%}", "{f %frames:int% %color%}",
+                 "{s %frames% %power%}", "{p %frame%}", "{c}", "{c %color%}", "{tbon}", "{tboff}", "{n}", "{$"]
+
+# Kinds of parameters, besides the asset kinds of PyWrightAssetCatalog
+PARAMETER_SCRIPT = "script"  # Name of a script, without .txt
+PARAMETER_LABEL = "label"    # Label of the current script
+
+# What the first parameter of these commands is
+COMMAND_SIGNATURES = {
+    "bg": ASSET_BACKGROUND,
+    "fg": ASSET_FOREGROUND,
+    "ev": ASSET_EVIDENCE,
+    "addev": ASSET_EVIDENCE,
+    "char": ASSET_PORTRAIT,
+    "mus": ASSET_MUSIC,
+    "sfx": ASSET_SOUND_EFFECT,
+    "script": PARAMETER_SCRIPT,
+    "include": PARAMETER_SCRIPT,
+    "goto": PARAMETER_LABEL,
+}
+
+# Named parameters whose value is a label, anywhere in a line
+_LABEL_NAMED_PARAMETERS = ("fail=", "label=", "jumpto=")
+
+# At most this many candidates are proposed at once, the most used ones being kept
+_MAX_COMPLETIONS = 1000
+
+
+class CompletionCandidates:
+    """Candidates of a context, sorted for prefix lookups. Each candidate has a name (the macro, variable...
+    it stands for, without its formatting) used to know how often it is used."""
+
+    __slots__ = ("_words", "_names")
+
+    def __init__(self, words_and_names: list[tuple[str, str]]):
+        words_and_names = sorted(set(words_and_names))
+        self._words = [word for word, _ in words_and_names]
+        self._names = [name for _, name in words_and_names]
+
+    def __len__(self):
+        return len(self._words)
+
+    def find(self, prefix: str) -> tuple[int, int]:
+        """Returns the [start, end) range of the candidates starting with prefix."""
+        start = bisect_left(self._words, prefix)
+        # Every candidate starting with prefix sorts before prefix followed by the highest character
+        end = bisect_left(self._words, prefix + "\U0010ffff", start)
+        return start, end
+
+    def get_word(self, idx: int) -> str:
+        return self._words[idx]
+
+    def get_name(self, idx: int) -> str:
+        return self._names[idx]
+
+
+def _format_candidates(pattern: str, names) -> list[tuple[str, str]]:
+    return [(pattern % name, name) for name in names]
+
+
+def _plain_candidates(words) -> list[tuple[str, str]]:
+    return [(word, word) for word in words]
+
+
+class PyWrightCompletionIndex:
+    """Autocompletion candidates of every context, ranked by how often they are used in the current game."""
+
+    def __init__(self):
+        self._builtin_macros: list[str] = []
+        self._game_macros: list[str] = []
+        self._case_macros: list[str] = []
+
+        # Built when first needed, and dropped whenever the macros change
+        self._candidates: dict[str, CompletionCandidates] | None = None
+
+        # Maps names (macros, variables, flags...) to the number of times they appear in the game
+        self._usage_counts: dict[str, int] = {}
+
+        # Where the names of the assets, scripts and labels come from, None until the game has been indexed
+        self._asset_catalog: PyWrightAssetCatalog | None = None
+        self._symbol_index: PyWrightSymbolIndex | None = None
+        # Script being edited, "" for a new file
+        self._file_path = ""
+
+    def set_macros(self, builtin_macros: list[str], game_macros: list[str], case_macros: list[str]):
+        self._builtin_macros = builtin_macros
+        self._game_macros = game_macros
+        self._case_macros = case_macros
+        self._candidates = None
+
+    def set_usage_counts(self, usage_counts: dict[str, int]):
+        self._usage_counts = usage_counts
+
+    def set_asset_catalog(self, asset_catalog: PyWrightAssetCatalog | None):
+        self._asset_catalog = asset_catalog
+
+    def set_symbol_index(self, symbol_index: PyWrightSymbolIndex | None):
+        self._symbol_index = symbol_index
+
+    def set_file_path(self, file_path: str):
+        self._file_path = file_path
+
+    def get_candidates(self, context: str) -> CompletionCandidates:
+        if self._candidates is None:
+            self._candidates = self._build_candidates()
+        return self._candidates[context]
+
+    def _build_candidates(self) -> dict[str, CompletionCandidates]:
+        macros = [*self._builtin_macros, *self._game_macros, *self._case_macros]
+        return {
+            CONTEXT_COMMAND: CompletionCandidates(_plain_candidates(commands) + _plain_candidates(macros)),
+            CONTEXT_BRACED_MACRO: CompletionCandidates(_format_candidates("{%s}", macros)),
+            CONTEXT_PARAMETER: CompletionCandidates(_format_candidates("$%s", special_variables)
+                                                    + _plain_candidates(named_parameters)
+                                                    + _plain_candidates(parameters)
+                                                    + _plain_candidates(logic_operators)),
+            CONTEXT_STRING_TOKEN: CompletionCandidates(_plain_candidates(string_tokens)),
+            CONTEXT_STRING_VARIABLE: CompletionCandidates(_format_candidates("{$%s}", special_variables)),
+        }
+
+    def complete(self, context: str, prefix: str) -> list[str]:
+        """Returns the candidates of a context starting with prefix, the most used ones first."""
+        candidates = self.get_candidates(context)
+        start, end = candidates.find(prefix)
+
+        if len(self._usage_counts) == 0:
+            return [candidates.get_word(idx) for idx in range(start, min(end, start + _MAX_COMPLETIONS))]
+
+        # Sorting is stable, so candidates used as often as each other stay in alphabetical order
+        ranked = sorted(range(start, end), key=lambda idx: -self._usage_counts.get(candidates.get_name(idx), 0))
+        return [candidates.get_word(idx) for idx in ranked[:_MAX_COMPLETIONS]]
+
+    def complete_parameter(self, command: str, parameter_index: int, parameter: str) -> list[str] | None:
+        """Returns the names that a parameter of a command can take, according to COMMAND_SIGNATURES.
+        Names are looked up in the indexes only, so no folder is read while typing.
+        :param command: First word of the line.
+        :param parameter_index: 1 for the first parameter of the command, 2 for the second one...
+        :param parameter: What has been typed of the parameter so far.
+        :return: The completions, the part before the last / or = being left out like Scintilla does with the typed word.
+        None if the parameter takes no particular kind of name, or if its names aren't known yet."""
+        if parameter.startswith(_LABEL_NAMED_PARAMETERS):
+            kind = PARAMETER_LABEL
+            parameter = parameter.split("=", maxsplit=1)[1]
+        elif parameter_index == 1:
+            kind = COMMAND_SIGNATURES.get(command)
+        else:
+            kind = None
+
+        if kind == PARAMETER_LABEL:
+            names = self._find_label_names(parameter)
+        elif kind == PARAMETER_SCRIPT:
+            names = self._find_script_names(parameter)
+        elif kind is not None and self._asset_catalog is not None:
+            names = self._asset_catalog.find_names(kind, parameter, self._get_case_name())
+        else:
+            names = None
+
+        if names is None:
+            return None
+
+        # Asset names may be in subfolders, Scintilla only completes what follows the last /
+        folder_length = parameter.rfind("/") + 1
+        return [name[folder_length:] for name in names[:_MAX_COMPLETIONS]]
+
+    def _get_case_name(self) -> str | None:
+        if self._file_path == "" or self._asset_catalog is None:
+            return None
+        # Scripts of a case are in a folder of the game, named after the case
+        case_path = Path(self._file_path).parent
+        return case_path.name if case_path.parent == self._asset_catalog.game_path else None
+
+    def _find_label_names(self, prefix: str) -> list[str] | None:
+        if self._symbol_index is None or self._file_path == "":
+            return None
+        labels = self._symbol_index.get_file_symbols(self._file_path)
+        return sorted({symbol.name for symbol in labels if symbol.kind == SYMBOL_LABEL and symbol.name.startswith(prefix)})
+
+    def _find_script_names(self, prefix: str) -> list[str] | None:
+        if self._symbol_index is None:
+            return None
+        return [name for name in self._symbol_index.get_script_names(self._file_path) if name.startswith(prefix)]
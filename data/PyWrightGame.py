@@ -1,12 +1,36 @@
 # Holds the information regarding one PyWright game
 # Like its name, version, cases and such
 
+import re
 from pathlib import Path
 
 from .PyWrightCase import PyWrightCase
 
 from . import PyWrightFolder
 
+# Arguments of a macro are used in its body as $1, $2...
+_MACRO_ARGUMENT_REGEX = re.compile(r"\$(\d+)")
+
+
+class MacroDefinition:
+    """Where a macro is defined, found while looking for the names of the macros."""
+
+    __slots__ = ("name", "file_path", "start_line", "end_line", "highest_argument")
+
+    def __init__(self, name: str, file_path: str, start_line: int, end_line: int, highest_argument: int):
+        self.name = name
+        self.file_path = file_path
+        self.start_line = start_line  # 0-based, the "macro" line
+        self.end_line = end_line  # 0-based, the "endmacro" line (or the last line of the file if there is none)
+        self.highest_argument = highest_argument  # Highest N of the $N used in the body, 0 if none
+
+    def __repr__(self):
+        return "MacroDefinition({} at {}:{}-{})".format(self.name, self.file_path, self.start_line + 1, self.end_line + 1)
+
+
+def get_macro_names(macro_definitions: list[MacroDefinition]) -> list[str]:
+    return [macro_definition.name for macro_definition in macro_definitions]
+
 
 class PyWrightGameInfo:
 
@@ -25,6 +49,10 @@ class PyWrightGameInfo:
         self.builtin_macros: list[str] = []
         self.game_macros: list[str] = []
         self.case_macros: dict[str, list[str]] = {} # Maps case name to list of macro names
+        # Same as above, with where each macro is defined
+        self.builtin_macro_definitions: list[MacroDefinition] = []
+        self.game_macro_definitions: list[MacroDefinition] = []
+        self.case_macro_definitions: dict[str, list[MacroDefinition]] = {}
         self.pywright_folder_path: Path = Path("")
 
         if str(self.game_path) != "":
@@ -41,7 +69,9 @@ class PyWrightGameInfo:
         return True
 
     @staticmethod
-    def load_from_folder(folder_path: Path):
+    def load_metadata_from_folder(folder_path: Path):
+        """Loads what data.txt and intro.txt say about a game, leaving its macros empty.
+        They are then parsed in the background with a PyWrightGameLoader."""
         if folder_path.parent.stem.lower() != "games":
             raise FileNotFoundError("{} is not a valid PyWright game folder".format(folder_path))
 
@@ -52,12 +82,7 @@ class PyWrightGameInfo:
 
         game_cases = PyWrightGameInfo._load_intro_txt(folder_path)
 
-        game_info = PyWrightGameInfo(game_title, game_version, game_author, game_icon_path, game_cases, folder_path)
-        game_info.parse_builtin_macros()
-        game_info.parse_game_macros()
-        game_info.parse_case_macros()
-
-        return game_info
+        return PyWrightGameInfo(game_title, game_version, game_author, game_icon_path, game_cases, folder_path)
 
     @staticmethod
     def create_new_game(pywright_folder_path: Path,
@@ -248,56 +273,47 @@ class PyWrightGameInfo:
             pass
 
     @staticmethod
-    def _parse_macros_in_folder(folder_path: Path) -> list[str]:
-        """Parses all .mcro files in a given folder path"""
-        if not (folder_path.exists() and folder_path.is_dir()):
-            raise FileNotFoundError("Selected folder doesn't exist!")
-
-        macro_files_list = folder_path.glob("*.mcro")
-
-        macros_list = []
-
-        for macro_file_name in macro_files_list:
-            macros_list += PyWrightGameInfo._parse_macros_in_file(macro_file_name)
-
-        return macros_list
-
-    @staticmethod
-    def _parse_macros_in_file(macro_file_name: str) -> list[str]:
-        """Parse all the macros in a specified file"""
+    def parse_macros_in_file(macro_file_name: str) -> list[MacroDefinition]:
+        """Parse all the macros in a specified file, reading it line by line only once"""
         macros_list = []
+        current_macro: MacroDefinition | None = None
+        line_number = -1
 
         with open(macro_file_name, "r", encoding="UTF-8") as f:
-            lines = f.readlines()
-
-            for line in lines:
+            for line_number, line in enumerate(f):
                 if line.startswith("macro "):
                     splitted_lines = line.split(maxsplit=1)
-                    macros_list.append(splitted_lines[1].strip("\n"))
-
-        return macros_list
+                    current_macro = MacroDefinition(splitted_lines[1].strip("\n"), str(macro_file_name), line_number, line_number, 0)
+                    macros_list.append(current_macro)
+                elif current_macro is None:
+                    continue
+                elif line.strip() == "endmacro":
+                    current_macro.end_line = line_number
+                    current_macro = None
+                elif "$" in line:
+                    for argument in _MACRO_ARGUMENT_REGEX.findall(line):
+                        current_macro.highest_argument = max(current_macro.highest_argument, int(argument))
 
-    def parse_builtin_macros(self):
-        self.builtin_macros = PyWrightGameInfo._parse_macros_in_folder(self.pywright_folder_path / "core" / "macros")
+        # A macro that is never closed goes until the end of the file
+        if current_macro is not None:
+            current_macro.end_line = line_number
 
-    def parse_game_macros(self):
-        self.game_macros = PyWrightGameInfo._parse_macros_in_folder(self.game_path)
+        return macros_list
 
-        # From the source code of the engine, a file named "macros.txt" in the game folder is also parsed for macros.
-        other_location: Path = self.game_path / "macros.txt"
-        if other_location.exists():
-            self.game_macros += PyWrightGameInfo._parse_macros_in_file(other_location)
+    def get_builtin_macros_folder_path(self) -> Path:
+        return self.pywright_folder_path / "core" / "macros"
 
-    def parse_case_macros(self):
-        for case_name in self.game_cases:
-            case_macros = PyWrightGameInfo._parse_macros_in_folder(self.game_path / case_name)
+    def set_builtin_macro_definitions(self, macro_definitions: list[MacroDefinition]):
+        self.builtin_macro_definitions = macro_definitions
+        self.builtin_macros = get_macro_names(macro_definitions)
 
-            # Once again from the source code of the engine, a file named "macros.txt" in the case folder is also parsed for macros.
-            other_location: Path = self.game_path / case_name / "macros.txt"
-            if other_location.exists():
-                case_macros += PyWrightGameInfo._parse_macros_in_file(other_location)
+    def set_game_macro_definitions(self, macro_definitions: list[MacroDefinition]):
+        self.game_macro_definitions = macro_definitions
+        self.game_macros = get_macro_names(macro_definitions)
 
-            self.case_macros[case_name] = case_macros
+    def set_case_macro_definitions(self, case_name: str, macro_definitions: list[MacroDefinition]):
+        self.case_macro_definitions[case_name] = macro_definitions
+        self.case_macros[case_name] = get_macro_names(macro_definitions)
 
     def get_game_name(self):
         return self.game_path.name
@@ -316,3 +332,7 @@ class PyWrightGameInfo:
         self.clear_case_list()
         self.builtin_macros.clear()
         self.game_macros.clear()
+        self.case_macros.clear()
+        self.builtin_macro_definitions.clear()
+        self.game_macro_definitions.clear()
+        self.case_macro_definitions.clear()
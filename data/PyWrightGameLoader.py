@@ -0,0 +1,122 @@
+# Loads the macros of a PyWright game in the background, once its data.txt and intro.txt have been read.
+# The built-in, game and case macros are parsed in parallel, each group being handed over as soon as it is ready,
+# so the IDE stays usable while a game with lots of macros is being opened.
+# Parsed macro files are kept in a cache shared by the games of the installation, and saved once the game is loaded.
+
+from pathlib import Path
+
+from PyQt6.QtCore import QObject, QRunnable, QThreadPool, pyqtSignal
+
+from data.PyWrightGame import PyWrightGameInfo, MacroDefinition
+from data.PyWrightMacroCache import PyWrightMacroCache
+
+# Group of macros a task parses, besides case names
+_BUILTIN_MACROS = ""
+_GAME_MACROS = "/"
+
+
+class _MacroParsingSignals(QObject):
+    finished = pyqtSignal(int, str, object)  # Load id, group of macros, list of MacroDefinition
+
+
+class _MacroParsingTask(QRunnable):
+
+    def __init__(self, load_id: int, group: str, folder_path: Path, macro_cache: PyWrightMacroCache):
+        super().__init__()
+        self.signals = _MacroParsingSignals()
+        self._load_id = load_id
+        self._group = group
+        self._folder_path = folder_path
+        self._macro_cache = macro_cache
+
+    def run(self):
+        self._macro_cache.load()
+        try:
+            # Unlike the games and cases, PyWright doesn't read a macros.txt file from core/macros
+            macros = self._macro_cache.get_folder_macros(self._folder_path, self._group != _BUILTIN_MACROS)
+        except OSError:
+            # A missing case folder shouldn't prevent the rest of the game from loading
+            macros = []
+        self.signals.finished.emit(self._load_id, self._group, macros)
+
+
+class _MacroCacheSavingTask(QRunnable):
+
+    def __init__(self, macro_cache: PyWrightMacroCache):
+        super().__init__()
+        self._macro_cache = macro_cache
+
+    def run(self):
+        try:
+            self._macro_cache.save()
+        except OSError:
+            pass
+
+
+class PyWrightGameLoader(QObject):
+    """Parses the macros of a game loaded with PyWrightGameInfo.load_metadata_from_folder() in the background,
+    and stores them in the game info as they arrive."""
+
+    # Emitted with the list of macro names, once they and their definitions are stored in the game info
+    builtin_macros_loaded = pyqtSignal(object)
+    game_macros_loaded = pyqtSignal(object)
+    # Case name and list of macro names
+    case_macros_loaded = pyqtSignal(str, object)
+    # Number of macro groups (built-in, game, and each case) loaded so far, and number of groups to load
+    progress_changed = pyqtSignal(int, int)
+
+    def __init__(self, parent: QObject | None = None):
+        super().__init__(parent)
+        self._load_id = 0
+        self._game_info: PyWrightGameInfo | None = None
+        self._groups_to_load = 0
+        self._groups_loaded = 0
+        # Macros of the installation of the last loaded game
+        self._macro_cache: PyWrightMacroCache | None = None
+
+    def load(self, game_info: PyWrightGameInfo):
+        """Starts parsing the macros of a game. Macros of a previously loading game are dropped."""
+        self._load_id += 1
+        self._game_info = game_info
+
+        if self._macro_cache is None or self._macro_cache.pywright_path != game_info.pywright_folder_path:
+            self._macro_cache = PyWrightMacroCache(game_info.pywright_folder_path,
+                                                   PyWrightMacroCache.get_default_cache_file_path(game_info.pywright_folder_path))
+
+        groups = [(_BUILTIN_MACROS, game_info.get_builtin_macros_folder_path()), (_GAME_MACROS, game_info.game_path)]
+        groups += [(case_name, game_info.game_path / case_name) for case_name in game_info.game_cases]
+
+        self._groups_to_load = len(groups)
+        self._groups_loaded = 0
+        self.progress_changed.emit(0, self._groups_to_load)
+
+        for group, folder_path in groups:
+            task = _MacroParsingTask(self._load_id, group, folder_path, self._macro_cache)
+            task.signals.finished.connect(self._handle_macros_parsed)
+            QThreadPool.globalInstance().start(task)
+
+    def cancel(self):
+        """Stops handing over the macros of the game being loaded."""
+        self._load_id += 1
+        self._game_info = None
+
+    def _handle_macros_parsed(self, load_id: int, group: str, macro_definitions: list[MacroDefinition]):
+        if load_id != self._load_id or self._game_info is None:
+            return
+
+        if group == _BUILTIN_MACROS:
+            self._game_info.set_builtin_macro_definitions(macro_definitions)
+            self.builtin_macros_loaded.emit(self._game_info.builtin_macros)
+        elif group == _GAME_MACROS:
+            self._game_info.set_game_macro_definitions(macro_definitions)
+            self.game_macros_loaded.emit(self._game_info.game_macros)
+        else:
+            self._game_info.set_case_macro_definitions(group, macro_definitions)
+            self.case_macros_loaded.emit(group, self._game_info.case_macros[group])
+
+        self._groups_loaded += 1
+        self.progress_changed.emit(self._groups_loaded, self._groups_to_load)
+
+        if self._groups_loaded >= self._groups_to_load:
+            self._game_info = None
+            QThreadPool.globalInstance().start(_MacroCacheSavingTask(self._macro_cache))
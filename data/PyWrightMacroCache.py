@@ -0,0 +1,158 @@
+# Cache of the macros defined in the .mcro and macros.txt files of a PyWright installation.
+# Files are only parsed again when their size or modification time changed, and the cache is saved to a file,
+# so opening a game again (or another game of the same installation, which shares the built-in macros)
+# only costs a stat of each macro file.
+
+import hashlib
+import json
+import os
+import threading
+from pathlib import Path
+
+from data import IDESettings
+from data.PyWrightGame import PyWrightGameInfo, MacroDefinition
+
+_CACHE_VERSION = 2
+
+_MACRO_FILE_SUFFIX = ".mcro"
+_MACROS_TXT_FILE_NAME = "macros.txt"
+
+
+class _CachedMacroFile:
+
+    __slots__ = ("mtime_ns", "size", "macros")
+
+    def __init__(self, mtime_ns: int, size: int, macros: list[MacroDefinition]):
+        self.mtime_ns = mtime_ns
+        self.size = size
+        self.macros = macros
+
+
+class PyWrightMacroCache:
+    """Macros of every macro folder of a PyWright installation parsed so far. Can be used from several threads at once."""
+
+    def __init__(self, pywright_path: Path, cache_file_path: Path | None = None):
+        self.pywright_path = Path(pywright_path)
+        self.cache_file_path = cache_file_path
+
+        # Maps folder paths to the macro files found in them, by file name
+        self._folders: dict[str, dict[str, _CachedMacroFile]] = {}
+        self._loaded = False
+        self._changed = False
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def get_default_cache_file_path(pywright_path: Path) -> Path:
+        """Returns the cache file of a PyWright installation in the cache folder of the IDE, shared by all its games."""
+        key = hashlib.sha1(str(Path(pywright_path).resolve()).encode("utf-8")).hexdigest()[:16]
+        return IDESettings.get_cache_folder_path() / "macro_cache" / "{}.json".format(key)
+
+    def load(self):
+        """Loads the cache file, if it wasn't already. Folders parsed before that are kept."""
+        with self._lock:
+            if self._loaded:
+                return
+            self._loaded = True
+
+            if self.cache_file_path is None:
+                return
+
+            try:
+                with open(self.cache_file_path, "r", encoding="utf-8") as f:
+                    cache = json.load(f)
+            except (OSError, ValueError):
+                return
+
+            if cache.get("version") != _CACHE_VERSION:
+                return
+
+            for folder_path, files in cache["folders"].items():
+                self._folders.setdefault(folder_path, {
+                    file_name: _CachedMacroFile(mtime_ns, size, [MacroDefinition(name, os.path.join(folder_path, file_name),
+                                                                                 start_line, end_line, highest_argument)
+                                                                 for name, start_line, end_line, highest_argument in macros])
+                    for file_name, (mtime_ns, size, macros) in files.items()
+                })
+
+    def save(self):
+        """Saves the cache file, if any folder changed since it was loaded."""
+        if self.cache_file_path is None:
+            return
+
+        with self._lock:
+            if not self._changed:
+                return
+            self._changed = False
+            cache = {
+                "version": _CACHE_VERSION,
+                "folders": {
+                    folder_path: {
+                        file_name: (cached_file.mtime_ns, cached_file.size,
+                                    [(macro.name, macro.start_line, macro.end_line, macro.highest_argument)
+                                     for macro in cached_file.macros])
+                        for file_name, cached_file in files.items()
+                    }
+                    for folder_path, files in self._folders.items()
+                }
+            }
+
+        # Write to a temporary file first, so that the cache is never left half-written
+        self.cache_file_path.parent.mkdir(parents=True, exist_ok=True)
+        temporary_path = self.cache_file_path.with_suffix(".tmp")
+        with open(temporary_path, "w", encoding="utf-8") as f:
+            json.dump(cache, f, separators=(",", ":"))
+        os.replace(temporary_path, self.cache_file_path)
+
+    def get_folder_macros(self, folder_path: Path, include_macros_txt: bool) -> list[MacroDefinition]:
+        """Returns the macros of the .mcro files of a folder, parsing only the files that changed since the last time.
+        :param folder_path: The folder, which must exist.
+        :param include_macros_txt: Whether the macros.txt file of the folder is read too, like PyWright does for games and cases.
+        :return: The macros, file by file in alphabetical order."""
+        folder_path = os.path.normpath(folder_path)
+        if not os.path.isdir(folder_path):
+            raise FileNotFoundError("Selected folder doesn't exist!")
+
+        with self._lock:
+            cached_files = self._folders.get(folder_path, {})
+
+        files: dict[str, _CachedMacroFile] = {}
+        changed = False
+
+        with os.scandir(folder_path) as entries:
+            macro_entries = sorted((entry for entry in entries
+                                    if entry.name.endswith(_MACRO_FILE_SUFFIX)
+                                    or (include_macros_txt and entry.name == _MACROS_TXT_FILE_NAME)),
+                                   key=lambda entry: entry.name)
+
+        for entry in macro_entries:
+            try:
+                stat = entry.stat()
+            except OSError:
+                continue
+            if not entry.is_file():
+                continue
+
+            cached_file = cached_files.get(entry.name)
+            if cached_file is None or cached_file.mtime_ns != stat.st_mtime_ns or cached_file.size != stat.st_size:
+                try:
+                    cached_file = _CachedMacroFile(stat.st_mtime_ns, stat.st_size,
+                                                   PyWrightGameInfo.parse_macros_in_file(entry.path))
+                except (OSError, UnicodeDecodeError):
+                    continue
+                changed = True
+
+            files[entry.name] = cached_file
+
+        if changed or files.keys() != cached_files.keys():
+            with self._lock:
+                self._folders[folder_path] = files
+                self._changed = True
+
+        # macros.txt comes after the .mcro files, like when PyWright reads them
+        result: list[MacroDefinition] = []
+        for file_name, cached_file in files.items():
+            if file_name != _MACROS_TXT_FILE_NAME:
+                result += cached_file.macros
+        if _MACROS_TXT_FILE_NAME in files:
+            result += files[_MACROS_TXT_FILE_NAME].macros
+        return result
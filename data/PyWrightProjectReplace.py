@@ -0,0 +1,348 @@
+# Replacement of a text in many script files at once, without opening them in the editor.
+# Files are rewritten on a thread pool, each one through a temporary file renamed over it, so that a file is never
+# left half-written. The original contents are kept in a journal, so that the whole batch can be undone in one step.
+
+import hashlib
+import os
+import re
+import shutil
+import tempfile
+from pathlib import Path
+
+from PyQt6.QtCore import QLockFile, QObject, QRunnable, QThreadPool, pyqtSignal
+
+from data import IDESettings
+from data.PyWrightProjectSearch import SearchMatch, compile_search_pattern
+
+# Number of files each task rewrites
+_FILES_PER_TASK = 16
+
+# Prefix of the folders of the journals, in the folder shared by all the running IDEs
+_JOURNAL_FOLDER_PREFIX = "replace_"
+
+# Lock file held in the folder of a journal by the IDE using it, with its process id
+_JOURNAL_LOCK_FILE_NAME = "journal.lock"
+
+
+def _new_journal_lock_file(folder_path: Path) -> QLockFile:
+    lock_file = QLockFile(str(folder_path / _JOURNAL_LOCK_FILE_NAME))
+    # Only a lock whose process isn't running anymore is stale, however long a journal is kept
+    lock_file.setStaleLockTime(0)
+    return lock_file
+
+
+def get_digest(data: bytes) -> str:
+    return hashlib.sha1(data).hexdigest()
+
+
+def write_file_atomically(file_path: str, data: bytes):
+    """Writes a file through a temporary file in the same folder, renamed over it once complete.
+    The file keeps its permissions."""
+    folder_path = os.path.dirname(file_path)
+    file_descriptor, temporary_path = tempfile.mkstemp(dir=folder_path, prefix=".", suffix=".tmp")
+    try:
+        with os.fdopen(file_descriptor, "wb") as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        if os.path.exists(file_path):
+            shutil.copymode(file_path, temporary_path)
+        os.replace(temporary_path, file_path)
+    except BaseException:
+        try:
+            os.remove(temporary_path)
+        except OSError:
+            pass
+        raise
+
+
+class ReplaceJournalEntry:
+    """A file changed by a project-wide replace, and where its original contents are kept."""
+
+    __slots__ = ("file_path", "backup_path", "replaced_digest", "replacement_count")
+
+    def __init__(self, file_path: str, backup_path: str, replaced_digest: str, replacement_count: int):
+        self.file_path = file_path
+        self.backup_path = backup_path
+        # Digest of the contents right after the replace, to know if the file was changed since
+        self.replaced_digest = replaced_digest
+        self.replacement_count = replacement_count
+
+    def read_backup(self) -> bytes:
+        with open(self.backup_path, "rb") as f:
+            return f.read()
+
+
+class ReplaceJournal:
+    """Everything needed to undo a project-wide replace. The original contents of the files are kept on disk,
+    in a folder of their own, so that the backups of the previous replace are still there if this one fails.
+    Call discard() once the journal isn't needed anymore."""
+
+    def __init__(self, text_to_find: str, text_to_replace: str, parent_folder_path: Path | None = None):
+        self.text_to_find = text_to_find
+        self.text_to_replace = text_to_replace
+        if parent_folder_path is None:
+            parent_folder_path = self.get_default_folder_path()
+        self.entries: list[ReplaceJournalEntry] = []
+        # Files that couldn't be read or written
+        self.failed_file_paths: list[str] = []
+        # Files that no longer had the matches shown by the preview, left as they are
+        self.changed_file_paths: list[str] = []
+
+        Path(parent_folder_path).mkdir(parents=True, exist_ok=True)
+        self.folder_path = Path(tempfile.mkdtemp(dir=parent_folder_path, prefix=_JOURNAL_FOLDER_PREFIX))
+        # Tells the other running IDEs that this folder is still in use
+        self._lock_file = _new_journal_lock_file(self.folder_path)
+        self._lock_file.tryLock(0)
+        self._backup_count = 0
+
+    @staticmethod
+    def get_default_folder_path() -> Path:
+        return IDESettings.get_cache_folder_path() / "replace_journal"
+
+    @staticmethod
+    def delete_leftover_folders(parent_folder_path: Path | None = None):
+        """Deletes the backups of the journals left by IDEs that aren't running anymore, which can't be undone.
+        The journals of the other running IDEs are left alone."""
+        if parent_folder_path is None:
+            parent_folder_path = ReplaceJournal.get_default_folder_path()
+
+        for folder_path in Path(parent_folder_path).glob(_JOURNAL_FOLDER_PREFIX + "*"):
+            if not folder_path.is_dir():
+                continue
+
+            # Succeeds if there is no lock, or if the IDE holding it isn't running anymore
+            lock_file = _new_journal_lock_file(folder_path)
+            if not lock_file.tryLock(0):
+                continue
+            lock_file.unlock()
+            shutil.rmtree(folder_path, ignore_errors=True)
+
+    def discard(self):
+        """Deletes the backups of the journal, after which it can't be undone anymore."""
+        self._lock_file.unlock()
+        shutil.rmtree(self.folder_path, ignore_errors=True)
+
+    def get_replacement_count(self) -> int:
+        return sum(entry.replacement_count for entry in self.entries)
+
+    def new_backup_path(self) -> str:
+        """Returns a new file path in the journal folder. Only called from the main thread."""
+        self._backup_count += 1
+        return str(self.folder_path / "{}.bak".format(self._backup_count))
+
+    def add_entry(self, file_path: str, original_data: bytes, replaced_data: bytes,
+                  replacement_count: int) -> ReplaceJournalEntry:
+        """Keeps the original contents of a file that was changed outside of this module, like an open tab."""
+        backup_path = self.new_backup_path()
+        with open(backup_path, "wb") as f:
+            f.write(original_data)
+        entry = ReplaceJournalEntry(file_path, backup_path, get_digest(replaced_data), replacement_count)
+        self.entries.append(entry)
+        return entry
+
+
+class FileChangedError(Exception):
+    """Raised when a file no longer has the matches the preview of a replace showed."""
+    pass
+
+
+def replace_in_file(file_path: str, pattern: re.Pattern[bytes], text_to_replace: bytes, backup_path: str,
+                    expected_positions: list[int] | None = None) -> ReplaceJournalEntry | None:
+    """Replaces every match of a text in a file, keeping its original contents in backup_path first.
+    :param pattern: Pattern of the text to replace, made by compile_search_pattern() so that the same matches
+    as the project search are replaced.
+    :param expected_positions: Positions of the matches when the file was searched, in bytes. If the file
+    doesn't have these matches anymore, it was changed since, and FileChangedError is raised without writing it.
+    :return: The journal entry of the file, or None if there was nothing to replace."""
+    if pattern.pattern == b"":
+        return None
+
+    with open(file_path, "rb") as f:
+        original_data = f.read()
+
+    if expected_positions is not None and \
+            [match.start() for match in pattern.finditer(original_data)] != expected_positions:
+        raise FileChangedError(file_path)
+
+    # Through a function, so that the replacement text is written as it is, backslashes included
+    replaced_data, replacement_count = pattern.subn(lambda _: text_to_replace, original_data)
+    if replacement_count == 0:
+        return None
+
+    with open(backup_path, "wb") as f:
+        f.write(original_data)
+    write_file_atomically(file_path, replaced_data)
+
+    return ReplaceJournalEntry(file_path, backup_path, get_digest(replaced_data), replacement_count)
+
+
+def restore_file(entry: ReplaceJournalEntry) -> bool:
+    """Puts back the original contents of a file, unless it was changed since the replace.
+    :return: True if the file was restored."""
+    with open(entry.file_path, "rb") as f:
+        if get_digest(f.read()) != entry.replaced_digest:
+            return False
+
+    write_file_atomically(entry.file_path, entry.read_backup())
+    return True
+
+
+class _ProjectReplaceSignals(QObject):
+    # Journal entries (or file paths for undo) that succeeded, and file paths that failed
+    finished = pyqtSignal(object, object)
+    # Journal entries that succeeded, file paths that failed, and file paths that were changed since the preview
+    files_replaced = pyqtSignal(object, object, object)
+
+
+class _ReplaceTask(QRunnable):
+
+    def __init__(self, jobs: list[tuple[str, str, list[int]]], pattern: re.Pattern[bytes], text_to_replace: bytes):
+        super().__init__()
+        self.signals = _ProjectReplaceSignals()
+        self._jobs = jobs
+        self._pattern = pattern
+        self._text_to_replace = text_to_replace
+
+    def run(self):
+        entries = []
+        failed_file_paths = []
+        changed_file_paths = []
+        for file_path, backup_path, expected_positions in self._jobs:
+            try:
+                entry = replace_in_file(file_path, self._pattern, self._text_to_replace, backup_path,
+                                        expected_positions)
+            except FileChangedError:
+                changed_file_paths.append(file_path)
+                continue
+            except OSError:
+                failed_file_paths.append(file_path)
+                continue
+            if entry is not None:
+                entries.append(entry)
+        self.signals.files_replaced.emit(entries, failed_file_paths, changed_file_paths)
+
+
+class _UndoTask(QRunnable):
+
+    def __init__(self, entries: list[ReplaceJournalEntry]):
+        super().__init__()
+        self.signals = _ProjectReplaceSignals()
+        self._entries = entries
+
+    def run(self):
+        restored_file_paths = []
+        failed_file_paths = []
+        for entry in self._entries:
+            try:
+                restored = restore_file(entry)
+            except OSError:
+                restored = False
+            if restored:
+                restored_file_paths.append(entry.file_path)
+            else:
+                failed_file_paths.append(entry.file_path)
+        self.signals.finished.emit(restored_file_paths, failed_file_paths)
+
+
+class PyWrightProjectReplacer(QObject):
+    """Replaces a text in many files, or undoes it, on its own thread pool."""
+
+    # Number of files done so far, and number of files to do
+    progress_changed = pyqtSignal(int, int)
+    # Emitted with the ReplaceJournal once every file was rewritten
+    replace_finished = pyqtSignal(object)
+    # Emitted once an undo is over, with the restored file paths,
+    # and the ones that were changed since the replace (or couldn't be written) and were left as they are
+    undo_finished = pyqtSignal(object, object)
+
+    def __init__(self, parent: QObject | None = None):
+        super().__init__(parent)
+        self._thread_pool = QThreadPool(self)
+
+        self._journal: ReplaceJournal | None = None
+        self._files_to_do = 0
+        self._files_done = 0
+        self._restored_file_paths: list[str] = []
+        self._failed_file_paths: list[str] = []
+
+    def is_busy(self) -> bool:
+        return self._journal is not None
+
+    def replace(self, journal: ReplaceJournal, matches_by_file: dict[str, list[SearchMatch]]):
+        """Replaces the text of the journal in the given files, adding them to the journal.
+        Files that don't have the given matches anymore are left as they are.
+        :param journal: Journal of the replace, possibly holding files that were changed in the editor already.
+        :param matches_by_file: Matches shown by the preview, for each file to rewrite on disk."""
+        self._start(journal, len(matches_by_file))
+        if self._files_to_do == 0:
+            self._finish_replace()
+            return
+
+        pattern = compile_search_pattern(journal.text_to_find)
+        text_to_replace = journal.text_to_replace.encode("utf-8")
+        jobs = [(file_path, journal.new_backup_path(), [match.position for match in matches])
+                for file_path, matches in matches_by_file.items()]
+
+        for start in range(0, len(jobs), _FILES_PER_TASK):
+            task = _ReplaceTask(jobs[start:start + _FILES_PER_TASK], pattern, text_to_replace)
+            task.signals.files_replaced.connect(self._handle_replace_task_finished)
+            self._thread_pool.start(task)
+
+    def undo(self, journal: ReplaceJournal, entries: list[ReplaceJournalEntry]):
+        """Restores the original contents of the given files of a journal.
+        :param journal: Journal of the replace to undo.
+        :param entries: Entries of the files to restore on disk."""
+        self._start(journal, len(entries))
+        if self._files_to_do == 0:
+            self._finish_undo()
+            return
+
+        for start in range(0, len(entries), _FILES_PER_TASK):
+            task = _UndoTask(entries[start:start + _FILES_PER_TASK])
+            task.signals.finished.connect(self._handle_undo_task_finished)
+            self._thread_pool.start(task)
+
+    def _start(self, journal: ReplaceJournal, files_to_do: int):
+        if self.is_busy():
+            raise RuntimeError("A project-wide replace or undo is already running!")
+
+        self._journal = journal
+        self._files_to_do = files_to_do
+        self._files_done = 0
+        self._restored_file_paths = []
+        self._failed_file_paths = []
+
+    def _handle_replace_task_finished(self, entries: list[ReplaceJournalEntry], failed_file_paths: list[str],
+                                      changed_file_paths: list[str]):
+        self._journal.entries.extend(entries)
+        self._journal.failed_file_paths.extend(failed_file_paths)
+        self._journal.changed_file_paths.extend(changed_file_paths)
+        # Tasks all get _FILES_PER_TASK files, except the last one
+        self._files_done = min(self._files_done + _FILES_PER_TASK, self._files_to_do)
+
+        if self._files_done < self._files_to_do:
+            self.progress_changed.emit(self._files_done, self._files_to_do)
+            return
+        self._finish_replace()
+
+    def _finish_replace(self):
+        journal = self._journal
+        self._journal = None
+        self.progress_changed.emit(self._files_to_do, self._files_to_do)
+        self.replace_finished.emit(journal)
+
+    def _handle_undo_task_finished(self, restored_file_paths: list[str], failed_file_paths: list[str]):
+        self._restored_file_paths.extend(restored_file_paths)
+        self._failed_file_paths.extend(failed_file_paths)
+        self._files_done += len(restored_file_paths) + len(failed_file_paths)
+
+        if self._files_done < self._files_to_do:
+            self.progress_changed.emit(self._files_done, self._files_to_do)
+            return
+        self._finish_undo()
+
+    def _finish_undo(self):
+        self._journal = None
+        self.progress_changed.emit(self._files_to_do, self._files_to_do)
+        self.undo_finished.emit(self._restored_file_paths, self._failed_file_paths)
@@ -0,0 +1,244 @@
+# Search of a text in every script of a PyWright game, run on a thread pool.
+# Matches are streamed back as soon as they are found, and a search can be cancelled at any time.
+
+import mmap
+import os
+import re
+import threading
+from pathlib import Path
+
+from PyQt6.QtCore import QObject, QRunnable, QThreadPool, pyqtSignal
+
+from data.PyWrightSymbolIndex import list_script_files_in_folder
+
+# Files at least this big are mapped in memory instead of being read all at once
+_MMAP_MIN_FILE_SIZE = 1024 * 1024
+
+# Number of files each task searches, so that matches come back regularly without a signal for every file
+_FILES_PER_TASK = 32
+
+# Line previews are cut after this many characters
+_PREVIEW_MAX_LENGTH = 200
+
+
+class SearchMatch:
+    """A match of the searched text in a file."""
+
+    __slots__ = ("file_path", "position", "length", "line", "column", "preview")
+
+    def __init__(self, file_path: str, position: int, length: int, line: int, column: int, preview: str):
+        self.file_path = file_path
+        self.position = position  # In bytes, from the start of the file
+        self.length = length  # In bytes
+        self.line = line  # 0-based
+        self.column = column  # 0-based, in characters
+        self.preview = preview
+
+    def __repr__(self):
+        return "SearchMatch({}:{}:{})".format(self.file_path, self.line + 1, self.column + 1)
+
+
+def compile_search_pattern(text_to_find: str) -> re.Pattern[bytes]:
+    """Returns a pattern matching a text in UTF-8 encoded contents, case-insensitive like the search of the editor.
+    Each character matches itself, its lowercase and its uppercase, so non-ASCII letters are matched too."""
+    parts = []
+    for character in text_to_find:
+        variants = {character}
+        for variant in (character.lower(), character.upper(), character.casefold()):
+            # Variants of more than one character, like the uppercase of ß, aren't matched by the editor either
+            if len(variant) == 1:
+                variants.add(variant)
+
+        escaped_variants = sorted(re.escape(variant.encode("utf-8")) for variant in variants)
+        if len(escaped_variants) == 1:
+            parts.append(escaped_variants[0])
+        else:
+            parts.append(b"(?:" + b"|".join(escaped_variants) + b")")
+    return re.compile(b"".join(parts))
+
+
+def search_file(file_path: str, pattern: re.Pattern[bytes]) -> list[SearchMatch]:
+    """Returns every match of a text in a file, or an empty list if the file couldn't be read.
+    :param file_path: File to search in.
+    :param pattern: Pattern of the text to look for, made by compile_search_pattern()."""
+    try:
+        with open(file_path, "rb") as f:
+            size = os.fstat(f.fileno()).st_size
+            if size == 0:
+                return []
+            if size < _MMAP_MIN_FILE_SIZE:
+                return find_matches(f.read(), pattern, file_path)
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+                return find_matches(data, pattern, file_path)
+    except (OSError, ValueError):
+        return []
+
+
+def find_matches(data: bytes | mmap.mmap, pattern: re.Pattern[bytes], file_path: str) -> list[SearchMatch]:
+    """Returns every non-overlapping match of a pattern in the contents of a file, from top to bottom."""
+    if pattern.pattern == b"":
+        return []
+    return make_matches(data, [match.span() for match in pattern.finditer(data)], file_path)
+
+
+def make_matches(data: bytes | mmap.mmap, match_ranges: list[tuple[int, int]], file_path: str) -> list[SearchMatch]:
+    """Returns the matches at known places of the contents of a file, with their lines, columns and previews.
+    :param match_ranges: Start and end of each match, in bytes, from top to bottom."""
+    matches = []
+
+    line = 0
+    line_start = 0
+    counted_until = 0  # Newlines before this position are counted in line
+
+    for pos, end in match_ranges:
+        if pos >= counted_until:
+            newlines = data[counted_until:pos].count(b"\n")
+            if newlines > 0:
+                line += newlines
+                line_start = data.rfind(b"\n", counted_until, pos) + 1
+            counted_until = pos
+
+        line_end = data.find(b"\n", pos)
+        if line_end == -1:
+            line_end = len(data)
+
+        line_bytes = data[line_start:line_end]
+        column = len(line_bytes[:pos - line_start].decode("utf-8", errors="replace"))
+        preview = line_bytes.decode("utf-8", errors="replace").strip()[:_PREVIEW_MAX_LENGTH]
+        matches.append(SearchMatch(file_path, pos, end - pos, line, column, preview))
+
+    return matches
+
+
+class _ProjectSearchSignals(QObject):
+    files_listed = pyqtSignal(int, object)  # Search id, list of file paths
+    files_searched = pyqtSignal(int, object, int)  # Search id, list of matches, number of files searched
+
+
+class _FileListingTask(QRunnable):
+
+    def __init__(self, search_id: int, folders: list[tuple[Path, bool]], cancel_event: threading.Event):
+        super().__init__()
+        self.signals = _ProjectSearchSignals()
+        self._search_id = search_id
+        self._folders = folders
+        self._cancel_event = cancel_event
+
+    def run(self):
+        file_paths: list[str] = []
+        for folder_path, recursive in self._folders:
+            if self._cancel_event.is_set():
+                return
+            list_script_files_in_folder(str(folder_path), recursive, file_paths)
+        self.signals.files_listed.emit(self._search_id, file_paths)
+
+
+class _FileSearchTask(QRunnable):
+
+    def __init__(self, search_id: int, file_paths: list[str], pattern: re.Pattern[bytes],
+                 cancel_event: threading.Event):
+        super().__init__()
+        self.signals = _ProjectSearchSignals()
+        self._search_id = search_id
+        self._file_paths = file_paths
+        self._pattern = pattern
+        self._cancel_event = cancel_event
+
+    def run(self):
+        matches = []
+        for file_path in self._file_paths:
+            if self._cancel_event.is_set():
+                return
+            matches.extend(search_file(file_path, self._pattern))
+        self.signals.files_searched.emit(self._search_id, matches, len(self._file_paths))
+
+
+class PyWrightProjectSearcher(QObject):
+    """Searches a text in all the .txt and .mcro files of a game, on its own thread pool.
+    Only one search runs at a time, starting a new one cancels the previous one."""
+
+    # Emitted with the number of files to search, once they are listed
+    search_started = pyqtSignal(int)
+    # Emitted with a list of SearchMatch, as they are found
+    matches_found = pyqtSignal(object)
+    # Number of files searched so far, and number of files to search
+    progress_changed = pyqtSignal(int, int)
+    # Emitted once the search is over, with whether it was cancelled
+    search_finished = pyqtSignal(bool)
+
+    def __init__(self, parent: QObject | None = None):
+        super().__init__(parent)
+        self._thread_pool = QThreadPool(self)
+
+        self._search_id = 0
+        self._cancel_event = threading.Event()
+        self._pattern = compile_search_pattern("")
+        self._searching = False
+        self._files_to_search = 0
+        self._files_searched = 0
+
+    def is_searching(self) -> bool:
+        return self._searching
+
+    def search(self, text_to_find: str, game_path: Path, builtin_macros_path: Path | None = None):
+        """Starts searching a text in every script of a game.
+        :param text_to_find: Text to look for, case-insensitive like the search of the editor.
+        :param game_path: Folder of the game, searched with its subfolders except the asset ones.
+        :param builtin_macros_path: The core/macros folder of the PyWright installation, if it should be searched too."""
+        self.cancel()
+
+        self._search_id += 1
+        self._cancel_event = threading.Event()
+        self._pattern = compile_search_pattern(text_to_find)
+        self._searching = True
+        self._files_to_search = 0
+        self._files_searched = 0
+
+        folders = [(Path(game_path), True)]
+        if builtin_macros_path is not None:
+            folders.append((Path(builtin_macros_path), False))
+
+        task = _FileListingTask(self._search_id, folders, self._cancel_event)
+        task.signals.files_listed.connect(self._handle_files_listed)
+        self._thread_pool.start(task)
+
+    def cancel(self):
+        """Stops the current search, if any. Matches found after this are dropped."""
+        if not self._searching:
+            return
+
+        self._cancel_event.set()
+        self._thread_pool.clear()
+        self._searching = False
+        self.search_finished.emit(True)
+
+    def _handle_files_listed(self, search_id: int, file_paths: list[str]):
+        if search_id != self._search_id or not self._searching:
+            return
+
+        self._files_to_search = len(file_paths)
+        self.search_started.emit(self._files_to_search)
+
+        if self._files_to_search == 0:
+            self._searching = False
+            self.search_finished.emit(False)
+            return
+
+        for start in range(0, len(file_paths), _FILES_PER_TASK):
+            task = _FileSearchTask(search_id, file_paths[start:start + _FILES_PER_TASK],
+                                   self._pattern, self._cancel_event)
+            task.signals.files_searched.connect(self._handle_files_searched)
+            self._thread_pool.start(task)
+
+    def _handle_files_searched(self, search_id: int, matches: list[SearchMatch], files_searched: int):
+        if search_id != self._search_id or not self._searching:
+            return
+
+        self._files_searched += files_searched
+        if len(matches) > 0:
+            self.matches_found.emit(matches)
+        self.progress_changed.emit(self._files_searched, self._files_to_search)
+
+        if self._files_searched >= self._files_to_search:
+            self._searching = False
+            self.search_finished.emit(False)
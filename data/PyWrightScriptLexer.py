@@ -1,173 +1,26 @@
 # A custom lexer for PyWright scripts, mainly for syntax highlighting
 import re
 
+from PyQt6.QtCore import QTimer, pyqtSignal
 from PyQt6.QtGui import QColor, QFont
 
 from PyQt6.Qsci import QsciLexerCustom, QsciScintilla, QsciAPIs
 
 from data import IDESettings, EditorThemes
+# The keyword tables live with the tokenizer, they are imported here for the autocompletion (and kept importable from this module)
+from data.PyWrightScriptTokenizer import (PyWrightScriptTokenizer, LINE_START_STATE,
+                                          commands, special_variables, cases, named_parameters, parameters, logic_operators)
+# Same for the string tokens, which live with the autocompletion candidates
+from data.PyWrightCompletionIndex import (PyWrightCompletionIndex, string_tokens, CONTEXT_COMMAND, CONTEXT_BRACED_MACRO,
+                                          CONTEXT_PARAMETER, CONTEXT_STRING_TOKEN, CONTEXT_STRING_VARIABLE)
+from data.PyWrightAssetCatalog import PyWrightAssetCatalog
+from data.PyWrightSymbolIndex import PyWrightSymbolIndex
 
-commands = [
-    # In the written order in doc.txt (with some additions):
-    # "To add various objects"
-    "emo",
-    "gui", "Back", "Button", "Wait", "Input",
-    "menu",
-    "list", "li", "showlist", "forgetlist", "forgetlistitem",
-    "present",
-    "examine", "region",
-
-    # "Various control commands"
-    "print", "include", "nt", "goto", "label", "penalty", "pause", "timer", "waitenter",
-    "mus", "sfx", "movie",
-    "exit", "endscript", "casemenu", "script", "top",
-    "cross", "endcross", "statement", "resume", "cross_restart", "clearcross",
-    "next_statement", "prev_statement",
-
-    # "Variables and flags to keep track of what happens"
-    "setflag", "delflag", "flag", "noflag", "set",
-    "setvar", "joinvar", "addvar", "subvar", "divvar", "mulvar", "absvar",
-    "random", "getvar",
-    "is", "isnot", "isempty", "isnotempty", "isnumber",
-    "exportvars", "importvars", "savegame", "loadgame", "deletegame",
-
-    # "Working with evidence"
-    "addev", "delev",
-
-    # "Special effects"
-    "draw_off", "draw_on", "scroll", "rotate",
-
-    # macros
-    "macro", "endmacro",
-
-    # data.txt fields
-    "icon", "title", "author", "version",
-
-    # "Animation file commands" (these can be added here too)
-    "horizontal", "vertical", "length", "loops", "framedelay",
-    "blinkmode", "blipsound", "framecompress",
-
-    # "Art Types"
-    "fg", "bg", "ev",
-
-    # Not mentioned in doc.txt, but somewhere else
-    "zoom", "char", "delete", "shake", "is_ex", "setvar_ex",
-
-    # Not mentioned in doc.txt but in docs/index.html
-    "filewrite", "screenshot", "bemo", "clear", "textblock", "textbox",
-    "locked_cases", "addcase", "wincase", "resetcase", "examine3d", "localmenu", "region3d",
-    "game", "controlanim", "globaldelay", "gamemenu", "getprop", "setprop", "debug",
-    "fade", "grey", "invert", "tint", 
-
-    # Misc. stuff (some might be custom macros, or stuff that wasn't in 0.9880)
-    "in", "out", "obj",
-
-    # Undocumented commands found by reading the actual source code of the PyWright engine
-    "framerate", "step", "set_ex", "showrecord", "surf3d", "mesh"
-]
-
-special_variables = [
-    # In the written order in doc.txt
-    # "Used in actual game logic"
-    "_speaking",
-
-    # "Dev controls"
-    "_debug", "_return", "_preload",
-
-    # "Things engine sets which might be useful to use in logic"
-    "_layer_invisible", "_layer_bg", "_layer_char", "_layer_fg", "_layer_textbox", "_layer_gui"
-    "_speaking_name", "_lastline", "_currentline", "_lastlabel", "_currentlabel",
-    "_statement", "_selected", "_examine_offset_x", "_examine_offset_y",
-    "_examine_click_x", "_examine_click_y",
-
-    # "Interface toggles so you can customize look or behavior of things"
-    "_default_port_fg_delay", "_default_fg_frame_delay", "_list_checked_img", "_bigbutton_img",
-    "_textbox_show_button", "_textbox_show_recordbutton", "_textbox_lines", "_textbox_wrap",
-    "_textbox_allow_skip", "_textbox_skipupdate", "_nt_image", "_examine_skipupdate", "_examine_showbars",
-    "_examine_showcursor", "_examine_use", "_examine_mousedown", "_testimony_blinker", "_cr_button",
-    "_allow_present_evidence", "_allow_present_profiles", "_allow_click_save", "_allow_saveload",
-    "_allow_click_load",
-
-    # "Present customization"
-    "_profiles_enable", "_profiles_present", "_evidence_enable", "_evidence_present",
-    "_cr_back_button", "_list_back_button", "_menu_fade_level", "_double_screen_list_fade",
-    "_flash_sound", "_shake_sound", "_music_loop",
-
-    # "Used in intro.txt in the game folder to control menu"
-    "_order_cases",
-
-    # _case_0, _case_1, case_2... etc. are handled in a separate list
-    # Misc. stuff that wasn't in the doc.txt (some might be custom macros, or stuff that wasn't in 0.9880)
-    "_list_bg_image", "_music_fade", "ev_mode_bg_logic", "_bigbutton_bg",
-    "_production", "_ev_pages", "_ev", "_version"
-]
-
-# Support up to 100 case definitions for a single game, this should be much more than enough.
-cases = ["_case_{}".format(num) for num in range(100)]
-
-# Just for that sweet, sweet startswith()
-named_parameters = ("start=", "end=", "e=", "x=", "y=", "z=", "name=", "speed=", "width=", "height=", "rwidth=", "rheight=",
-                    "graphic=", "graphichigh=", "examine=", "talk=", "present=", "move=", "fail=", "nametag=", "result=", "label=",
-                    "mag=", "frames=", "hotkey=", "jumpto=","pause=","test=", "loops=", "rotz=", "be=", "pri=", "variable=", "threat=",
-                    "delay=", "color=", "run=", "priority=", "prop=", "value=", "degrees=", "axis=", "filter=", "after=")
-
-parameters = ["stack", "nowait", "noclear", "hide", "fade", "true", "false", "noback", "sx", "sy",
-              "blink", "loop", "noloop", "b", "t", "stop", "noauto", "password", "all", "suppress", "flipx", "wait", "hold", "try_bottom",
-              "script", "last", "both"]
-
-# Following are string tokens with pattern for autocompletion
-# Notes: {c} is reset color, {c} is also allowed to have args immediatly after the c
-# {n} is a newline
-# {$variable} introduces a variable
-# others are either special commands, or macros.
-# All commands + args + description:
-# sfx            str:sound                Play a sound effect.
-# sound          str:clicksound           Change blipping sound.
-# delay          int:multiplier           Changes the delay mutliplier per character (aka relative speed), and also does {wait manual}.    
-# spd            float:speed              Change speed of dialogue. Also bypasses {_fullspeed} and {_endfullspeed}, not present in the documentation.
-# _fullspeed     (none) (automatic)       Begin instant text. Unofficially supported, internally used when returning from a macro, not present in the documentation.
-# _endfullspeed  (none) (automatic)       Restore previous speed after instant text. Unofficially supported, internally used when returning from a macro, not present in the documentation.
-# wait           str: "manual" or "auto"  Change the waiting mode to specified arguments.
-# center         (none) (preparsed)       Centers the text.
-# type           (none)                   Change blipping sound to typewriter.ogg, set delay to 2 (according to code, but 5 according to doc) and wait mode to "manual".
-# next           (none)                   Automatically goes to the next 3 lines of text.
-# e              str:emotion              Set the current character's emotion.
-# f              int:duration str:color   Flashes the screen to a specific duration & color. Both arguments are optional.
-# s              int:duration int:power   Shakes the screen. Both arguments are optional.
-# p              int:next_char            Pauses for a number of frames (game runs at 60 fps, so 1 frame is 1/60 seconds)
-# c              hex:color                Changes the color. Color can be 3 hex-digits RGB, or 6 hex-digits RRGGBB or last part of the name of a variable named "color_something", or nothing to reset the color. 
-# tbon           (none)                   Forces Testimony Blink On.
-# tboff          (none)                   Forces Testimony Blink Off.
-# n              (none) (preparsed)       New line character.
-# $variable      (none)                   Value of variable.
-string_tokens = ["{sfx /%path/to/sound%}", "{sound %blipping sound%}", "{delay %delay:int%}", "{spd %speed:float%}", "{_fullspeed}", "{_endfullspeed}",
-                 "{wait manual}", "{wait auto}", "{center}", "{type}", "{next}", "{e %emotion%}", "{f %frames:int% %color%}",
-                 "{s %frames% %power%}", "{p %frame%}", "{c}", "{c %color%}", "{tbon}", "{tboff}", "{n}", "{$"]
-
-# Logical operators
-logic_operators = ["==", "<=", ">=", "<", ">", "NOT", "AND", "OR"]
-
-# Compiled regular expressions
-# This regex also includes whitespace characters, due to how Scintilla's styling system works
-# It only cares about the "word length" and the style it is gonna use.
-_TOKEN_REGEX = re.compile(r"//[^\r\n]*|#[^\r\n]*|\{[^\r\n]*}|[\"“][^\r\n]*|\S+|\s+")
-
-# This regex finds all the ? characters in a given string
-_QUESTION_MARK_REGEX = re.compile(r"\?+")
-
-def is_string_number(string: str) -> bool:
-    if string.startswith("-"):
-        return is_string_number(string[1:])
-
-    return string.isnumeric() or is_string_float(string)
-
-
-def is_string_float(string: str) -> bool:
-    try:
-        float(string)
-        return True
-    except ValueError:
-        return False
+# Word at the end of the text before the cursor, made of the characters of PyWrightScriptLexer.wordCharacters()
+_WORD_BEING_TYPED_REGEX = re.compile(r"[A-Za-z0-9_{}$]*$")
+
+# Maximum amount of (state, line text) entries kept in the lexer's line cache before it gets cleared
+_LINE_CACHE_MAX_SIZE = 100000
 
 
 class CustomQsciAPIs(QsciAPIs):
@@ -178,6 +31,7 @@ class CustomQsciAPIs(QsciAPIs):
 
         self._has_just_inserted = 0                 # counter for _after_completion_is_applied()
         self._completion_selected :str|None = None  # Either the text to insert or None if no such text
+        self._preferred_completion = ""             # Most used proposal, selected once the list is shown
 
         # Connect events
         sci: QsciScintilla = self.lexer().parent()
@@ -273,30 +127,46 @@ class CustomQsciAPIs(QsciAPIs):
         if text.startswith("#") or text.startswith("//"):
             return []
 
+        # The word being typed, Scintilla only shows the proposals starting with it anyway
+        prefix = _WORD_BEING_TYPED_REGEX.search(text).group()
+
         # Strings:
         if text.startswith('"') or text.startswith('“'):
             if text.rfind("{$") > text.rfind("}"):
-                return formatCompletions("{$%s}", special_variables)
-            return string_tokens
-
+                context = CONTEXT_STRING_VARIABLE
+            else:
+                context = CONTEXT_STRING_TOKEN
         # Test whether we are in command area or in parameters area
-        split = text.split(" ")
-
-        # Commands or macros:
-        if len(split) == 1:
-            macros = [*lexer.builtin_macros, *lexer.game_macros, *lexer.case_macros]
-            if split[0].startswith("{"):
-                return formatCompletions("{%s}", macros)
-            return commands + macros
-
-        # Parameters:
-        # TODO for the future: make the parameter list dependent on the command name
-        return [
-            *formatCompletions("$%s", special_variables),
-            *named_parameters,
-            *parameters,
-            *logic_operators
-        ]
+        elif " " not in text:
+            # Commands or macros:
+            context = CONTEXT_BRACED_MACRO if text.startswith("{") else CONTEXT_COMMAND
+        else:
+            # Parameters:
+            context = CONTEXT_PARAMETER
+
+        completions = None
+        if context == CONTEXT_PARAMETER:
+            # Parameters taking a particular kind of name (art, music, labels...) only get these names proposed
+            words = text.split()
+            parameter = "" if text[-1].isspace() else words.pop()
+            completions = lexer.completion_index.complete_parameter(words[0], len(words), parameter)
+            prefix = prefix if completions is None else parameter[max(parameter.rfind("/"), parameter.rfind("=")) + 1:]
+
+        if completions is None:
+            completions = lexer.completion_index.complete(context, prefix)
+
+        # QScintilla sorts the proposals alphabetically, so the most used one is selected once the list is shown
+        if len(completions) > 0 and completions[0] != prefix:
+            self._preferred_completion = completions[0]
+            QTimer.singleShot(0, self._select_preferred_completion)
+
+        return completions
+
+    def _select_preferred_completion(self):
+        sci: QsciScintilla = self.lexer().parent()
+        if self._preferred_completion != "" and sci.SendScintilla(QsciScintilla.SCI_AUTOCACTIVE):
+            sci.SendScintilla(QsciScintilla.SCI_AUTOCSELECT, 0, self._preferred_completion.encode("utf-8"))
+        self._preferred_completion = ""
 
 def formatCompletions(pattern: str, list: list):
     """
@@ -306,6 +176,10 @@ def formatCompletions(pattern: str, list: list):
 
 
 class PyWrightScriptLexer(QsciLexerCustom):
+    # Emitted instead of styling the range (start, end) when background styling is enabled
+    background_styling_requested = pyqtSignal(int, int)
+    # Emitted instead of styling the range (start, end) when lazy styling is enabled
+    lazy_styling_requested = pyqtSignal(int, int)
 
     def __init__(self, parent: QsciScintilla):
         super().__init__(parent)
@@ -322,6 +196,20 @@ class PyWrightScriptLexer(QsciLexerCustom):
         self.game_macros: list[str] = []
         self.case_macros: list[str] = []
 
+        # Autocompletion proposals, rebuilt when the macros above change
+        self.completion_index = PyWrightCompletionIndex()
+
+        # Splits the text into style runs, knowing the macros above
+        self._tokenizer = PyWrightScriptTokenizer()
+
+        # Maps (incoming state, line bytes) to (style bytes, outgoing state), so unchanged lines are never re-tokenized
+        self._line_cache: dict[tuple[bool, bytes], tuple[bytes, bool]] = {}
+
+        # When True, the styling is left to whoever handles background_styling_requested
+        self.background_styling = False
+        # When True (and background styling is disabled), the styling is left to whoever handles lazy_styling_requested
+        self.lazy_styling = False
+
         # Create a custom API to manage custom autocompletion
         api = CustomQsciAPIs(self)
         api.prepare()
@@ -339,12 +227,41 @@ class PyWrightScriptLexer(QsciLexerCustom):
 
     def set_builtin_macros(self, new_list: list[str]):
         self.builtin_macros = new_list
+        self._update_tokenizer_macros()
 
     def set_game_macros(self, new_list: list[str]):
         self.game_macros = new_list
+        self._update_tokenizer_macros()
 
     def set_case_macros(self, new_list: list[str]):
         self.case_macros = new_list
+        self._update_tokenizer_macros()
+
+    def set_symbol_usage_counts(self, usage_counts: dict[str, int]):
+        """Sets how many times each name (macro, variable...) is used in the game, to rank the autocompletion."""
+        self.completion_index.set_usage_counts(usage_counts)
+
+    def set_completion_indexes(self, asset_catalog: PyWrightAssetCatalog | None, symbol_index: PyWrightSymbolIndex | None):
+        """Sets the indexes the names of the assets, scripts and labels are proposed from, None if not built yet."""
+        self.completion_index.set_asset_catalog(asset_catalog)
+        self.completion_index.set_symbol_index(symbol_index)
+
+    def set_file_path(self, file_path: str):
+        """Sets the path of the edited script, whose case and labels are proposed by the autocompletion."""
+        self.completion_index.set_file_path(file_path)
+
+    def _update_tokenizer_macros(self):
+        self._tokenizer.set_macros(self.builtin_macros, self.game_macros, self.case_macros)
+        self.completion_index.set_macros(self.builtin_macros, self.game_macros, self.case_macros)
+        self.clear_line_cache()
+
+    def copy_tokenizer(self) -> PyWrightScriptTokenizer:
+        """Returns a tokenizer classifying tokens like this lexer currently does, that can be used from another thread."""
+        return self._tokenizer.copy()
+
+    def clear_line_cache(self):
+        """Forgets the cached styling of every line, needed whenever the way tokens are classified changes."""
+        self._line_cache.clear()
 
     def set_editor_color_theme(self):
         # Default Text Settings
@@ -383,139 +300,57 @@ class PyWrightScriptLexer(QsciLexerCustom):
             return ""
 
     def styleText(self, start, end):
-        self.startStyling(start)
+        if end <= start:
+            return
 
-        text = bytearray(self.parent().text(), "utf-8")[start:end].decode("utf-8")
-
-        token_list = [(token, len(bytearray(token, "utf-8"))) for token in _TOKEN_REGEX.findall(text)]
-
-        # Keep track if a token is a newline, to distinguish commands and parameters on the next token for the ones such as "fade" and "script":
-        wasNewLine = True
-        for i, token in enumerate(token_list):
-            self._set_styling_for_token(token, wasNewLine)
-            wasNewLine = '\n' in token[0].replace('\r', '\n') or (wasNewLine and not token[0].strip())
-
-    def _set_styling_for_token(self, token: tuple[str, int], isFirstOfLine:bool = False):
-        # Handle tokens ending with ?, except comments
-        if token[0].endswith("?") and len(token[0]) > 1 and not (token[0].startswith("//") or token[0].startswith("#")):
-            # Check if there are multiple question marks first
-
-            question_marks = _QUESTION_MARK_REGEX.findall(token[0])
-
-            if len(question_marks[0]) == 1:
-                # end of a ? conditional, don't consider the ?
-                token_split = token[0].rsplit("?", maxsplit=1)
-                token_0_len = len(bytearray(token_split[0], "utf-8"))
-                # process the token sans ?
-                self._set_styling_for_token((token_split[0], token_0_len))
-                # then the ? on its own
-                self.setStyling(1, 2)
-                return
-
-        # Proceed through the tokens normally
-        if token[0] in commands:
-            # If a command token can also be a parameter (such as "fade" and "script"),
-            # check if it is a the start of a line to know which coloration to perform:
-            if token[0] in parameters and not isFirstOfLine:
-                self.setStyling(token[1], 3)
-                return
-            self.setStyling(token[1], 1)
-        elif token[0] in logic_operators:
-            self.setStyling(token[1], 2)
-        elif token[0] in special_variables or token[0] in cases:
-            self.setStyling(token[1], 2)
-        elif token[0].startswith("$") and (token[0][1:] in special_variables
-                                           or token[0][1:] in parameters 
-                                           or token[0][1:].isdigit()): # e.g. $1, $2, engine-level, used for accessing macro args
-            self.setStyling(token[1], 2)
-        elif token[0].startswith(named_parameters):
-            # Divide the = section and then colorize that instead
-            param_name = token[0].split("=", maxsplit=1)
-            param_0_len = len(param_name[0]) + 1  # + 1 for the "="
-            self.setStyling(param_0_len, 3)
-            param_1_token = (param_name[1], len(param_name[1]))
-            self._set_styling_for_token(param_1_token)
-        elif token[0] in parameters:
-            self.setStyling(token[1], 3)
-        elif token[0].startswith("{") and "}" in token[0] and ' ' in token[0]:
-            # macro call with a parameter
-
-            #split token to make sure there is not more than one macro call
-            tokens = re.findall('[^}]+}|[^}]+', token[0])
-            if (len(tokens) > 1):
-                # process all tokens separately
-                for subtoken in tokens:
-                    self._set_styling_for_token((subtoken, len(subtoken)))
-                return
-            
-            token_split = token[0].split(' ')
-            for tokenpiece in token_split:
-                # first token is always the macro
-                if tokenpiece == token_split[0]:
-                    self.setStyling(len(token_split[0]) + 1, 3)
-                    continue
-                #last token needs special handling for the closing bracket
-                elif tokenpiece.endswith("}"):
-                    tokenpiece_split = tokenpiece.split("}", maxsplit=1)
-                    # process the last token sans bracket
-                    self._set_styling_for_token((tokenpiece_split[0], len(tokenpiece_split[0])))
-                    # then the bracket by itself
-                    self._set_styling_for_token(("}", 1))
-                    break
-                # middle tokens get processed normally
-                self._set_styling_for_token((tokenpiece, len(tokenpiece) + 1))
-        elif token[0] == "}" or token[0].startswith("{") and token[0].endswith("}"):
-            self.setStyling(token[1], 3)
-        elif token[0].startswith("//") or token[0].startswith("#"):
-            self.setStyling(token[1], 4)
-        elif (token[0].startswith("\"") or token[0].startswith('“')):
-            self._set_styling_for_string_token(token[0])
-        elif is_string_number(token[0]):
-            self.setStyling(token[1], 6)
-        elif token[0] in self.builtin_macros:
-            self.setStyling(token[1], 7)
-        elif token[0] in self.game_macros:
-            self.setStyling(token[1], 8)
-        elif token[0] in self.case_macros:
-            self.setStyling(token[1], 8)    # Question: do we do separate styles for case and game macros?
-        else:
-            self.setStyling(token[1], 0)
+        if self.background_styling:
+            # Consider the range as styled for now, so it is not requested again until the styles arrive
+            self.startStyling(end)
+            self.background_styling_requested.emit(start, end)
+            return
 
-    def _set_styling_for_string_token(self, text: str):
-        # Note: text should have a " at start and at end.
-        
-        # Loop while there is text to style
-        while len(text) > 0:
-
-            # Search for braces
-            openPos = text.find("{", 1)
-            closePos = text.find("}", 1)
-
-            # Take the next found brace (need to take into account the fact that not found returns -1 and -1 is < 0)
-            if openPos < 0:
-                nextPos = closePos
-            elif closePos < 0:
-                nextPos = openPos
-            else:
-                nextPos = min(openPos, closePos)
+        if self.lazy_styling:
+            self.lazy_styling_requested.emit(start, end)
+            return
 
-            # {} are not found: place only string
-            if openPos < 0 and closePos < 0:
-                self.setStyling(len(bytearray(text, "utf-8")), 5)
-                break
+        self.style_range(start, end)
 
-            else:
-                # Split text
-                token = text[:nextPos]
-                text = text[nextPos:]
-                
-                # Apply style
-                # If token starts with { and text with }, put the } in the token and colorize it a different color
-                if token.startswith('{') and text.startswith('}'):
-                    token = token + text[0]
-                    text = text[1:]
-                    self.setStyling(len(bytearray(token, "utf-8")), 9)
-                else:
-                    self.setStyling(len(bytearray(token, "utf-8")), 5)
+    def style_range(self, start: int, end: int):
+        """Styles the range right away, whatever the styling mode is.
+        :param start: Position of the start of the range, which must be the start of a line.
+        :param end: Position of the end of the range."""
+        if end <= start:
+            return
 
+        # Only read the bytes of the requested range (through SCI_GETTEXTRANGE), never the whole document.
+        # bytes() may return a trailing null character, hence the slicing.
+        text = bytes(self.parent().bytes(start, end))[:end - start]
 
+        styles = self.get_styles(text)
+
+        # Apply the whole range at once, instead of calling setStyling() for every token
+        self.startStyling(start)
+        self.parent().SendScintilla(QsciScintilla.SCI_SETSTYLINGEX, len(styles), styles)
+
+    def get_styles(self, text: bytes) -> bytes:
+        """Computes the styles of some text, using the line cache.
+        :param text: UTF-8 bytes of the text, starting at the beginning of a line.
+        :return: One style byte for each byte of text."""
+        line_styles: list[bytes] = []
+
+        state = LINE_START_STATE
+        for line in text.splitlines(keepends=True):
+            key = (state, line)
+            cached = self._line_cache.get(key)
+
+            if cached is None:
+                runs, out_state = self._tokenizer.tokenize_line(line, state)
+                cached = (runs.to_style_bytes(len(line)), out_state)
+                if len(self._line_cache) >= _LINE_CACHE_MAX_SIZE:
+                    self._line_cache.clear()
+                self._line_cache[key] = cached
+
+            styles, state = cached
+            line_styles.append(styles)
+
+        return b"".join(line_styles)
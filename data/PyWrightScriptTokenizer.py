@@ -0,0 +1,443 @@
+# Tokenizer for PyWright scripts, that does not depend on Qt.
+# It turns UTF-8 encoded script text into compact style runs, which the lexer applies on the editor,
+# but it can also be used by anything else that needs to know what each part of a script is (and from any thread).
+import copy
+import re
+from array import array
+from itertools import accumulate
+
+commands = [
+    # In the written order in doc.txt (with some additions):
+    # "To add various objects"
+    "emo",
+    "gui", "Back", "Button", "Wait", "Input",
+    "menu",
+    "list", "li", "showlist", "forgetlist", "forgetlistitem",
+    "present",
+    "examine", "region",
+
+    # "Various control commands"
+    "print", "include", "nt", "goto", "label", "penalty", "pause", "timer", "waitenter",
+    "mus", "sfx", "movie",
+    "exit", "endscript", "casemenu", "script", "top",
+    "cross", "endcross", "statement", "resume", "cross_restart", "clearcross",
+    "next_statement", "prev_statement",
+
+    # "Variables and flags to keep track of what happens"
+    "setflag", "delflag", "flag", "noflag", "set",
+    "setvar", "joinvar", "addvar", "subvar", "divvar", "mulvar", "absvar",
+    "random", "getvar",
+    "is", "isnot", "isempty", "isnotempty", "isnumber",
+    "exportvars", "importvars", "savegame", "loadgame", "deletegame",
+
+    # "Working with evidence"
+    "addev", "delev",
+
+    # "Special effects"
+    "draw_off", "draw_on", "scroll", "rotate",
+
+    # macros
+    "macro", "endmacro",
+
+    # data.txt fields
+    "icon", "title", "author", "version",
+
+    # "Animation file commands" (these can be added here too)
+    "horizontal", "vertical", "length", "loops", "framedelay",
+    "blinkmode", "blipsound", "framecompress",
+
+    # "Art Types"
+    "fg", "bg", "ev",
+
+    # Not mentioned in doc.txt, but somewhere else
+    "zoom", "char", "delete", "shake", "is_ex", "setvar_ex",
+
+    # Not mentioned in doc.txt but in docs/index.html
+    "filewrite", "screenshot", "bemo", "clear", "textblock", "textbox",
+    "locked_cases", "addcase", "wincase", "resetcase", "examine3d", "localmenu", "region3d",
+    "game", "controlanim", "globaldelay", "gamemenu", "getprop", "setprop", "debug",
+    "fade", "grey", "invert", "tint",
+
+    # Misc. stuff (some might be custom macros, or stuff that wasn't in 0.9880)
+    "in", "out", "obj",
+
+    # Undocumented commands found by reading the actual source code of the PyWright engine
+    "framerate", "step", "set_ex", "showrecord", "surf3d", "mesh"
+]
+
+special_variables = [
+    # In the written order in doc.txt
+    # "Used in actual game logic"
+    "_speaking",
+
+    # "Dev controls"
+    "_debug", "_return", "_preload",
+
+    # "Things engine sets which might be useful to use in logic"
+    "_layer_invisible", "_layer_bg", "_layer_char", "_layer_fg", "_layer_textbox", "_layer_gui"
+    "_speaking_name", "_lastline", "_currentline", "_lastlabel", "_currentlabel",
+    "_statement", "_selected", "_examine_offset_x", "_examine_offset_y",
+    "_examine_click_x", "_examine_click_y",
+
+    # "Interface toggles so you can customize look or behavior of things"
+    "_default_port_fg_delay", "_default_fg_frame_delay", "_list_checked_img", "_bigbutton_img",
+    "_textbox_show_button", "_textbox_show_recordbutton", "_textbox_lines", "_textbox_wrap",
+    "_textbox_allow_skip", "_textbox_skipupdate", "_nt_image", "_examine_skipupdate", "_examine_showbars",
+    "_examine_showcursor", "_examine_use", "_examine_mousedown", "_testimony_blinker", "_cr_button",
+    "_allow_present_evidence", "_allow_present_profiles", "_allow_click_save", "_allow_saveload",
+    "_allow_click_load",
+
+    # "Present customization"
+    "_profiles_enable", "_profiles_present", "_evidence_enable", "_evidence_present",
+    "_cr_back_button", "_list_back_button", "_menu_fade_level", "_double_screen_list_fade",
+    "_flash_sound", "_shake_sound", "_music_loop",
+
+    # "Used in intro.txt in the game folder to control menu"
+    "_order_cases",
+
+    # _case_0, _case_1, case_2... etc. are handled in a separate list
+    # Misc. stuff that wasn't in the doc.txt (some might be custom macros, or stuff that wasn't in 0.9880)
+    "_list_bg_image", "_music_fade", "ev_mode_bg_logic", "_bigbutton_bg",
+    "_production", "_ev_pages", "_ev", "_version"
+]
+
+# Support up to 100 case definitions for a single game, this should be much more than enough.
+cases = ["_case_{}".format(num) for num in range(100)]
+
+# Just for that sweet, sweet startswith()
+named_parameters = ("start=", "end=", "e=", "x=", "y=", "z=", "name=", "speed=", "width=", "height=", "rwidth=", "rheight=",
+                    "graphic=", "graphichigh=", "examine=", "talk=", "present=", "move=", "fail=", "nametag=", "result=", "label=",
+                    "mag=", "frames=", "hotkey=", "jumpto=","pause=","test=", "loops=", "rotz=", "be=", "pri=", "variable=", "threat=",
+                    "delay=", "color=", "run=", "priority=", "prop=", "value=", "degrees=", "axis=", "filter=", "after=")
+
+parameters = ["stack", "nowait", "noclear", "hide", "fade", "true", "false", "noback", "sx", "sy",
+              "blink", "loop", "noloop", "b", "t", "stop", "noauto", "password", "all", "suppress", "flipx", "wait", "hold", "try_bottom",
+              "script", "last", "both"]
+
+# Logical operators
+logic_operators = ["==", "<=", ">=", "<", ">", "NOT", "AND", "OR"]
+
+# Styles, as used by the lexer and the editor color themes
+STYLE_DEFAULT = 0
+STYLE_COMMAND = 1
+STYLE_SPECIAL_VARIABLE = 2
+STYLE_PARAMETER = 3
+STYLE_COMMENT = 4
+STYLE_STRING = 5
+STYLE_NUMBER = 6
+STYLE_BUILTIN_MACRO = 7
+STYLE_GAME_MACRO = 8
+STYLE_STRING_TOKEN = 9
+
+# Tokens are always styled as if they were the first of their line at the start of a line,
+# which makes the styling of a line depend only on its text.
+LINE_START_STATE = True
+
+# Compiled regular expressions
+# This regex also includes whitespace characters, due to how Scintilla's styling system works
+# It only cares about the "word length" and the style it is gonna use.
+_TOKEN_REGEX = re.compile(r"//[^\r\n]*|#[^\r\n]*|\{[^\r\n]*}|[\"“][^\r\n]*|\S+|\s+")
+
+# This regex finds all the ? characters in a given string
+_QUESTION_MARK_REGEX = re.compile(r"\?+")
+
+# Splits a {} token into the macro calls it contains
+_MACRO_CALL_REGEX = re.compile(r"[^}]+}|[^}]+")
+
+# Matches everything float() accepts (after removing any leading minus signs), such as "-12", "3.5", "1e-3" or "inf"
+_DIGITS_PATTERN = r"\d(?:_?\d)*"
+_NUMBER_REGEX = re.compile(r"-*\s*[+-]?(?:(?:{d}(?:\.(?:{d})?)?|\.{d})(?:e[+-]?{d})?|inf(?:inity)?|nan)\s*"
+                           .format(d=_DIGITS_PATTERN), re.IGNORECASE)
+
+
+def is_string_number(string: str) -> bool:
+    return _NUMBER_REGEX.fullmatch(string) is not None or string.lstrip("-").isnumeric()
+
+
+# Style given to the tokens that can be both a command or a parameter (such as "fade" and "script"),
+# the actual style depends on whether the token is the first of its line or not.
+_COMMAND_OR_PARAMETER_STYLE = -1
+
+
+def _build_keyword_styles() -> dict[str, int]:
+    """Maps every keyword to its style. Entries are added from the lowest priority to the highest one,
+    so that a keyword present in several lists gets the same style as the checks of the lexer used to give it."""
+    result: dict[str, int] = {}
+
+    for parameter in parameters:
+        result[parameter] = STYLE_PARAMETER
+
+    for variable in [*special_variables, *parameters]:
+        result["$" + variable] = STYLE_SPECIAL_VARIABLE
+
+    for variable in [*special_variables, *cases, *logic_operators]:
+        result[variable] = STYLE_SPECIAL_VARIABLE
+
+    for command in commands:
+        result[command] = _COMMAND_OR_PARAMETER_STYLE if command in parameters else STYLE_COMMAND
+
+    return result
+
+
+_KEYWORD_STYLES = _build_keyword_styles()
+
+
+def _is_styled_before_macros(token: str) -> bool:
+    """Returns True if the token would be styled by one of the rules the tokenizer checks before looking for macros."""
+    return (token.startswith(named_parameters)
+            or (token.startswith("$") and token[1:].isdigit())
+            or (token.startswith("{") and "}" in token and " " in token)
+            or token == "}" or (token.startswith("{") and token.endswith("}"))
+            or token.startswith(("//", "#", "\"", "“"))
+            or is_string_number(token))
+
+
+def build_token_styles(builtin_macros: list[str], game_macros: list[str], case_macros: list[str]) -> dict[str, int]:
+    """Builds the dictionary used to classify the tokens, mapping each keyword and macro name to its style."""
+    result: dict[str, int] = {}
+
+    for macro_list, style in ((case_macros, STYLE_GAME_MACRO), (game_macros, STYLE_GAME_MACRO),
+                              (builtin_macros, STYLE_BUILTIN_MACRO)):
+        for macro in macro_list:
+            if not _is_styled_before_macros(macro):
+                result[macro] = style
+
+    result.update(_KEYWORD_STYLES)
+
+    return result
+
+
+class StyleRuns:
+    """Compact list of style runs: the run i covers lengths[i] bytes starting at offsets[i] with the style styles[i].
+    Runs are sorted and never overlap, bytes that are not covered by any run have the default style."""
+
+    __slots__ = ("offsets", "lengths", "styles")
+
+    def __init__(self):
+        self.offsets = array("I")
+        self.lengths = array("I")
+        self.styles = array("B")
+
+    def __len__(self) -> int:
+        return len(self.styles)
+
+    def __iter__(self):
+        return zip(self.offsets, self.lengths, self.styles)
+
+    def append(self, offset: int, length: int, style: int):
+        """Adds a run after the existing ones, merging it with the last one if they touch and share the same style."""
+        if length <= 0:
+            return
+
+        if self.styles and self.styles[-1] == style and self.offsets[-1] + self.lengths[-1] == offset:
+            self.lengths[-1] += length
+            return
+
+        self.offsets.append(offset)
+        self.lengths.append(length)
+        self.styles.append(style)
+
+    def extend(self, other: "StyleRuns", shift: int = 0):
+        """Adds all the runs of another StyleRuns after the existing ones, moving them by shift bytes."""
+        for offset, length, style in other:
+            self.append(offset + shift, length, style)
+
+    def to_style_bytes(self, length: int) -> bytes:
+        """Expands the runs into one style byte per text byte, as expected by Scintilla's SCI_SETSTYLINGEX.
+        :param length: The length of the text the runs were computed on.
+        :return: length style bytes, the bytes not covered by any run having the default style."""
+        result = bytearray(length)
+        for offset, run_length, style in self:
+            if style != STYLE_DEFAULT:
+                result[offset:offset + run_length] = bytes((style,)) * run_length
+        return bytes(result[:length])
+
+
+class PyWrightScriptTokenizer:
+    """Splits PyWright scripts into style runs, knowing the macros of the game to tell them apart."""
+
+    def __init__(self, builtin_macros: list[str] = (), game_macros: list[str] = (), case_macros: list[str] = ()):
+        # Maps every keyword and macro to its style, rebuilt only when the macros change
+        self._token_styles: dict[str, int] = build_token_styles(builtin_macros, game_macros, case_macros)
+
+        # Runs of the line currently being tokenized, as (character offset, character length, style)
+        self._runs: list[tuple[int, int, int]] = []
+
+    def set_macros(self, builtin_macros: list[str], game_macros: list[str], case_macros: list[str]):
+        self._token_styles = build_token_styles(builtin_macros, game_macros, case_macros)
+
+    def copy(self) -> "PyWrightScriptTokenizer":
+        """Returns a tokenizer knowing the same macros, which can be used from another thread than this one."""
+        result = copy.copy(self)
+        result._runs = []
+        return result
+
+    def tokenize(self, data: bytes, state: bool = LINE_START_STATE) -> StyleRuns:
+        """Tokenizes UTF-8 encoded script text.
+        :param data: The text to tokenize. It should start at the beginning of a line.
+        :param state: Whether the first token is to be considered as the first token of a line.
+        :return: The style runs, with offsets relative to the start of data."""
+        result = StyleRuns()
+
+        offset = 0
+        for line in data.splitlines(keepends=True):
+            runs, state = self.tokenize_line(line, state)
+            result.extend(runs, offset)
+            offset += len(line)
+
+        return result
+
+    def tokenize_line(self, line: bytes, state: bool = LINE_START_STATE) -> tuple[StyleRuns, bool]:
+        """Tokenizes a single line.
+        :param line: UTF-8 bytes of the line, including its end of line characters if there are any.
+        :param state: Whether the first token of the line is to be considered as the first token of a line.
+        :return: The style runs of the line (with offsets relative to the start of the line),
+        and the state for the line after it."""
+        text = line.decode("utf-8", "surrogateescape")
+
+        self._runs = []
+
+        # Keep track if a token is a newline, to distinguish commands and parameters on the next token for the ones such as "fade" and "script":
+        wasNewLine = state
+        for match in _TOKEN_REGEX.finditer(text):
+            token = match.group()
+            self._style_token(token, match.start(), len(token), wasNewLine)
+            wasNewLine = '\n' in token.replace('\r', '\n') or (wasNewLine and not token.strip())
+
+        # Runs are computed on characters, convert them to bytes
+        if text.isascii():
+            byte_offsets = None
+        else:
+            byte_offsets = list(accumulate((len(c.encode("utf-8", "surrogateescape")) for c in text), initial=0))
+
+        runs = StyleRuns()
+        end = 0
+        for start, length, style in self._runs:
+            # Sub-tokens may not fill the token they come from, or go past it, make sure runs never overlap
+            start = max(start, end)
+            end = min(start + length, len(text))
+            if end <= start:
+                end = start
+                continue
+            if byte_offsets is None:
+                runs.append(start, end - start, style)
+            else:
+                runs.append(byte_offsets[start], byte_offsets[end] - byte_offsets[start], style)
+
+        return runs, wasNewLine
+
+    def _add_run(self, offset: int, length: int, style: int):
+        self._runs.append((offset, length, style))
+
+    def _style_token(self, token: str, offset: int, length: int, isFirstOfLine: bool = False):
+        """Styles a token. length is the amount of characters the style covers, which may go past the token itself."""
+        # Handle tokens ending with ?, except comments
+        if token.endswith("?") and len(token) > 1 and not (token.startswith("//") or token.startswith("#")):
+            # Check if there are multiple question marks first
+
+            question_marks = _QUESTION_MARK_REGEX.findall(token)
+
+            if len(question_marks[0]) == 1:
+                # end of a ? conditional, don't consider the ?
+                token_split = token.rsplit("?", maxsplit=1)
+                # process the token sans ?
+                self._style_token(token_split[0], offset, len(token_split[0]))
+                # then the ? on its own
+                self._add_run(offset + len(token_split[0]), 1, STYLE_SPECIAL_VARIABLE)
+                return
+
+        # Proceed through the tokens normally
+        style = self._token_styles.get(token)
+        if style is not None:
+            # If a command token can also be a parameter (such as "fade" and "script"),
+            # check if it is a the start of a line to know which coloration to perform:
+            if style == _COMMAND_OR_PARAMETER_STYLE:
+                style = STYLE_COMMAND if isFirstOfLine else STYLE_PARAMETER
+            self._add_run(offset, length, style)
+        elif token.startswith("$") and token[1:].isdigit(): # e.g. $1, $2, engine-level, used for accessing macro args
+            self._add_run(offset, length, STYLE_SPECIAL_VARIABLE)
+        elif token.startswith(named_parameters):
+            # Divide the = section and then colorize that instead
+            param_name = token.split("=", maxsplit=1)
+            param_0_len = len(param_name[0]) + 1  # + 1 for the "="
+            self._add_run(offset, param_0_len, STYLE_PARAMETER)
+            self._style_token(param_name[1], offset + param_0_len, len(param_name[1]))
+        elif token.startswith("{") and "}" in token and ' ' in token:
+            # macro call with a parameter
+            self._style_macro_call_token(token, offset)
+        elif token == "}" or token.startswith("{") and token.endswith("}"):
+            self._add_run(offset, length, STYLE_PARAMETER)
+        elif token.startswith("//") or token.startswith("#"):
+            self._add_run(offset, length, STYLE_COMMENT)
+        elif token.startswith("\"") or token.startswith('“'):
+            self._style_string_token(token, offset)
+        elif is_string_number(token):
+            self._add_run(offset, length, STYLE_NUMBER)
+        else:
+            self._add_run(offset, length, STYLE_DEFAULT)
+
+    def _style_macro_call_token(self, token: str, offset: int):
+        #split token to make sure there is not more than one macro call
+        macro_calls = _MACRO_CALL_REGEX.findall(token)
+        if len(macro_calls) > 1:
+            # process all macro calls separately
+            for macro_call in macro_calls:
+                self._style_token(macro_call, offset, len(macro_call))
+                offset += len(macro_call)
+            return
+
+        token_split = token.split(' ')
+        for tokenpiece in token_split:
+            # first token is always the macro
+            if tokenpiece == token_split[0]:
+                self._add_run(offset, len(tokenpiece) + 1, STYLE_PARAMETER)
+            #last token needs special handling for the closing bracket
+            elif tokenpiece.endswith("}"):
+                tokenpiece_split = tokenpiece.split("}", maxsplit=1)
+                # process the last token sans bracket
+                self._style_token(tokenpiece_split[0], offset, len(tokenpiece_split[0]))
+                # then the bracket by itself
+                self._style_token("}", offset + len(tokenpiece_split[0]), 1)
+                break
+            # middle tokens get processed normally
+            else:
+                self._style_token(tokenpiece, offset, len(tokenpiece) + 1)
+            offset += len(tokenpiece) + 1
+
+    def _style_string_token(self, text: str, offset: int):
+        # Note: text should have a " at start and at end.
+
+        # Loop while there is text to style
+        while len(text) > 0:
+
+            # Search for braces
+            openPos = text.find("{", 1)
+            closePos = text.find("}", 1)
+
+            # Take the next found brace (need to take into account the fact that not found returns -1 and -1 is < 0)
+            if openPos < 0:
+                nextPos = closePos
+            elif closePos < 0:
+                nextPos = openPos
+            else:
+                nextPos = min(openPos, closePos)
+
+            # {} are not found: place only string
+            if openPos < 0 and closePos < 0:
+                self._add_run(offset, len(text), STYLE_STRING)
+                break
+
+            else:
+                # Split text
+                token = text[:nextPos]
+                text = text[nextPos:]
+
+                # Apply style
+                # If token starts with { and text with }, put the } in the token and colorize it a different color
+                if token.startswith('{') and text.startswith('}'):
+                    token = token + text[0]
+                    text = text[1:]
+                    self._add_run(offset, len(token), STYLE_STRING_TOKEN)
+                else:
+                    self._add_run(offset, len(token), STYLE_STRING)
+                offset += len(token)
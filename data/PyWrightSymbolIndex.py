@@ -0,0 +1,426 @@
+# Index of what the scripts of a PyWright game define and reference (labels, macros, flags, variables, scripts...)
+# The index is saved to a cache file, so that only the files that changed since the last time get parsed again.
+
+import hashlib
+import json
+import os
+import re
+from pathlib import Path
+
+from PyQt6.QtCore import QObject, QRunnable, QThreadPool, pyqtSignal
+
+from data import IDESettings
+from data.PyWrightScriptTokenizer import commands
+
+# Symbol kinds
+SYMBOL_LABEL = "label"              # label X
+SYMBOL_MACRO = "macro"              # macro X
+SYMBOL_FLAG_SET = "setflag"         # setflag X
+SYMBOL_FLAG_CHECK = "flag"          # flag X
+SYMBOL_VARIABLE_SET = "setvar"      # setvar X / set X
+SYMBOL_SCRIPT_REFERENCE = "script"  # script X / include X
+SYMBOL_GOTO = "goto"                # goto X, fail=X, jumpto=X, label=X
+SYMBOL_MACRO_CALL = "call"          # X (a line starting with something that is not a command, and could be a macro)
+SYMBOL_SCRIPT_FILE = "file"         # The script file X.txt itself (not stored in the files, only in the lookup table)
+
+# Maps the commands to the kind of symbol their first argument is
+_SYMBOL_COMMANDS = {
+    "label": SYMBOL_LABEL,
+    "macro": SYMBOL_MACRO,
+    "setflag": SYMBOL_FLAG_SET,
+    "flag": SYMBOL_FLAG_CHECK,
+    "setvar": SYMBOL_VARIABLE_SET,
+    "set": SYMBOL_VARIABLE_SET,
+    "script": SYMBOL_SCRIPT_REFERENCE,
+    "include": SYMBOL_SCRIPT_REFERENCE,
+    "goto": SYMBOL_GOTO,
+}
+
+# Lines starting with one of these are not macro calls
+_COMMAND_SET = set(commands)
+
+# Named parameters whose value is a label
+_LABEL_PARAMETERS = ("fail=", "jumpto=", "label=")
+
+# What a macro name looks like
+_MACRO_NAME_REGEX = re.compile(r"[A-Za-z_][\w.-]*")
+
+# Files that can contain scripts
+_SCRIPT_FILE_SUFFIXES = (".txt", ".mcro")
+
+# Folders of a game that only contain assets (their .txt files describe animations), they are not indexed
+_ASSET_FOLDER_NAMES = {"art", "music", "sfx", "movies"}
+
+# Bump this whenever what gets indexed changes, so older cache files are ignored
+_CACHE_VERSION = 2
+
+
+class Symbol:
+    """A symbol defined or referenced in a script."""
+
+    __slots__ = ("kind", "name", "file_path", "line")
+
+    def __init__(self, kind: str, name: str, file_path: str, line: int):
+        self.kind = kind            # One of the SYMBOL_ constants
+        self.name = name
+        self.file_path = file_path
+        self.line = line            # 0-based, like in the editor
+
+    def __repr__(self):
+        return "Symbol({!r}, {!r}, {!r}, {})".format(self.kind, self.name, self.file_path, self.line)
+
+
+def parse_symbols(data: bytes, file_path: str) -> list[Symbol]:
+    """Finds the symbols of a script.
+    :param data: The content of the script file.
+    :param file_path: The path of the file, stored in the symbols.
+    :return: The symbols, in the order they appear in the file."""
+    symbols: list[Symbol] = []
+
+    for line_number, line in enumerate(data.decode("utf-8", "replace").splitlines()):
+        words = line.split()
+        if len(words) == 0:
+            continue
+
+        kind = _SYMBOL_COMMANDS.get(words[0])
+        if kind is not None and len(words) > 1:
+            # Named parameters (such as "fail=") are not names, and "flag x?" is about the flag "x"
+            name = words[1].rstrip("?")
+            if name != "" and "=" not in name:
+                symbols.append(Symbol(kind, name, file_path, line_number))
+        elif kind is None and words[0] not in _COMMAND_SET and _MACRO_NAME_REGEX.fullmatch(words[0]):
+            symbols.append(Symbol(SYMBOL_MACRO_CALL, words[0], file_path, line_number))
+
+        for word in words[1:]:
+            if word.startswith(_LABEL_PARAMETERS):
+                name = word.split("=", maxsplit=1)[1]
+                if name != "":
+                    symbols.append(Symbol(SYMBOL_GOTO, name, file_path, line_number))
+
+    return symbols
+
+
+class _IndexedFile:
+
+    __slots__ = ("mtime_ns", "size", "symbols")
+
+    def __init__(self, mtime_ns: int, size: int, symbols: list[Symbol]):
+        self.mtime_ns = mtime_ns
+        self.size = size
+        self.symbols = symbols
+
+
+class PyWrightSymbolIndex:
+    """Symbols of every script of a game, and of the built-in macros of the PyWright installation."""
+
+    def __init__(self, game_path: Path, cache_file_path: Path | None = None):
+        self.game_path = Path(game_path)
+        self.builtin_macros_path = self.game_path.parent.parent / "core" / "macros"
+        self.cache_file_path = cache_file_path
+
+        # Maps file paths to what was found in them
+        self._files: dict[str, _IndexedFile] = {}
+
+        # Lookup tables, kept up to date with the files: symbol name -> symbols, and script name -> script files
+        self._symbols_by_name: dict[str, list[Symbol]] = {}
+        self._script_files_by_name: dict[str, list[Symbol]] = {}
+
+    @staticmethod
+    def get_default_cache_file_path(game_path: Path) -> Path:
+        """Returns the cache file of a game in the cache folder of the IDE, one per game folder."""
+        key = hashlib.sha1(str(Path(game_path).resolve()).encode("utf-8")).hexdigest()[:16]
+        return IDESettings.get_cache_folder_path() / "symbol_index" / "{}.json".format(key)
+
+    def get_indexed_folders(self) -> list[tuple[Path, bool]]:
+        """Returns the folders to index, and whether their subfolders are indexed too."""
+        return [(self.game_path, True), (self.builtin_macros_path, False)]
+
+    def list_script_files(self) -> list[str]:
+        result: list[str] = []
+        for folder_path, recursive in self.get_indexed_folders():
+            list_script_files_in_folder(str(folder_path), recursive, result)
+        return result
+
+    def load_cache(self) -> bool:
+        """Loads the index saved in the cache file.
+        :return: True if the cache could be loaded."""
+        if self.cache_file_path is None:
+            return False
+
+        try:
+            with open(self.cache_file_path, "r", encoding="utf-8") as f:
+                cache = json.load(f)
+        except (OSError, ValueError):
+            return False
+
+        if cache.get("version") != _CACHE_VERSION:
+            return False
+
+        self._files = {
+            file_path: _IndexedFile(entry["mtime_ns"], entry["size"],
+                                    [Symbol(kind, name, file_path, line) for kind, name, line in entry["symbols"]])
+            for file_path, entry in cache["files"].items()
+        }
+        self._rebuild_lookup_tables()
+        return True
+
+    def save_cache(self):
+        if self.cache_file_path is None:
+            return
+
+        cache = {
+            "version": _CACHE_VERSION,
+            "files": {
+                file_path: {
+                    "mtime_ns": indexed_file.mtime_ns,
+                    "size": indexed_file.size,
+                    "symbols": [(symbol.kind, symbol.name, symbol.line) for symbol in indexed_file.symbols],
+                }
+                for file_path, indexed_file in self._files.items()
+            }
+        }
+
+        # Write to a temporary file first, so that the cache is never left half-written
+        self.cache_file_path.parent.mkdir(parents=True, exist_ok=True)
+        temporary_path = self.cache_file_path.with_suffix(".tmp")
+        with open(temporary_path, "w", encoding="utf-8") as f:
+            json.dump(cache, f, separators=(",", ":"))
+        os.replace(temporary_path, self.cache_file_path)
+
+    def update(self) -> bool:
+        """Parses the files that changed since they were indexed, and forgets about the ones that were removed.
+        :return: True if anything changed."""
+        changed = False
+        files: dict[str, _IndexedFile] = {}
+
+        for file_path in self.list_script_files():
+            try:
+                stat = os.stat(file_path)
+            except OSError:
+                continue
+
+            indexed_file = self._files.get(file_path)
+            if indexed_file is None or indexed_file.mtime_ns != stat.st_mtime_ns or indexed_file.size != stat.st_size:
+                indexed_file = self._index_file(file_path, stat)
+                changed = True
+
+            if indexed_file is not None:
+                files[file_path] = indexed_file
+
+        changed = changed or files.keys() != self._files.keys()
+        self._files = files
+        if changed:
+            self._rebuild_lookup_tables()
+        return changed
+
+    def update_file(self, file_path: str):
+        """Parses a single file again, for instance after it was saved. Files outside of the indexed folders are ignored."""
+        file_path = os.path.normpath(file_path)
+        if not self.is_indexed_file_path(file_path):
+            return
+
+        try:
+            indexed_file = self._index_file(file_path, os.stat(file_path))
+        except OSError:
+            indexed_file = None
+
+        old_indexed_file = self._files.pop(file_path, None)
+        if old_indexed_file is not None:
+            self._remove_from_lookup_tables(file_path, old_indexed_file)
+
+        if indexed_file is not None:
+            self._files[file_path] = indexed_file
+            self._add_to_lookup_tables(file_path, indexed_file)
+
+    def is_indexed_file_path(self, file_path: str) -> bool:
+        if not file_path.lower().endswith(_SCRIPT_FILE_SUFFIXES):
+            return False
+
+        path = Path(file_path)
+        for folder_path, recursive in self.get_indexed_folders():
+            if recursive:
+                if folder_path in path.parents and not any(part.lower() in _ASSET_FOLDER_NAMES
+                                                           for part in path.relative_to(folder_path).parts[:-1]):
+                    return True
+            elif path.parent == folder_path:
+                return True
+        return False
+
+    def _rebuild_lookup_tables(self):
+        self._symbols_by_name = {}
+        self._script_files_by_name = {}
+        for file_path, indexed_file in self._files.items():
+            self._add_to_lookup_tables(file_path, indexed_file)
+
+    def _add_to_lookup_tables(self, file_path: str, indexed_file: _IndexedFile):
+        for symbol in indexed_file.symbols:
+            self._symbols_by_name.setdefault(symbol.name, []).append(symbol)
+
+        if file_path.lower().endswith(".txt"):
+            name = Path(file_path).stem
+            self._script_files_by_name.setdefault(name, []).append(Symbol(SYMBOL_SCRIPT_FILE, name, file_path, 0))
+
+    def _remove_from_lookup_tables(self, file_path: str, indexed_file: _IndexedFile):
+        for symbol in indexed_file.symbols:
+            symbols = self._symbols_by_name.get(symbol.name)
+            if symbols is not None:
+                symbols.remove(symbol)
+                if len(symbols) == 0:
+                    del self._symbols_by_name[symbol.name]
+
+        name = Path(file_path).stem
+        script_files = [script_file for script_file in self._script_files_by_name.get(name, [])
+                        if script_file.file_path != file_path]
+        if len(script_files) > 0:
+            self._script_files_by_name[name] = script_files
+        else:
+            self._script_files_by_name.pop(name, None)
+
+    @staticmethod
+    def _index_file(file_path: str, stat: os.stat_result) -> _IndexedFile | None:
+        try:
+            with open(file_path, "rb") as f:
+                data = f.read()
+        except OSError:
+            return None
+
+        return _IndexedFile(stat.st_mtime_ns, stat.st_size, parse_symbols(data, file_path))
+
+    def get_indexed_files(self) -> list[str]:
+        return list(self._files.keys())
+
+    def get_file_symbols(self, file_path: str) -> list[Symbol]:
+        indexed_file = self._files.get(os.path.normpath(file_path))
+        return [] if indexed_file is None else indexed_file.symbols
+
+    def get_symbols(self, kind: str | None = None, name: str | None = None) -> list[Symbol]:
+        """Returns the symbols of a given kind and/or name (all of them if both are None)."""
+        if name is not None:
+            return [symbol for symbol in self._symbols_by_name.get(name, []) if kind is None or symbol.kind == kind]
+
+        return [symbol
+                for indexed_file in self._files.values()
+                for symbol in indexed_file.symbols
+                if kind is None or symbol.kind == kind]
+
+    def find_definitions(self, name: str, from_file_path: str, kind: str | None = None) -> list[Symbol]:
+        """Finds where a name used in a script is defined, without reading any file.
+        :param name: The name of the label, macro or script.
+        :param from_file_path: The file the name is used in, whose definitions come first.
+        :param kind: SYMBOL_LABEL, SYMBOL_MACRO or SYMBOL_SCRIPT_FILE if the kind of the name is known, None to look for all of them.
+        :return: The definitions, the most relevant first."""
+        from_file_path = os.path.normpath(from_file_path)
+        from_folder_path = os.path.dirname(from_file_path)
+        symbols = self._symbols_by_name.get(name, [])
+
+        result: list[Symbol] = []
+
+        if kind is None or kind == SYMBOL_LABEL:
+            # Labels are mostly used from the script they are defined in
+            labels = [symbol for symbol in symbols if symbol.kind == SYMBOL_LABEL]
+            result += sorted(labels, key=lambda symbol: symbol.file_path != from_file_path)
+
+        if kind is None or kind == SYMBOL_MACRO:
+            result += [symbol for symbol in symbols if symbol.kind == SYMBOL_MACRO]
+
+        if kind is None or kind == SYMBOL_SCRIPT_FILE:
+            # Scripts are looked for in the folder of the script first (like PyWright does), then in the game folder
+            script_files = self._script_files_by_name.get(name, [])
+            result += sorted(script_files, key=lambda symbol: (os.path.dirname(symbol.file_path) != from_folder_path,
+                                                               os.path.dirname(symbol.file_path) != str(self.game_path)))
+
+        return result
+
+    def find_references(self, name: str) -> list[Symbol]:
+        """Returns every place a name is used or defined, without reading any file."""
+        return list(self._symbols_by_name.get(name, []))
+
+    def get_script_names(self, from_file_path: str) -> list[str]:
+        """Returns the names of the scripts a script can run, the ones of its folder and of the game folder, like PyWright does."""
+        folder_paths = {os.path.normpath(self.game_path)}
+        if from_file_path != "":
+            folder_paths.add(os.path.dirname(os.path.normpath(from_file_path)))
+
+        return sorted(name for name, script_files in self._script_files_by_name.items()
+                      if any(os.path.dirname(script_file.file_path) in folder_paths for script_file in script_files))
+
+    def get_usage_counts(self) -> dict[str, int]:
+        """Returns how many times each name (label, macro, flag, variable, script...) is used or defined."""
+        return {name: len(symbols) for name, symbols in self._symbols_by_name.items()}
+
+
+def list_script_files_in_folder(folder_path: str, recursive: bool, result: list[str]):
+    """Appends the paths of the .txt and .mcro files of a folder to result, skipping the asset folders.
+    :param folder_path: Folder to look into.
+    :param recursive: Whether to look into the subfolders too.
+    :param result: List the paths are appended to."""
+    try:
+        entries = list(os.scandir(folder_path))
+    except OSError:
+        return
+
+    for entry in entries:
+        if entry.is_dir():
+            if recursive and entry.name.lower() not in _ASSET_FOLDER_NAMES:
+                list_script_files_in_folder(entry.path, recursive, result)
+        elif entry.name.lower().endswith(_SCRIPT_FILE_SUFFIXES):
+            result.append(os.path.normpath(entry.path))
+
+
+class _SymbolIndexingSignals(QObject):
+    finished = pyqtSignal(object)  # PyWrightSymbolIndex
+
+
+class _SymbolIndexingTask(QRunnable):
+
+    def __init__(self, index: PyWrightSymbolIndex):
+        super().__init__()
+        self.signals = _SymbolIndexingSignals()
+        self._index = index
+
+    def run(self):
+        self._index.load_cache()
+        if self._index.update():
+            try:
+                self._index.save_cache()
+            except OSError:
+                pass
+        self.signals.finished.emit(self._index)
+
+
+class PyWrightSymbolIndexer(QObject):
+    """Builds the symbol index of a game in a background thread, using the cache from the previous time."""
+
+    # Emitted with the new index once it is ready, or with None once another game is opened
+    index_ready = pyqtSignal(object)
+
+    def __init__(self, parent: QObject | None = None):
+        super().__init__(parent)
+        self.index: PyWrightSymbolIndex | None = None
+        self._game_path: Path | None = None
+
+    def index_game(self, game_path: Path):
+        """Starts indexing a game. When indexing the same game again, the current index stays available
+        until the new one is ready. For another game, there is no index until the new one is ready,
+        so that nothing resolves to the files of the previous game."""
+        if self._game_path != Path(game_path) and self.index is not None:
+            self.index = None
+            self.index_ready.emit(None)
+        self._game_path = Path(game_path)
+
+        task = _SymbolIndexingTask(PyWrightSymbolIndex(game_path, PyWrightSymbolIndex.get_default_cache_file_path(game_path)))
+        task.signals.finished.connect(self._handle_indexing_finished)
+        QThreadPool.globalInstance().start(task)
+
+    def update_file(self, file_path: str):
+        """Updates the current index after a file was saved."""
+        if self.index is not None:
+            self.index.update_file(file_path)
+
+    def _handle_indexing_finished(self, index: PyWrightSymbolIndex):
+        # Another game may have been opened in the meantime
+        if index.game_path != self._game_path:
+            return
+
+        self.index = index
+        self.index_ready.emit(index)
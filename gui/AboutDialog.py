@@ -1,6 +1,5 @@
 from PyQt6.QtCore import QSize, QT_VERSION_STR, PYQT_VERSION_STR
 from PyQt6.Qsci import QSCINTILLA_VERSION_STR
-from pygame import ver as pygame_ver
 
 from PyQt6.QtGui import QPixmap
 from PyQt6.QtWidgets import QWidget, QDialog, QDialogButtonBox, QVBoxLayout, QLayout, QLabel, QTabWidget, \
@@ -18,7 +17,7 @@ _about_text = """<p>This program aims to make developing PyWright games easier.<
 <p><b>PyQt:</b> {}</p>
 <p><b>QScintilla:</b> {}</p>
 <p><b>PyGame:</b> {}</p>
-""".format(QT_VERSION_STR, PYQT_VERSION_STR, QSCINTILLA_VERSION_STR, pygame_ver)
+"""
 
 _links_text = """<h3><a href="https://github.com/LupertEverett/pywrightide/">Project Homepage</a> 
 | <a href="https://forums.court-records.net/viewtopic.php?f=36&t=33857">Court Records Forums Thread</a></h3>
@@ -52,7 +51,9 @@ class AboutDialog(QDialog):
         top_level_layout.addWidget(self._version_info_label)
 
         self._about_label = QLabel(self)
-        self._about_label.setText(_about_text)
+        # pygame is only imported when needed, so that starting the IDE doesn't load it
+        from pygame import ver as pygame_ver
+        self._about_label.setText(_about_text.format(QT_VERSION_STR, PYQT_VERSION_STR, QSCINTILLA_VERSION_STR, pygame_ver))
 
         self._links_label = QLabel(self)
         self._links_label.setText(_links_text)
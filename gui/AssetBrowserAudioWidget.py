@@ -6,14 +6,18 @@ from enum import Enum
 from PyQt6.QtWidgets import (QWidget, QVBoxLayout, QHBoxLayout, QComboBox,
                              QMenu, QPushButton, QListView)
 from PyQt6.QtGui import QDesktopServices, QGuiApplication, QClipboard, QAction, QIcon, QStandardItemModel, QStandardItem
-from PyQt6.QtCore import pyqtSignal, Qt, QUrl, QFileSystemWatcher, QModelIndex
+from PyQt6.QtCore import pyqtSignal, Qt, QUrl, QModelIndex
 
 from data.PyWrightGame import PyWrightGameInfo
+from data.PyWrightAssetCatalog import PyWrightAssetCatalog, ROOT_GLOBAL, ROOT_GAME
 from data import IconThemes
 
 MUSIC_FOLDER_NAME = "music"
 SFX_FOLDER_NAME = "sfx"
 
+GLOBAL_FOLDER_TEXT = "Global"
+GAME_FOLDER_TEXT = "Game specific"
+
 
 class AudioType(Enum):
     Music = 1
@@ -33,6 +37,7 @@ class AssetBrowserAudioWidget(QWidget):
         super().__init__(parent)
         self._pywright_dir = ""
         self._game_info: PyWrightGameInfo | None = None
+        self._asset_catalog: PyWrightAssetCatalog | None = None
 
         self.__audio_type = audio_type
         self.__AUDIO_FOLDER = MUSIC_FOLDER_NAME if audio_type == AudioType.Music else SFX_FOLDER_NAME
@@ -67,8 +72,6 @@ class AssetBrowserAudioWidget(QWidget):
         self._stop_button.setToolTip("Stop")
         self._stop_button.pressed.connect(self._handle_stop_pressed)
 
-        self.__file_system_watcher = QFileSystemWatcher(self)
-
         media_controls_layout = QHBoxLayout()
 
         media_controls_layout.addWidget(self._play_button)
@@ -97,65 +100,74 @@ class AssetBrowserAudioWidget(QWidget):
     def set_selected_game(self, selected_game_info: PyWrightGameInfo):
         self._game_info = selected_game_info
 
+    def set_asset_catalog(self, asset_catalog: PyWrightAssetCatalog | None):
+        self._asset_catalog = asset_catalog
+
     def _query_available_folders(self):
-        self.__file_system_watcher.removePaths(self.__file_system_watcher.directories())
+        self._available_audio_folders.clear()
+
         if self._pywright_dir == "":
             return
 
-        if self._game_info is None:
+        if self._game_info is None or self._asset_catalog is None:
             return
 
-        global_audio_folder_path = Path("{}/{}/".format(self._pywright_dir, self.__AUDIO_FOLDER))
-
-        game_audio_folder_path = Path("{}/{}/".format(self._game_info.game_path, self.__AUDIO_FOLDER))
+        if self._asset_catalog.has_folder(ROOT_GLOBAL, self.__AUDIO_FOLDER):
+            self._available_audio_folders.append(GLOBAL_FOLDER_TEXT)
 
-        self._available_audio_folders.clear()
-
-        if global_audio_folder_path.exists() and global_audio_folder_path.is_dir():
-            self.__file_system_watcher.addPath(str(global_audio_folder_path))
-            self._available_audio_folders.append("Global")
-
-        if game_audio_folder_path.exists() and game_audio_folder_path.is_dir():
-            self.__file_system_watcher.addPath(str(game_audio_folder_path))
-            self._available_audio_folders.append("Game specific")
+        if self._asset_catalog.has_folder(ROOT_GAME, self.__AUDIO_FOLDER):
+            self._available_audio_folders.append(GAME_FOLDER_TEXT)
 
         # Also add the relevant folders in Cases if they exist
         for current_case in self._game_info.game_cases:
-            case_audio_folder_path = Path("{}/{}/{}/".format(
-                self._game_info.game_path,
-                current_case,
-                self.__AUDIO_FOLDER
-            ))
-
-            if case_audio_folder_path.exists() and case_audio_folder_path.is_dir():
+            if self._asset_catalog.has_folder(current_case, self.__AUDIO_FOLDER):
                 self._available_audio_folders.append("{}/{}".format(current_case, self.__AUDIO_FOLDER))
 
     def refresh_audio_folders(self):
-        self._audio_folders_combo_box.clear()
+        current_folder = self._audio_folders_combo_box.currentText()
+
         self._query_available_folders()
+        self._audio_folders_combo_box.blockSignals(True)
+        self._audio_folders_combo_box.clear()
         self._audio_folders_combo_box.addItems(self._available_audio_folders)
+        # Stay on the same folder when the list is refreshed because folders were added or removed
+        if current_folder in self._available_audio_folders:
+            self._audio_folders_combo_box.setCurrentText(current_folder)
+        self._audio_folders_combo_box.blockSignals(False)
+
+        self._refresh_button.setEnabled(self._audio_folders_combo_box.currentIndex() != -1)
         self._refresh_audio_list_view()
 
+    def handle_asset_folder_changed(self, root: str, folder: str):
+        """Updates the folder list or the audio list when the asset catalog has seen them change."""
+        if self._asset_catalog is None:
+            return
+
+        if folder == "":
+            # The audio folder of the root may have been added or removed
+            self.refresh_audio_folders()
+        elif folder == self.__AUDIO_FOLDER and root == self._get_selected_audio_folder_root():
+            self._refresh_audio_list_view()
+
     def _handle_combobox_index_changed(self):
         self._refresh_button.setEnabled(self._audio_folders_combo_box.currentIndex() != -1)
         self._refresh_audio_list_view()
 
     def _refresh_audio_list_view(self):
-        folder_path = self._get_selected_audio_folder_path()
-
-        if not folder_path.exists() or not folder_path.is_dir():
-            return
+        self._audio_list_model.clear()
 
-        items = [x.stem for x in folder_path.iterdir() if x.suffix == ".ogg"]
+        root = self._get_selected_audio_folder_root()
 
-        self._audio_list_model.clear()
+        if self._asset_catalog is None or root is None or not self._asset_catalog.has_folder(root, self.__AUDIO_FOLDER):
+            return
 
-        for item in items:
-            self._add_item_to_model(item)
+        for asset_file in self._asset_catalog.get_files(root, self.__AUDIO_FOLDER, (".ogg",)):
+            self._add_item_to_model(asset_file.stem)
 
         folder_text = self._audio_folders_combo_box.currentText()
 
-        if self._currently_playing_index is not None and self._currently_playing_folder == folder_text:
+        if self._currently_playing_index is not None and self._currently_playing_folder == folder_text \
+                and self._currently_playing_index.row() < self._audio_list_model.rowCount():
             self.set_currently_playing_icon()
 
     def _add_item_to_model(self, item_name: str):
@@ -200,10 +212,22 @@ class AssetBrowserAudioWidget(QWidget):
 
         menu.exec(self.mapToGlobal(position))
 
+    def _get_selected_audio_folder_root(self) -> str | None:
+        """Returns the root of the selected folder in the asset catalog, None if no folder is selected."""
+        folder_text = self._audio_folders_combo_box.currentText()
+
+        if folder_text == "":
+            return None
+        if folder_text == GLOBAL_FOLDER_TEXT:
+            return ROOT_GLOBAL
+        if folder_text == GAME_FOLDER_TEXT:
+            return ROOT_GAME
+        return folder_text.split('/', maxsplit=1)[0]
+
     def _get_selected_audio_folder_path(self):
         folder_text = self._audio_folders_combo_box.currentText()
 
-        is_case_specific_folder = folder_text != "Global" and folder_text != "Game specific"
+        is_case_specific_folder = folder_text != GLOBAL_FOLDER_TEXT and folder_text != GAME_FOLDER_TEXT
 
         if is_case_specific_folder:
             case_text = folder_text.split('/', maxsplit=1)[0]
@@ -212,14 +236,14 @@ class AssetBrowserAudioWidget(QWidget):
 
             return Path("{}/{}/{}/".format(self._game_info.game_path, case_text, self.__AUDIO_FOLDER))
         else:
-            is_global = folder_text == "Global"
+            is_global = folder_text == GLOBAL_FOLDER_TEXT
 
             return Path("{}/{}/".format(self._pywright_dir if is_global else self._game_info.game_path,
                                         self.__AUDIO_FOLDER))
 
     def _handle_open_current_folder(self):
         folder_text = self._audio_folders_combo_box.currentText()
-        is_global = folder_text == "Global"
+        is_global = folder_text == GLOBAL_FOLDER_TEXT
 
         folder_path = Path("{}/{}/".format(self._pywright_dir if is_global else self._game_info.game_path,
                                            self.__AUDIO_FOLDER))
@@ -308,6 +332,7 @@ class AssetBrowserAudioWidget(QWidget):
 
     def clear_everything(self):
         self._game_info = None
+        self._asset_catalog = None
         self._audio_list_model.removeRows(0, self._audio_list_model.rowCount())
         self._audio_folders_combo_box.clear()
         self._play_button.setEnabled(False)
@@ -1,16 +1,11 @@
 # Provides ways to view various assets (textures, sound, music...)
-from PyQt6.QtCore import QTimer
 from PyQt6.QtWidgets import QDockWidget, QTabWidget, QWidget, QVBoxLayout, QHBoxLayout
 
-import pygame.mixer
-
 from .AssetBrowserTextureWidget import AssetManagerTextureWidget
 from .AssetBrowserAudioWidget import AssetBrowserAudioWidget, AudioType
+from .AudioService import get_audio_service
 from data.PyWrightGame import PyWrightGameInfo
-
-
-# Custom event type that signals the audio file currently playing has finished
-AUDIO_END_EVENT = pygame.USEREVENT + 1
+from data.PyWrightAssetCatalog import PyWrightAssetCatalog, get_asset_catalog_service
 
 
 class AssetBrowserRootWidget(QDockWidget):
@@ -41,14 +36,9 @@ class AssetBrowserRootWidget(QDockWidget):
         self.setWidget(main_widget)
         self.setTitleBarWidget(self.title_bar_widget)
 
-        # Have to init the ENTIRETY of pygame because we cannot check audio finished events otherwise
-        # which is rather dumb when your use case of pygame only consist of it playing audio files
-        pygame.init()
-        pygame.mixer.music.set_endevent(AUDIO_END_EVENT)
-
-        self._pymixer_check_timer = QTimer(self)
-        self._pymixer_check_timer.timeout.connect(self._check_pygame_events)
-        self._pymixer_check_timer.start(100)
+        # The mixer is only started the first time something is played
+        self._audio_service = get_audio_service()
+        self._audio_service.playback_finished.connect(self._handle_audio_finished)
 
         self.texture_browser = AssetManagerTextureWidget(self)
         self.music_browser = AssetBrowserAudioWidget(AudioType.Music, self)
@@ -66,18 +56,27 @@ class AssetBrowserRootWidget(QDockWidget):
         self.tab_widget.addTab(self.music_browser, "Music")
         self.tab_widget.addTab(self.sfx_browser, "SFX")
 
-    def update_assets(self, selected_game_info: PyWrightGameInfo):
+        # Folders added or removed while the game is open
+        asset_catalog_service = get_asset_catalog_service()
+        asset_catalog_service.folder_changed.connect(self.texture_browser.handle_asset_folder_changed)
+        asset_catalog_service.folder_changed.connect(self.music_browser.handle_asset_folder_changed)
+        asset_catalog_service.folder_changed.connect(self.sfx_browser.handle_asset_folder_changed)
+
+    def update_assets(self, selected_game_info: PyWrightGameInfo, asset_catalog: PyWrightAssetCatalog):
         self.clear_everything()
         self.texture_browser.select_pywright(selected_game_info.pywright_folder_path)
         self.texture_browser.set_selected_game(selected_game_info)
+        self.texture_browser.set_asset_catalog(asset_catalog)
         self.texture_browser.refresh_art_folders()
 
         self.music_browser.select_pywright(selected_game_info.pywright_folder_path)
         self.music_browser.set_selected_game(selected_game_info)
+        self.music_browser.set_asset_catalog(asset_catalog)
         self.music_browser.refresh_audio_folders()
 
         self.sfx_browser.select_pywright(selected_game_info.pywright_folder_path)
         self.sfx_browser.set_selected_game(selected_game_info)
+        self.sfx_browser.set_asset_catalog(asset_catalog)
         self.sfx_browser.refresh_audio_folders()
 
     def _handle_visibility_change(self):
@@ -91,24 +90,18 @@ class AssetBrowserRootWidget(QDockWidget):
         ide_main_window.handle_open_image_viewer_request(image_path)
 
     def _handle_audio_player_play(self, path: str):
-        if pygame.mixer.get_busy():
-            pygame.mixer.stop()
-            self.sfx_browser.unset_currently_playing_icon()
-            self.music_browser.unset_currently_playing_icon()
-        pygame.mixer.music.load(path)
-        pygame.mixer.music.play()
+        # Only one file plays at a time, so the other browser isn't playing anymore
+        for browser in (self.music_browser, self.sfx_browser):
+            if browser is not self.sender():
+                browser.unset_currently_playing_icon()
+        self._audio_service.play(path)
 
     def _handle_audio_player_stop(self):
-        pygame.mixer.music.stop()
-
-    def _check_pygame_events(self):
-        if not pygame.get_init():
-            return
+        self._audio_service.stop()
 
-        for event in pygame.event.get():
-            if event.type == AUDIO_END_EVENT:
-                self.sfx_browser.unset_currently_playing_icon()
-                self.music_browser.unset_currently_playing_icon()
+    def _handle_audio_finished(self):
+        self.sfx_browser.unset_currently_playing_icon()
+        self.music_browser.unset_currently_playing_icon()
 
     def clear_everything(self):
         self.texture_browser.clear_everything()
@@ -116,11 +109,7 @@ class AssetBrowserRootWidget(QDockWidget):
         self.sfx_browser.clear_everything()
 
     def deinit(self):
-        self._pymixer_check_timer.stop()
-        while pygame.mixer.get_busy():
-            # Wait until mixer is not busy
-            pass
-        pygame.quit()
+        self._audio_service.shutdown()
 
     def _handle_top_level(self, top_level: bool):
         self.setTitleBarWidget(None if top_level else self.title_bar_widget)
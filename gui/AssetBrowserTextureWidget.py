@@ -3,16 +3,17 @@
 
 from pathlib import Path
 
-from PyQt6.QtWidgets import QWidget, QListView, QFileIconProvider, QVBoxLayout, QComboBox, QMenu, QPushButton, \
-    QHBoxLayout
-from PyQt6.QtGui import QIcon, QPixmap, QDesktopServices, QClipboard, QGuiApplication, QFileSystemModel, QAction
-from PyQt6.QtCore import QSize, QDir, Qt, QUrl, pyqtSignal, QFileSystemWatcher
+from PyQt6.QtWidgets import QWidget, QVBoxLayout, QComboBox, QMenu, QPushButton, QHBoxLayout
+from PyQt6.QtGui import QIcon, QDesktopServices, QClipboard, QGuiApplication, QAction
+from PyQt6.QtCore import QSize, Qt, QUrl, pyqtSignal
 
 from data.PyWrightGame import PyWrightGameInfo
+from data.PyWrightAssetCatalog import PyWrightAssetCatalog, ROOT_GLOBAL, ROOT_GAME
 from data import IconThemes
+from .ThumbnailService import THUMBNAIL_IMAGE_SUFFIXES
+from .TextureGridView import TextureGridView, TextureListModel
 
 insertable_folders = ("bg", "ev", "fg")
-accepted_types = (".png", ".jpg")
 ICON_SIZE = QSize(192, 192)
 
 
@@ -31,13 +32,13 @@ class AssetManagerTextureWidget(QWidget):
         super().__init__(parent)
         self._pywright_dir = ""
         self._game_info: PyWrightGameInfo | None = None
+        self._asset_catalog: PyWrightAssetCatalog | None = None
 
-        self._textures_list_view = QListView(self)
-        self._textures_list_view.setViewMode(QListView.ViewMode.IconMode)
-        self._textures_list_view.setResizeMode(QListView.ResizeMode.Adjust)
-        self._textures_list_view.setUniformItemSizes(True)
+        self._textures_model = TextureListModel(ICON_SIZE, self)
+
+        self._textures_list_view = TextureGridView(self)
+        self._textures_list_view.setModel(self._textures_model)
         self._textures_list_view.setDragEnabled(False)
-        self._textures_list_view.setSpacing(5)
         self._textures_list_view.setContextMenuPolicy(Qt.ContextMenuPolicy.CustomContextMenu)
         self._textures_list_view.customContextMenuRequested.connect(self._handle_texture_context_menu)
         self._textures_list_view.doubleClicked.connect(self._handle_textures_list_double_click)
@@ -55,10 +56,6 @@ class AssetManagerTextureWidget(QWidget):
 
         self._refresh_button.setEnabled(self._folders_combo_box.currentIndex() != -1)
 
-        self.__file_system_watcher = QFileSystemWatcher(self)
-
-        self.__file_system_watcher.directoryChanged.connect(self._handle_directory_contents_changed)
-
         main_layout = QVBoxLayout()
 
         combobox_layout = QHBoxLayout()
@@ -73,7 +70,7 @@ class AssetManagerTextureWidget(QWidget):
     def clear(self):
         self._pywright_dir = ""
         self._game_info = None
-        self.__file_system_watcher.removePaths(self.__file_system_watcher.directories())
+        self._asset_catalog = None
 
     def select_pywright(self, pywright_dir: str):
         self._pywright_dir = pywright_dir
@@ -81,65 +78,60 @@ class AssetManagerTextureWidget(QWidget):
     def set_selected_game(self, selected_game_info: PyWrightGameInfo):
         self._game_info = selected_game_info
 
+    def set_asset_catalog(self, asset_catalog: PyWrightAssetCatalog | None):
+        self._asset_catalog = asset_catalog
+
     def _query_available_folders(self):
-        self.__file_system_watcher.removePaths(self.__file_system_watcher.directories())
+        self._available_folders = []
 
-        if self._pywright_dir == "":
+        if self._pywright_dir == "" or self._asset_catalog is None:
             return
 
-        global_art_folder_path = Path("{}/art/".format(self._pywright_dir))
+        global_art_folders = ["global/" + x for x in self._asset_catalog.get_subfolders(ROOT_GLOBAL, "art")]
 
-        global_art_folders = ["global/" + x.name for x in global_art_folder_path.iterdir() if x.is_dir()]
+        game_art_folders = self._asset_catalog.get_subfolders(ROOT_GAME, "art")
 
-        game_art_folder_path = Path("{}/art/".format(self._game_info.game_path))
-        game_art_folders = []
+        # Subfolders as well
         game_art_subfolders = []
-
-        if game_art_folder_path.exists():
-            game_art_folders = [x.name for x in game_art_folder_path.iterdir() if x.is_dir()]
-
-            # Iterate over subfolders as well
-
-            game_art_subfolders = []
-
-            for folder in game_art_folders:
-                folder_path = Path("{}/art/{}".format(self._game_info.game_path, folder))
-                game_art_subfolders.extend([folder + "/" + x.name for x in folder_path.iterdir() if x.is_dir()])
+        for folder in game_art_folders:
+            game_art_subfolders.extend([folder + "/" + x for x in self._asset_catalog.get_subfolders(ROOT_GAME, "art/" + folder)])
 
         self._available_folders = global_art_folders + game_art_folders + game_art_subfolders
 
-        self.__file_system_watcher.addPaths(self._available_folders)
-
     def refresh_art_folders(self):
+        current_folder = self._folders_combo_box.currentText()
+
         self._query_available_folders()
+        self._folders_combo_box.blockSignals(True)
         self._folders_combo_box.clear()
         self._folders_combo_box.addItems(self._available_folders)
-        self._refresh_texture_view()
-
-    def _refresh_texture_view(self):
-        subfolder_name = self._folders_combo_box.currentText()
-
-        is_global = subfolder_name.startswith("global/")
-
-        root_folder = self._pywright_dir if is_global or self._game_info is None else self._game_info.game_path
-
-        if is_global:
-            subfolder_name = subfolder_name.split("global/", maxsplit=1)[1]
+        # Stay on the same folder when the list is refreshed because folders were added or removed
+        if current_folder in self._available_folders:
+            self._folders_combo_box.setCurrentText(current_folder)
+        self._folders_combo_box.blockSignals(False)
 
-        folder_path = Path("{}/art/{}".format(root_folder, subfolder_name))
+        self._refresh_button.setEnabled(self._folders_combo_box.currentIndex() != -1)
+        self._refresh_texture_view()
 
-        fs_model = QFileSystemModel()
-        icon_provider = ThumbnailIconProvider()
+    def handle_asset_folder_changed(self, root: str, folder: str):
+        """Updates the folder list or the textures when the asset catalog has seen them change."""
+        if self._asset_catalog is None or root not in (ROOT_GLOBAL, ROOT_GAME):
+            return
 
-        fs_model.setIconProvider(icon_provider)
+        # Only the art folder, its subfolders and the ones of the game are listed
+        if folder in ("", "art") or (root == ROOT_GAME and folder.count("/") == 1 and folder.startswith("art/")):
+            self.refresh_art_folders()
+        elif (root, folder) == self.__get_selected_root_and_folder():
+            self._refresh_texture_view()
 
-        name_filters = ["*.png", "*.PNG", "*.jpg", "*.JPG"]
-        fs_model.setFilter(QDir.Filter.Files)
-        fs_model.setNameFilters(name_filters)
-        fs_model.setNameFilterDisables(False)
+    def _refresh_texture_view(self):
+        root_and_folder = self.__get_selected_root_and_folder()
+        if self._asset_catalog is None or root_and_folder is None:
+            self._textures_model.set_files("", [])
+            return
 
-        self._textures_list_view.setModel(fs_model)
-        self._textures_list_view.setRootIndex(fs_model.setRootPath(str(folder_path)))
+        folder_path = self._asset_catalog.get_folder_path(*root_and_folder)
+        self._textures_model.set_files(str(folder_path), self._asset_catalog.get_files(*root_and_folder, THUMBNAIL_IMAGE_SUFFIXES))
 
     def _handle_textures_list_double_click(self):
         self._handle_view_image()
@@ -148,10 +140,6 @@ class AssetManagerTextureWidget(QWidget):
         self._refresh_button.setEnabled(self._folders_combo_box.currentIndex() != -1)
         self._refresh_texture_view()
 
-    def _handle_directory_contents_changed(self, path: str):
-        if path == self._folders_combo_box.currentText():
-            self._refresh_texture_view()
-
     def _handle_texture_context_menu(self, position):
         if self._game_info is None:
             return
@@ -200,17 +188,14 @@ class AssetManagerTextureWidget(QWidget):
         if len(indexes) == 0:
             return
 
-        index = indexes[0]
-        model: QFileSystemModel = index.model()
-        file_path = model.filePath(index)
+        file_path = self._textures_model.get_file_path(indexes[0])
 
         self.image_viewer_open_requested.emit(file_path)
 
     def _handle_texture_name_copy(self):
         clipboard = QGuiApplication.clipboard()
         index = self._textures_list_view.selectedIndexes()[0]
-        model: QFileSystemModel = index.model()
-        texture_name = model.fileName(index)  # Obtains the file extension as well
+        texture_name = self._textures_model.get_file_name(index)  # Obtains the file extension as well
 
         clipboard.setText(texture_name, QClipboard.Mode.Clipboard)
 
@@ -218,9 +203,8 @@ class AssetManagerTextureWidget(QWidget):
         subfolder_name = self.__get_subfolder_name()
 
         index = self._textures_list_view.selectedIndexes()[0]
-        model: QFileSystemModel = index.model()
 
-        texture_name = model.fileName(index)  # Obtains the file extension as well
+        texture_name = self._textures_model.get_file_name(index)  # Obtains the file extension as well
 
         final_icon_path = "art/{}/{}".format(subfolder_name, texture_name)
 
@@ -232,9 +216,8 @@ class AssetManagerTextureWidget(QWidget):
 
         # Obtain the texture name to use as parameter
         index = self._textures_list_view.selectedIndexes()[0]
-        model: QFileSystemModel = index.model()
 
-        texture_name = Path(model.fileName(index)).stem
+        texture_name = Path(self._textures_model.get_file_name(index)).stem
 
         # Construct the final command and emit it
         final_command = "{} {}".format(subfolder_name, texture_name)
@@ -257,6 +240,15 @@ class AssetManagerTextureWidget(QWidget):
         folder_path = Path("{}/art/{}".format(root_folder, subfolder_name))
         QDesktopServices.openUrl(QUrl.fromLocalFile(str(folder_path)))
 
+    def __get_selected_root_and_folder(self) -> tuple[str, str] | None:
+        """Returns the root and the folder of the selected art folder in the asset catalog, None if none is selected."""
+        subfolder_name = self._folders_combo_box.currentText()
+        if subfolder_name == "":
+            return None
+
+        is_global = subfolder_name.startswith("global/")
+        return ROOT_GLOBAL if is_global else ROOT_GAME, "art/" + self.__get_subfolder_name()
+
     def __get_subfolder_name(self) -> str:
         subfolder_name = self._folders_combo_box.currentText()
         is_global = subfolder_name.startswith("global/")
@@ -268,23 +260,7 @@ class AssetManagerTextureWidget(QWidget):
 
     def clear_everything(self):
         self.clear()
-        self._textures_list_view.setModel(None)
+        self._textures_model.set_files("", [])
         self._folders_combo_box.clear()
         self._refresh_button.setEnabled(False)
 
-
-class ThumbnailIconProvider(QFileIconProvider):
-    """Custom Icon Provider class that also provides thumbnails for image files"""
-
-    def __init__(self):
-        super().__init__()
-
-    def icon(self, icon_type: QFileIconProvider.IconType) -> QIcon:
-        fn: str = icon_type.filePath()
-
-        if fn.endswith(accepted_types):
-            a = QPixmap(ICON_SIZE)
-            a.load(fn)
-            return QIcon(a)
-
-        return super().icon(icon_type)
@@ -0,0 +1,119 @@
+# Plays the music and sound effects of the asset browsers.
+# Only the mixer of pygame is initialized, the first time something is played, so starting the IDE doesn't pay for it.
+# The mixer is driven by a worker thread that sleeps until it is told to play or stop something,
+# and tells when the file being played is over, so nothing runs on the GUI thread while audio plays.
+
+import queue
+import threading
+
+from PyQt6.QtCore import QObject, pyqtSignal
+
+# Commands of the worker thread
+_PLAY = "play"
+_STOP = "stop"
+_QUIT = "quit"
+
+# While a file plays, how long the worker waits for a command before checking whether the file is over, in seconds.
+# pygame only tells through its end event, which needs the display and event modules of pygame too
+_PLAYBACK_CHECK_INTERVAL = 0.25
+
+# How long closing the IDE waits for the mixer to stop, in seconds
+_SHUTDOWN_TIMEOUT = 1.0
+
+
+class AudioService(QObject):
+    """Plays one audio file at a time, use get_audio_service() to get the one shared by the whole IDE."""
+
+    # Emitted once the file being played is over, or if it couldn't be played
+    playback_finished = pyqtSignal()
+
+    def __init__(self, parent: QObject | None = None):
+        super().__init__(parent)
+        self._commands: queue.Queue[tuple[str, str]] = queue.Queue()
+        self._thread: threading.Thread | None = None
+
+    def play(self, file_path: str):
+        """Plays a file, instead of the one being played if any."""
+        if self._thread is None:
+            # Daemon, so that a mixer that doesn't answer anymore can't prevent the IDE from closing
+            self._commands = queue.Queue()
+            self._thread = threading.Thread(target=self._run, args=(self._commands,), name="AudioService", daemon=True)
+            self._thread.start()
+
+        self._commands.put((_PLAY, file_path))
+
+    def stop(self):
+        if self._thread is not None:
+            self._commands.put((_STOP, ""))
+
+    def shutdown(self, timeout: float = _SHUTDOWN_TIMEOUT) -> bool:
+        """Stops playing and closes the mixer, waiting at most timeout seconds for it.
+        :return: Whether the mixer was closed in time."""
+        if self._thread is None:
+            return True
+
+        self._commands.put((_QUIT, ""))
+        self._thread.join(timeout)
+        stopped = not self._thread.is_alive()
+        self._thread = None
+        return stopped
+
+    def _run(self, commands: queue.Queue):
+        mixer = None
+        playing = False
+
+        while True:
+            try:
+                command, file_path = commands.get(timeout=_PLAYBACK_CHECK_INTERVAL if playing else None)
+            except queue.Empty:
+                try:
+                    busy = mixer.music.get_busy()
+                except (OSError, RuntimeError):
+                    busy = False
+                if not busy:
+                    playing = False
+                    self.playback_finished.emit()
+                continue
+
+            if command == _QUIT:
+                break
+
+            if command == _STOP:
+                if playing:
+                    mixer.music.stop()
+                    playing = False
+                continue
+
+            if mixer is None:
+                try:
+                    import pygame.mixer
+                    pygame.mixer.init()
+                    mixer = pygame.mixer
+                except (ImportError, OSError, RuntimeError):
+                    # pygame.error is a RuntimeError, raised when there is no audio device
+                    self.playback_finished.emit()
+                    continue
+
+            try:
+                mixer.music.load(file_path)
+                mixer.music.play()
+                playing = True
+            except (OSError, RuntimeError):
+                # Missing or unreadable file, it may have been deleted before the asset catalog noticed
+                playing = False
+                self.playback_finished.emit()
+
+        if mixer is not None:
+            mixer.music.stop()
+            mixer.quit()
+
+
+_audio_service: AudioService | None = None
+
+
+def get_audio_service() -> AudioService:
+    """Returns the audio service shared by the whole IDE, creating it the first time."""
+    global _audio_service
+    if _audio_service is None:
+        _audio_service = AudioService()
+    return _audio_service
@@ -7,6 +7,9 @@ from PyQt6.QtCore import pyqtSignal
 
 from PyQt6.Qsci import *
 
+from data.PyWrightAssetCatalog import PyWrightAssetCatalog
+from data.PyWrightProjectSearch import SearchMatch, make_matches
+from data.PyWrightSymbolIndex import PyWrightSymbolIndex
 from gui.IDEScintillaWidget import IDEScintillaWidget
 from .FindReplaceDialog import FindType, ReplaceType, SearchScope
 
@@ -27,6 +30,13 @@ class FileEditWidget(QWidget):
     """This just signals that the cursor position changed, without giving any info about line and column;
     since that will be MainWindowCentralWidget's responsibility instead."""
 
+    # File path, symbol name and symbol kind
+    definition_requested = pyqtSignal(str, str, str)
+    # File path, symbol name
+    references_requested = pyqtSignal(str, str)
+    # Path of the file that was just written
+    file_saved = pyqtSignal(str)
+
     def __init__(self, pywright_dir, selected_file=""):
         super().__init__()
 
@@ -46,6 +56,9 @@ class FileEditWidget(QWidget):
 
         self.sci.selectionChanged.connect(self._handle_selection_changed)
 
+        self.sci.definition_requested.connect(lambda name, kind: self.definition_requested.emit(self.file_path, name, kind))
+        self.sci.references_requested.connect(lambda name: self.references_requested.emit(self.file_path, name))
+
         self.setLayout(self.layout)
 
         self.file_path = selected_file
@@ -57,6 +70,7 @@ class FileEditWidget(QWidget):
         if not self._is_a_new_file:
             self.file_name = Path(self.file_path).name
             self.fill_the_scintilla(self.file_path)
+            self.sci.supply_file_path_to_lexer(self.file_path)
 
     def setup_autocompletion(self):
         self.sci.setup_autocompletion()
@@ -99,6 +113,12 @@ class FileEditWidget(QWidget):
     def supply_case_macros_to_lexer(self, case_macros: list[str]):
         self.sci.supply_case_macros_to_lexer(case_macros)
 
+    def supply_symbol_usage_counts_to_lexer(self, usage_counts: dict[str, int]):
+        self.sci.supply_symbol_usage_counts_to_lexer(usage_counts)
+
+    def supply_completion_indexes_to_lexer(self, asset_catalog: PyWrightAssetCatalog | None, symbol_index: PyWrightSymbolIndex | None):
+        self.sci.supply_completion_indexes_to_lexer(asset_catalog, symbol_index)
+
     def supply_font_properties_to_lexer(self, font_name: str, font_size: int, bold_font: bool):
         self.sci.supply_font_properties_to_lexer(font_name, font_size, bold_font)
 
@@ -113,6 +133,7 @@ class FileEditWidget(QWidget):
             with open(self.file_path, "w", newline="", encoding="utf-8") as f:
                 f.write(self.sci.text())
             self.sci.setModified(False)
+            self.file_saved.emit(self.file_path)
             return
 
         # The file name is probably empty. Prompt for a new file to save instead
@@ -128,6 +149,8 @@ class FileEditWidget(QWidget):
                 self.sci.setModified(False)
                 self.file_name = Path(self.file_path).name
                 self.file_name_changed.emit(self.file_name)
+                self.sci.supply_file_path_to_lexer(self.file_path)
+            self.file_saved.emit(self.file_path)
 
     def insert_at_cursor_position(self, text: str):
         [line, index] = self.sci.getCursorPosition()
@@ -147,6 +170,9 @@ class FileEditWidget(QWidget):
     def set_highlight_style(self, fill: bool):
         self.sci.set_highlight_style(fill)
 
+    def set_background_styling(self, enabled: bool):
+        self.sci.set_background_styling(enabled)
+
     def search_in_file(self, text_to_find: str, find_type: FindType, search_scope: SearchScope):
         if find_type == FindType.FIND_NEXT:
             self.find_next_in_file(text_to_find, search_scope, from_top=False)
@@ -188,11 +214,35 @@ class FileEditWidget(QWidget):
 
         self.sci.SendScintilla(QsciScintilla.SCI_SETSEL, pos, pos + len(text_to_find))
 
+    def find_all_in_file(self, text_to_find: str) -> list[SearchMatch]:
+        """Finds every occurrence of a text in one pass, and marks them all in the editor.
+            :return: The matches, from the first one to the last one."""
+        matches = self.find_matches_in_file(text_to_find)
+        self.sci.mark_matches([(match.position, match.position + match.length) for match in matches])
+        return matches
+
+    def find_matches_in_file(self, text_to_find: str) -> list[SearchMatch]:
+        """Finds every occurrence of a text in one pass, the way Find Next does, without marking them.
+            :return: The matches, from the first one to the last one."""
+        match_ranges = self.find_all_ranges(text_to_find.encode("utf-8"))
+        if len(match_ranges) == 0:
+            return []
+        return make_matches(self.get_text_bytes(), match_ranges, self.file_path)
+
+    def show_match(self, position: int, length: int):
+        """Selects a match found by find_all_in_file, and scrolls to it.
+            :param position: Start of the match, in bytes.
+            :param length: Length of the match, in bytes."""
+        self.sci.SendScintilla(QsciScintilla.SCI_SETSEL, position, position + length)
+        self.sci.SendScintilla(QsciScintilla.SCI_SCROLLCARET)
+        self.sci.setFocus()
+
     def replace_in_file(self, text_to_find: str, text_to_replace: str, replace_type: ReplaceType, search_scope: SearchScope):
         if replace_type == ReplaceType.REPLACE_NEXT:
             self.replace_next_in_file(text_to_find, text_to_replace, search_scope)
         elif replace_type == ReplaceType.REPLACE_ALL:
-            self.replace_all_in_file(text_to_find, text_to_replace)
+            replacement_count = self.replace_all_in_file(text_to_find, text_to_replace)
+            QMessageBox.information(self.parent(), "Find/Replace", "{} occurrences replaced".format(replacement_count))
 
     def replace_next_in_file(self, text_to_find: str, text_to_replace: str, search_scope: SearchScope):
         find_pos = self.find_next_in_file(text_to_find, SearchScope.SINGLE_FILE, from_top=False)
@@ -207,24 +257,84 @@ class FileEditWidget(QWidget):
         pos = self.sci.SendScintilla(QsciScintilla.SCI_GETCURRENTPOS, 0, 0)
         self.sci.SendScintilla(QsciScintilla.SCI_SETSEL, pos - len(text_to_replace), pos)
 
-    def replace_all_in_file(self, text_to_find: str, text_to_replace: str):
-        pos = self.find_next_in_file(text_to_find, SearchScope.SINGLE_FILE, from_top=True)
-        while True:
+    def replace_all_in_file(self, text_to_find: str, text_to_replace: str) -> int:
+        """Replaces every occurrence of a text, as a single step that can be undone.
+            :return: The number of replaced occurrences."""
+        encoded_text_to_find = text_to_find.encode("utf-8")
+        encoded_text_to_replace = text_to_replace.encode("utf-8")
+
+        # Find all the matches in one pass over the text
+        match_ranges = self.find_all_ranges(encoded_text_to_find)
+        if len(match_ranges) == 0:
+            return 0
+
+        # Build the replaced text from the first match to the last one in Python, then hand it to Scintilla at once:
+        # each SCI_REPLACETARGET moves the rest of the document, so one per match would take quadratic time
+        first_start = match_ranges[0][0]
+        last_end = match_ranges[-1][1]
+        data = self.get_text_bytes()
+        parts = []
+        previous_end = first_start
+        for start, end in match_ranges:
+            parts.append(data[previous_end:start])
+            parts.append(encoded_text_to_replace)
+            previous_end = end
+        replaced_data = b"".join(parts)
+
+        self.sci.beginUndoAction()
+        self.sci.SendScintilla(QsciScintilla.SCI_SETTARGETRANGE, first_start, last_end)
+        self.sci.SendScintilla(QsciScintilla.SCI_REPLACETARGET, len(replaced_data), replaced_data)
+        self.sci.endUndoAction()
+
+        return len(match_ranges)
+
+    def find_all_ranges(self, encoded_text_to_find: bytes) -> list[tuple[int, int]]:
+        """Finds every non-overlapping occurrence of a text in one forward pass,
+        with the same search flags as Find Next, so both find the same matches.
+            :return: The start and end of each match, in bytes, from the first one to the last one."""
+        match_ranges = []
+        if encoded_text_to_find == b"":
+            return match_ranges
+
+        length = self.sci.SendScintilla(QsciScintilla.SCI_GETLENGTH)
+        start = 0
+        while start < length:
+            self.sci.SendScintilla(QsciScintilla.SCI_SETTARGETRANGE, start, length)
+            pos = self.sci.SendScintilla(QsciScintilla.SCI_SEARCHINTARGET, len(encoded_text_to_find),
+                                         encoded_text_to_find)
             if pos == -1:
-                return
-
-            self.sci.SendScintilla(QsciScintilla.SCI_REPLACESEL, 0, text_to_replace.encode("utf-8"))
-            pos = self.find_next_in_file(text_to_find, SearchScope.SINGLE_FILE, from_top=False)
-
-    def get_selection_length(self):
-        # Obtain the text from selection
-        (sel_start_line, sel_start_index, sel_end_line, sel_end_index) = self.sci.getSelection()
-        start_pos = self.sci.positionFromLineIndex(sel_start_line, sel_start_index)
-        end_pos = self.sci.positionFromLineIndex(sel_end_line, sel_end_index)
-        return len(self.sci.text(start_pos, end_pos))
+                break
+
+            # Case-insensitive matches may not have the byte length of the searched text
+            end = self.sci.SendScintilla(QsciScintilla.SCI_GETTARGETEND)
+            match_ranges.append((pos, end))
+            start = max(end, pos + 1)
+
+        return match_ranges
+
+    def get_text_bytes(self) -> bytes:
+        """Returns the text of the editor, encoded the way it is saved (UTF-8, the way Scintilla stores it)."""
+        length = self.sci.SendScintilla(QsciScintilla.SCI_GETLENGTH)
+        # bytes() may return a trailing null character, hence the slicing.
+        return bytes(self.sci.bytes(0, length))[:length]
+
+    def replace_whole_text(self, text: str):
+        """Replaces the whole text of the editor, as a single step that can be undone."""
+        encoded_text = text.encode("utf-8")
+        self.sci.beginUndoAction()
+        self.sci.SendScintilla(QsciScintilla.SCI_SETTARGETRANGE, 0, self.sci.SendScintilla(QsciScintilla.SCI_GETLENGTH))
+        self.sci.SendScintilla(QsciScintilla.SCI_REPLACETARGET, len(encoded_text), encoded_text)
+        self.sci.endUndoAction()
+
+    def get_selection_length(self) -> int:
+        """Returns the number of characters selected, counted by Scintilla without copying the selected text."""
+        start_pos = self.sci.SendScintilla(QsciScintilla.SCI_GETSELECTIONSTART)
+        end_pos = self.sci.SendScintilla(QsciScintilla.SCI_GETSELECTIONEND)
+        return self.sci.SendScintilla(QsciScintilla.SCI_COUNTCHARACTERS, start_pos, end_pos)
 
     def get_current_cursor_position(self) -> tuple[int, int]:
-        return self.sci.getCursorPosition()[0], self.sci.getCursorPosition()[1]
+        line, column = self.sci.getCursorPosition()
+        return line, column
 
     def _handle_cursor_position_changed(self, line, column):
         self.cursor_position_changed.emit()
@@ -5,14 +5,14 @@ from enum import Enum
 
 from PyQt6.QtWidgets import (QDialog, QPushButton, QRadioButton,
                              QButtonGroup, QGroupBox, QVBoxLayout,
-                             QHBoxLayout, QLineEdit, QLabel, QMessageBox)
+                             QHBoxLayout, QLineEdit, QLabel, QMessageBox, QCheckBox)
 from PyQt6.QtCore import pyqtSignal
 
 
 class SearchScope(Enum):
     SINGLE_FILE = 0
     OPEN_TABS = 1
-    # ENTIRE_PROJECT = 2
+    ENTIRE_PROJECT = 2
 
 
 class FindType(Enum):
@@ -30,6 +30,10 @@ class FindReplaceDialog(QDialog):
 
     find_requested = pyqtSignal(str, FindType, SearchScope)
     replace_requested = pyqtSignal(str, str, ReplaceType, SearchScope)
+    # Text to find, and whether the built-in macros of the PyWright installation should be searched too
+    project_search_requested = pyqtSignal(str, bool)
+    # Text to find, text to replace, and whether the built-in macros should be changed too
+    project_replace_requested = pyqtSignal(str, str, bool)
 
     def __init__(self, str_to_find, parent=None):
         super().__init__(parent)
@@ -48,7 +52,8 @@ class FindReplaceDialog(QDialog):
         self._find_next_button = QPushButton("Find Next")
         self._find_next_button.pressed.connect(self._handle_find_next)
         self._find_next_button.setDefault(True)
-        # self._find_all_button = QPushButton("Find All")
+        self._find_all_button = QPushButton("Find All")
+        self._find_all_button.pressed.connect(self._handle_find_all)
 
         self._replace_next_button = QPushButton("Replace Next")
         self._replace_next_button.pressed.connect(self._handle_replace_next)
@@ -66,9 +71,11 @@ class FindReplaceDialog(QDialog):
         self._scope_open_tabs_radio_button = QRadioButton("Open Tabs")
         self._scope_open_tabs_radio_button.setChecked(self.search_scope == SearchScope.OPEN_TABS)
         self._scope_open_tabs_radio_button.clicked.connect(self._handle_radio_buttons)
-        # self._scope_entire_project_radio_button = QRadioButton("Entire Project")
-        # self._scope_entire_project_radio_button.setChecked(self.search_scope == SearchScope.ENTIRE_PROJECT)
-        # self._scope_entire_project_radio_button.clicked.connect(self._handle_radio_buttons)
+        self._scope_entire_project_radio_button = QRadioButton("Entire Project")
+        self._scope_entire_project_radio_button.setChecked(self.search_scope == SearchScope.ENTIRE_PROJECT)
+        self._scope_entire_project_radio_button.clicked.connect(self._handle_radio_buttons)
+        self._include_builtin_macros_checkbox = QCheckBox("Include the built-in macros (core/macros)")
+        self._include_builtin_macros_checkbox.setEnabled(self.search_scope == SearchScope.ENTIRE_PROJECT)
 
         self._scope_group_box = QGroupBox("Search Scope")
         self._scope_group_box_layout = QVBoxLayout()
@@ -76,11 +83,12 @@ class FindReplaceDialog(QDialog):
         self._scope_radio_buttons_group = QButtonGroup()
         self._scope_radio_buttons_group.addButton(self._scope_single_file_radio_button)
         self._scope_radio_buttons_group.addButton(self._scope_open_tabs_radio_button)
-        # self._scope_radio_buttons_group.addButton(self._scope_entire_project_radio_button)
+        self._scope_radio_buttons_group.addButton(self._scope_entire_project_radio_button)
 
         self._scope_group_box_layout.addWidget(self._scope_single_file_radio_button)
         self._scope_group_box_layout.addWidget(self._scope_open_tabs_radio_button)
-        # self._scope_group_box_layout.addWidget(self._scope_entire_project_radio_button)
+        self._scope_group_box_layout.addWidget(self._scope_entire_project_radio_button)
+        self._scope_group_box_layout.addWidget(self._include_builtin_macros_checkbox)
         self._scope_group_box.setLayout(self._scope_group_box_layout)
 
         find_row_layout = QHBoxLayout()
@@ -95,7 +103,7 @@ class FindReplaceDialog(QDialog):
 
         bottom_buttons_layout.addWidget(self._find_previous_button)
         bottom_buttons_layout.addWidget(self._find_next_button)
-        # bottom_buttons_layout.addWidget(self._find_all_button)
+        bottom_buttons_layout.addWidget(self._find_all_button)
         bottom_buttons_layout.addWidget(self._replace_next_button)
         bottom_buttons_layout.addWidget(self._replace_all_button)
         bottom_buttons_layout.addWidget(self._close_button)
@@ -114,8 +122,13 @@ class FindReplaceDialog(QDialog):
             self.search_scope = SearchScope.SINGLE_FILE
         elif self._scope_open_tabs_radio_button.isChecked():
             self.search_scope = SearchScope.OPEN_TABS
-        # elif self._scope_entire_project_radio_button.isChecked():
-        #     self.search_scope = SearchScope.ENTIRE_PROJECT
+        elif self._scope_entire_project_radio_button.isChecked():
+            self.search_scope = SearchScope.ENTIRE_PROJECT
+
+        # Searching the entire project lists all the matches at once, there is no next one to replace
+        is_entire_project = self.search_scope == SearchScope.ENTIRE_PROJECT
+        self._include_builtin_macros_checkbox.setEnabled(is_entire_project)
+        self._replace_next_button.setEnabled(not is_entire_project)
 
     def _handle_find_previous(self):
         find_text = self._find_line_edit.text()
@@ -123,6 +136,10 @@ class FindReplaceDialog(QDialog):
             QMessageBox.critical(self, "Error", "Find text cannot be empty!")
             return
 
+        if self.search_scope == SearchScope.ENTIRE_PROJECT:
+            self.project_search_requested.emit(find_text, self._include_builtin_macros_checkbox.isChecked())
+            return
+
         self.find_requested.emit(find_text, FindType.FIND_PREVIOUS, self.search_scope)
 
     def _handle_find_next(self):
@@ -131,8 +148,24 @@ class FindReplaceDialog(QDialog):
             QMessageBox.critical(self, "Error", "Find text cannot be empty!")
             return
 
+        if self.search_scope == SearchScope.ENTIRE_PROJECT:
+            self.project_search_requested.emit(find_text, self._include_builtin_macros_checkbox.isChecked())
+            return
+
         self.find_requested.emit(find_text, FindType.FIND_NEXT, self.search_scope)
 
+    def _handle_find_all(self):
+        find_text = self._find_line_edit.text()
+        if find_text.isspace() or find_text == "":
+            QMessageBox.critical(self, "Error", "Find text cannot be empty!")
+            return
+
+        if self.search_scope == SearchScope.ENTIRE_PROJECT:
+            self.project_search_requested.emit(find_text, self._include_builtin_macros_checkbox.isChecked())
+            return
+
+        self.find_requested.emit(find_text, FindType.FIND_ALL, self.search_scope)
+
     def _handle_replace_next(self):
         find_text = self._find_line_edit.text()
         replace_text = self._replace_line_edit.text()
@@ -159,4 +192,9 @@ class FindReplaceDialog(QDialog):
             QMessageBox.critical(self, "Error", "Replace text cannot be empty!")
             return
 
+        if self.search_scope == SearchScope.ENTIRE_PROJECT:
+            self.project_replace_requested.emit(find_text, replace_text,
+                                                self._include_builtin_macros_checkbox.isChecked())
+            return
+
         self.replace_requested.emit(find_text, replace_text, ReplaceType.REPLACE_ALL, self.search_scope)
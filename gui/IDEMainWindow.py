@@ -18,9 +18,17 @@ from .FindReplaceDialog import FindReplaceDialog
 from .AssetBrowserRootWidget import AssetBrowserRootWidget
 from .FileEditWidget import FileEditWidget
 from .MissingFilesDialog import MissingFilesDialog
+from .SymbolReferencesWidget import SymbolReferencesWidget
+from .ProjectSearchResultsWidget import ProjectSearchResultsWidget
+from .ProjectReplacePreviewDialog import ProjectReplacePreviewDialog
 
 from data import IDESettings, ColorThemes, PyWrightFolder
+from data.PyWrightAssetCatalog import get_asset_catalog_service
 from data.PyWrightGame import PyWrightGameInfo
+from data.PyWrightGameLoader import PyWrightGameLoader
+from data.PyWrightSymbolIndex import PyWrightSymbolIndexer
+from data.PyWrightProjectSearch import PyWrightProjectSearcher
+from data.PyWrightProjectReplace import PyWrightProjectReplacer, ReplaceJournal
 
 
 class IDEMainWindow(QMainWindow):
@@ -39,6 +47,25 @@ class IDEMainWindow(QMainWindow):
 
         self.recent_folders = IDESettings.get_recent_games()
 
+        # Parses the macros of the selected game in the background, once its data.txt and intro.txt are read
+        self.game_loader = PyWrightGameLoader(self)
+        # Index of the labels, macros, flags... of the selected game, built in the background
+        self.symbol_indexer = PyWrightSymbolIndexer(self)
+        # Index of the art, music and sound effect names of the selected game, for the autocompletion
+        self.asset_catalog_service = get_asset_catalog_service()
+        # Searches in all the scripts of the selected game, for the "Entire Project" search scope
+        self.project_searcher = PyWrightProjectSearcher(self)
+        # Finds what a project-wide replace is going to change, then changes it
+        self._replace_searcher = PyWrightProjectSearcher(self)
+        self._replace_matches: dict[str, list] = {}
+        self._replace_texts = ("", "")
+        self.project_replacer = PyWrightProjectReplacer(self)
+        self._last_replace_journal: ReplaceJournal | None = None
+        # Backups of replaces of IDEs that were closed or crashed, they can't be undone anymore
+        ReplaceJournal.delete_leftover_folders()
+        # Files restored and left as they are in the tabs, while the undo of the other ones runs
+        self._undo_results: tuple[list[str], list[str]] = ([], [])
+
         self.setWindowTitle("PyWright IDE")
         self.setWindowIcon(QIcon("res/icons/ideicon.png"))
         self.setMinimumSize(720, 540)
@@ -49,6 +76,10 @@ class IDEMainWindow(QMainWindow):
         self.asset_manager_widget = AssetBrowserRootWidget(self)
         self.logger_view = PyWrightLoggerWidget()
         self.logger_view.hide()
+        self.references_view = SymbolReferencesWidget(self)
+        self.references_view.hide()
+        self.search_results_view = ProjectSearchResultsWidget(self)
+        self.search_results_view.hide()
 
         self.central_widget = MainWindowCentralWidget(self)
 
@@ -77,6 +108,36 @@ class IDEMainWindow(QMainWindow):
         self.central_widget.update_save_button_requested.connect(self._top_toolbar.update_save_button)
         self.central_widget.current_tab_cursor_position_changed.connect(self.status_bar.set_cursor_position_info)
         self.central_widget.selection_length_changed.connect(self.status_bar.set_selection_length_info)
+        self.central_widget.definition_requested.connect(self._handle_definition_request)
+        self.central_widget.references_requested.connect(self._handle_references_request)
+        self.central_widget.file_saved.connect(self.symbol_indexer.update_file)
+        self.central_widget.file_saved.connect(self._update_symbol_usage_counts)
+        self.symbol_indexer.index_ready.connect(self._update_symbol_usage_counts)
+        self.symbol_indexer.index_ready.connect(self._update_completion_indexes)
+        self.asset_catalog_service.catalog_ready.connect(self._update_completion_indexes)
+        self.asset_catalog_service.catalog_ready.connect(self._update_asset_browsers)
+        self.game_loader.builtin_macros_loaded.connect(self.central_widget.set_builtin_macros)
+        self.game_loader.game_macros_loaded.connect(self.central_widget.set_game_macros)
+        self.game_loader.case_macros_loaded.connect(self.central_widget.set_case_macros)
+        self.game_loader.progress_changed.connect(self.status_bar.set_loading_progress)
+        self.references_view.open_location_requested.connect(self.central_widget.open_file_at_line)
+
+        self.search_results_view.open_location_requested.connect(self.central_widget.open_file_at_line)
+        self.search_results_view.open_match_requested.connect(self.central_widget.show_match)
+        self.search_results_view.cancel_requested.connect(self.project_searcher.cancel)
+        self.central_widget.find_all_results_ready.connect(self._handle_find_all_results)
+        self.project_searcher.search_started.connect(self.search_results_view.set_file_count)
+        self.project_searcher.matches_found.connect(self._handle_project_search_matches)
+        self.project_searcher.progress_changed.connect(self.search_results_view.set_progress)
+        self.project_searcher.search_finished.connect(self.search_results_view.finish_search)
+
+        self.search_results_view.undo_replace_requested.connect(self._handle_undo_project_replace_request)
+        self._replace_searcher.matches_found.connect(self._handle_project_replace_matches)
+        self._replace_searcher.search_finished.connect(self._handle_project_replace_search_finished)
+        self.project_replacer.progress_changed.connect(
+            lambda done, total: self.status_bar.showMessage("Replacing... {}/{} files".format(done, total)))
+        self.project_replacer.replace_finished.connect(self._handle_project_replace_finished)
+        self.project_replacer.undo_finished.connect(self._handle_undo_project_replace_finished)
 
         self.directory_view.open_new_tab.connect(self.central_widget.open_new_editing_tab)
         self.directory_view.open_game_properties_tab.connect(
@@ -89,6 +150,8 @@ class IDEMainWindow(QMainWindow):
         self.addDockWidget(Qt.DockWidgetArea.LeftDockWidgetArea, self.directory_view)
         self.addDockWidget(Qt.DockWidgetArea.RightDockWidgetArea, self.asset_manager_widget)
         self.addDockWidget(Qt.DockWidgetArea.BottomDockWidgetArea, self.logger_view)
+        self.addDockWidget(Qt.DockWidgetArea.BottomDockWidgetArea, self.references_view)
+        self.addDockWidget(Qt.DockWidgetArea.BottomDockWidgetArea, self.search_results_view)
 
         # Try to load the last open game here, if the option is enabled, and the game folder still exists.
         if selected_game_path != "":
@@ -117,7 +180,8 @@ class IDEMainWindow(QMainWindow):
 
     def pick_game_folder(self, game_folder_path: Path):
         if self.central_widget.attempt_closing_unsaved_tabs():
-            self.selected_game_info = PyWrightGameInfo.load_from_folder(game_folder_path)
+            # Only data.txt and intro.txt are read right away, the macros are parsed in the background
+            self.selected_game_info = PyWrightGameInfo.load_metadata_from_folder(game_folder_path)
             self.selected_pywright_installation = str(self.selected_game_info.pywright_folder_path)
 
             self.directory_view.clear_directory_view()
@@ -127,19 +191,32 @@ class IDEMainWindow(QMainWindow):
             self.status_bar.set_installation_path_info(self.selected_pywright_installation)
 
             self.pywright_executable_name = PyWrightFolder.pick_pywright_executable(self.selected_pywright_installation)
+            self.project_searcher.cancel()
+            self._replace_searcher.cancel()
+            self._set_last_replace_journal(None)
+            self.search_results_view.set_undo_replace_enabled(False)
+            self.symbol_indexer.index_game(game_folder_path)
+            self.asset_catalog_service.load_game(self.selected_game_info.pywright_folder_path, game_folder_path,
+                                                 self.selected_game_info.game_cases)
+            # The asset browsers are filled once the assets of the game are cataloged
+            self.asset_manager_widget.clear_everything()
             self.central_widget.set_selected_game(self.selected_game_info)
             self._add_folder_to_recent(str(game_folder_path))
             self._top_toolbar.update_run_pywright_status_tip(self.pywright_executable_name)
             self._top_toolbar.update_toolbar_buttons(self.selected_pywright_installation != "",
                                                      self.selected_game_info.get_game_name() != "")
-            self.asset_manager_widget.update_assets(self.selected_game_info)
 
             self.directory_view.update_directory_view(self.selected_game_info)
 
-            self.asset_manager_widget.update_assets(self.selected_game_info)
+            self.game_loader.load(self.selected_game_info)
 
             self.setWindowTitle("PyWright IDE - {}".format(self.selected_game_info.game_title))
 
+    def _update_asset_browsers(self, *args):
+        asset_catalog = self.asset_catalog_service.catalog
+        if self.selected_game_info is not None and asset_catalog is not None:
+            self.asset_manager_widget.update_assets(self.selected_game_info, asset_catalog)
+
     def pick_game_folder_and_open_game_properties_tab(self, game_path: Path):
         self.pick_game_folder(game_path)
         self.central_widget.open_game_properties_tab()
@@ -195,11 +272,173 @@ class IDEMainWindow(QMainWindow):
         self.find_replace_dialog = FindReplaceDialog(string_to_find, self)
         self.find_replace_dialog.find_requested.connect(self.central_widget.handle_find_signals)
         self.find_replace_dialog.replace_requested.connect(self.central_widget.handle_replace_signals)
+        self.find_replace_dialog.project_search_requested.connect(self._handle_project_search_request)
+        self.find_replace_dialog.project_replace_requested.connect(self._handle_project_replace_request)
         self.find_replace_dialog.show()
 
+    def _handle_project_search_request(self, text_to_find: str, include_builtin_macros: bool):
+        if self.selected_game_info is None:
+            QMessageBox.information(self, "Find/Replace", "There is no game open.")
+            return
+
+        game_path = self.selected_game_info.game_path
+        builtin_macros_path = self.selected_game_info.pywright_folder_path / "core" / "macros" \
+            if include_builtin_macros else None
+
+        # Cancelled before the panel is reset, so that the end of the previous search isn't shown for the new one
+        self.project_searcher.cancel()
+        self.search_results_view.start_search(text_to_find, game_path)
+        self.project_searcher.search(text_to_find, game_path, builtin_macros_path)
+
+    def _handle_find_all_results(self, text_to_find: str, results: list):
+        game_path = self.selected_game_info.game_path if self.selected_game_info is not None else Path()
+        # Find All takes over the panel, matches of a running project search must not be added to it
+        self.project_searcher.cancel()
+        self.search_results_view.show_find_all_results(text_to_find, results, game_path)
+
+    def _handle_project_search_matches(self, matches: list):
+        if not self.search_results_view.add_matches(matches):
+            self.project_searcher.cancel()
+
+    def _handle_project_replace_request(self, text_to_find: str, text_to_replace: str, include_builtin_macros: bool):
+        if self.selected_game_info is None:
+            QMessageBox.information(self, "Find/Replace", "There is no game open.")
+            return
+        if self.project_replacer.is_busy():
+            QMessageBox.information(self, "Find/Replace", "Another replace is still running.")
+            return
+
+        game_path = self.selected_game_info.game_path
+        builtin_macros_path = self.selected_game_info.pywright_folder_path / "core" / "macros" \
+            if include_builtin_macros else None
+
+        self._replace_matches = {}
+        self._replace_texts = (text_to_find, text_to_replace)
+        self.status_bar.showMessage("Looking for the matches to replace...")
+        self._replace_searcher.search(text_to_find, game_path, builtin_macros_path)
+
+    def _handle_project_replace_matches(self, matches: list):
+        for match in matches:
+            self._replace_matches.setdefault(match.file_path, []).append(match)
+
+    def _handle_project_replace_search_finished(self, cancelled: bool):
+        self.status_bar.clearMessage()
+        if cancelled:
+            return
+
+        text_to_find, text_to_replace = self._replace_texts
+
+        # Open files are changed in their tabs, so what matters is their text in the editor, not on disk
+        matches_by_file = self._replace_matches
+        for file_path, matches in self.central_widget.find_in_open_files(text_to_find).items():
+            if file_path in matches_by_file or self._is_searched_project_file(file_path):
+                matches_by_file[file_path] = matches
+        matches_by_file = {file_path: matches for file_path, matches in matches_by_file.items() if len(matches) > 0}
+        self._replace_matches = {}
+
+        if len(matches_by_file) == 0:
+            QMessageBox.information(self, "Find/Replace", "The text couldn't be found.")
+            return
+
+        preview_dialog = ProjectReplacePreviewDialog(self, matches_by_file, text_to_find, text_to_replace,
+                                                     self.selected_game_info.game_path)
+        if preview_dialog.exec() != ProjectReplacePreviewDialog.DialogCode.Accepted:
+            return
+
+        journal = None
+        try:
+            journal = ReplaceJournal(text_to_find, text_to_replace)
+            files_not_open = self.central_widget.replace_in_open_files(journal, list(matches_by_file.keys()))
+        except OSError as e:
+            if journal is not None and len(journal.entries) > 0:
+                # Some tabs were changed already, keep their backups so that they can be undone
+                self._handle_project_replace_finished(journal)
+                QMessageBox.critical(self, "Error", "The replace was stopped after changing {} open files: {}"
+                                     .format(len(journal.entries), e))
+                return
+            # The previous replace can still be undone, its backups are in another folder
+            if journal is not None:
+                journal.discard()
+            QMessageBox.critical(self, "Error", "The replace couldn't be started: {}".format(e))
+            return
+        self.project_replacer.replace(journal, {file_path: matches_by_file[file_path]
+                                                for file_path in files_not_open})
+
+    def _is_searched_project_file(self, file_path: str) -> bool:
+        path = Path(file_path)
+        return path.suffix.lower() in (".txt", ".mcro") and path.is_relative_to(self.selected_game_info.game_path)
+
+    def _handle_project_replace_finished(self, journal: ReplaceJournal):
+        self.status_bar.clearMessage()
+        # Only now that this replace is done, the previous one can't be undone anymore
+        self._set_last_replace_journal(journal)
+        self.search_results_view.show_replace_result(journal, self.selected_game_info.game_path)
+
+        for entry in journal.entries:
+            self.symbol_indexer.update_file(entry.file_path)
+
+    def _handle_undo_project_replace_request(self):
+        journal = self._last_replace_journal
+        if journal is None or self.project_replacer.is_busy():
+            return
+
+        restored_file_paths, skipped_file_paths, entries_not_open = \
+            self.central_widget.undo_replace_in_open_files(journal)
+        self._undo_results = (restored_file_paths, skipped_file_paths)
+        self.project_replacer.undo(journal, entries_not_open)
+
+    def _handle_undo_project_replace_finished(self, restored_file_paths: list[str], skipped_file_paths: list[str]):
+        self.status_bar.clearMessage()
+        self._set_last_replace_journal(None)
+
+        tab_restored_file_paths, tab_skipped_file_paths = self._undo_results
+        self.search_results_view.show_undo_result(tab_restored_file_paths + restored_file_paths,
+                                                  tab_skipped_file_paths + skipped_file_paths)
+
+        for file_path in restored_file_paths:
+            self.symbol_indexer.update_file(file_path)
+
+    def _set_last_replace_journal(self, journal: ReplaceJournal | None):
+        """Replaces the journal that Undo Replace uses, deleting the backups of the previous one."""
+        if self._last_replace_journal is not None and self._last_replace_journal is not journal:
+            self._last_replace_journal.discard()
+        self._last_replace_journal = journal
+
     def _handle_insert_into_cursor(self, command: str):
         self.central_widget.handle_insert_into_cursor(command)
 
+    def _handle_definition_request(self, file_path: str, name: str, kind: str):
+        index = self.symbol_indexer.index
+        if index is None:
+            self.status_bar.showMessage("The game is still being indexed, please try again in a moment.", 3000)
+            return
+
+        definitions = index.find_definitions(name, file_path, kind if kind != "" else None)
+        if len(definitions) == 0:
+            self.status_bar.showMessage("No definition found for \"{}\".".format(name), 3000)
+            return
+
+        self.central_widget.open_file_at_line(definitions[0].file_path, definitions[0].line)
+
+        # Let the user pick if there are several of them
+        if len(definitions) > 1:
+            self.references_view.show_references(name, definitions, self.selected_game_info.game_path)
+
+    def _update_symbol_usage_counts(self, *args):
+        index = self.symbol_indexer.index
+        self.central_widget.set_symbol_usage_counts(index.get_usage_counts() if index is not None else {})
+
+    def _update_completion_indexes(self, *args):
+        self.central_widget.set_completion_indexes(self.asset_catalog_service.catalog, self.symbol_indexer.index)
+
+    def _handle_references_request(self, file_path: str, name: str):
+        index = self.symbol_indexer.index
+        if index is None:
+            self.status_bar.showMessage("The game is still being indexed, please try again in a moment.", 3000)
+            return
+
+        self.references_view.show_references(name, index.find_references(name), self.selected_game_info.game_path)
+
     def _handle_settings(self):
         settings_dialog = SettingsDialog(self)
         settings_dialog.settings_changed.connect(self._apply_settings)
@@ -254,5 +493,10 @@ class IDEMainWindow(QMainWindow):
         IDESettings.set_window_geometry(self.saveGeometry())
         IDESettings.set_window_state(self.saveState())
 
+        self.project_searcher.cancel()
+        self._replace_searcher.cancel()
+        self.game_loader.cancel()
         self.asset_manager_widget.deinit()
+        if not self.project_replacer.is_busy():
+            self._set_last_replace_journal(None)
         event.accept()
@@ -1,16 +1,30 @@
 import re
 
 from PyQt6.Qsci import QsciScintilla
-from PyQt6.QtCore import Qt
-from PyQt6.QtGui import QColor, QKeyEvent
+from PyQt6.QtCore import Qt, QObject, QRunnable, QThreadPool, QTimer, pyqtSignal
+from PyQt6.QtGui import QColor, QKeyEvent, QMouseEvent
 
 from data import EditorThemes, IDESettings
+from data.PyWrightAssetCatalog import PyWrightAssetCatalog
 from data.PyWrightScriptLexer import PyWrightScriptLexer
+from data.PyWrightScriptTokenizer import PyWrightScriptTokenizer
+from data.PyWrightSymbolIndex import PyWrightSymbolIndex, SYMBOL_LABEL, SYMBOL_MACRO, SYMBOL_SCRIPT_FILE
 
 
+_FIND_ALL_INDICATOR_ID = 29
 _HIGHLIGHT_INDICATOR_ID = 30
 _PARAM_HILIGHT_INDICATOR_ID = 31 # why do we start at 30?
 
+# Occurrences of the selected text are highlighted once the selection stopped changing for this long (in ms)
+_OCCURRENCE_HIGHLIGHTING_DELAY = 150
+# Selections longer than this (in bytes) don't get their occurrences highlighted
+_OCCURRENCE_MAX_LENGTH = 1000
+
+# Lazy styling: requests bigger than a chunk only get the visible lines (plus a margin) styled right away,
+# the rest being styled a chunk at a time when the IDE is idle.
+_LAZY_STYLING_CHUNK_LINES = 500
+_LAZY_STYLING_MARGIN_LINES = 50
+
 
 class ParameterBoxManager:
     def __init__(self, parent: "IDEScintillaWidget"):
@@ -161,11 +175,35 @@ class ParameterBoxManager:
 
 
 
+class _BackgroundStylingSignals(QObject):
+    # Document version, start position, style bytes
+    finished = pyqtSignal(int, int, bytes)
+
+
+class _BackgroundStylingTask(QRunnable):
+    """Computes the styles of a snapshot of a part of the document, in a thread of the global thread pool."""
+
+    def __init__(self, tokenizer: PyWrightScriptTokenizer, text: bytes, start: int, version: int):
+        super().__init__()
+        self.signals = _BackgroundStylingSignals()
+        self._tokenizer = tokenizer
+        self._text = text
+        self._start = start
+        self._version = version
+
+    def run(self):
+        styles = self._tokenizer.tokenize(self._text).to_style_bytes(len(self._text))
+        self.signals.finished.emit(self._version, self._start, styles)
+
+
 class IDEScintillaWidget(QsciScintilla):
     """Custom Scintilla component with jumping to next parameter with tab support"""
 
-    _highlight_in_progress = False
-    """Ensures _highlight_all_occurences() runs only once"""
+    definition_requested = pyqtSignal(str, str)
+    """Name of the symbol to go to the definition of (F12 or Ctrl+click), and its kind (a SYMBOL_ constant, "" if unknown)"""
+
+    references_requested = pyqtSignal(str)
+    """Name of the symbol to list the references of (Shift+F12)"""
 
     def __init__(self, parent=None):
         super().__init__(parent)
@@ -183,6 +221,8 @@ class IDEScintillaWidget(QsciScintilla):
 
         self.set_highlight_style(IDESettings.get_highlight_fill_rect())
         self.setIndicatorDrawUnder(True, _HIGHLIGHT_INDICATOR_ID)
+        self.indicatorDefine(QsciScintilla.IndicatorStyle.RoundBoxIndicator, _FIND_ALL_INDICATOR_ID)
+        self.setIndicatorDrawUnder(True, _FIND_ALL_INDICATOR_ID)
 
         # For parameter autocompletion with tab:
         self.parameter_manager = ParameterBoxManager(self)
@@ -191,6 +231,34 @@ class IDEScintillaWidget(QsciScintilla):
         self.setup_autocompletion()
         self.setLexer(self._lexer)
 
+        # Background styling: styles computed from an older version of the document are dropped
+        self._document_version = 0
+        self.textChanged.connect(self._increment_document_version)
+        self._lexer.background_styling_requested.connect(self._start_background_styling)
+        self.set_background_styling(IDESettings.get_background_styling())
+
+        # Lazy styling: sorted and disjoint [start, end) line ranges that still have to be styled
+        self._pending_styling_lines: list[tuple[int, int]] = []
+        self._lazy_styling_timer = QTimer(self)
+        self._lazy_styling_timer.setInterval(0)
+        self._lazy_styling_timer.timeout.connect(self._style_next_pending_chunk)
+        self._lexer.lazy_styling_requested.connect(self._handle_lazy_styling_request)
+        self._lexer.lazy_styling = True
+        self.SCN_MODIFIED.connect(self._shift_pending_styling_lines)
+        self.verticalScrollBar().valueChanged.connect(self._style_pending_visible_lines)
+
+        # Occurrence highlighting: the visible lines are highlighted first, the other ones as they get scrolled to.
+        # Sorted and disjoint [start, end) byte ranges already searched for the selected text
+        self._occurrence_text = b""
+        self._occurrence_selection_start = -1
+        self._occurrence_searched_ranges: list[tuple[int, int]] = []
+        self._occurrence_highlighting_timer = QTimer(self)
+        self._occurrence_highlighting_timer.setSingleShot(True)
+        self._occurrence_highlighting_timer.setInterval(_OCCURRENCE_HIGHLIGHTING_DELAY)
+        self._occurrence_highlighting_timer.timeout.connect(self._update_occurrence_highlights)
+        self.SCN_MODIFIED.connect(self._handle_modification_for_occurrences)
+        self.verticalScrollBar().valueChanged.connect(self._highlight_visible_occurrences)
+
     def startParameterInsertion(self, line: int, indices:list[int], parameter_amount: int):
         self.parameter_manager.startParameterInsertion(line, indices, parameter_amount)
 
@@ -209,9 +277,63 @@ class IDEScintillaWidget(QsciScintilla):
             except Exception as e:
                 import traceback
                 traceback.print_exception(e)
+        elif event.key() == Qt.Key.Key_F12:
+            name, kind = self.get_symbol_at_cursor()
+            if name != "":
+                if event.modifiers() & Qt.KeyboardModifier.ShiftModifier:
+                    self.references_requested.emit(name)
+                else:
+                    self.definition_requested.emit(name, kind)
         else:
             super().keyPressEvent(event)
 
+    def mouseReleaseEvent(self, event: QMouseEvent):
+        super().mouseReleaseEvent(event)
+
+        # Ctrl+click: go to definition of what was clicked (the click already moved the cursor there)
+        if event.button() == Qt.MouseButton.LeftButton and event.modifiers() & Qt.KeyboardModifier.ControlModifier:
+            name, kind = self.get_symbol_at_cursor()
+            if name != "":
+                self.definition_requested.emit(name, kind)
+
+    def get_symbol_at_cursor(self) -> tuple[str, str]:
+        """Finds the label, script or macro name under the cursor.
+        :return: The name ("" if there is none) and its kind (SYMBOL_LABEL, SYMBOL_SCRIPT_FILE, SYMBOL_MACRO or "" if unknown)."""
+        line, index = self.getCursorPosition()
+        text = self.text(line)
+
+        start = index
+        while start > 0 and not text[start - 1].isspace():
+            start -= 1
+        end = index
+        while end < len(text) and not text[end].isspace():
+            end += 1
+
+        word = text[start:end]
+        if word == "":
+            return "", ""
+
+        command = text.split(maxsplit=1)[0]
+        is_first_word = text[:start].strip() == ""
+        kind = ""
+
+        if "=" in word:
+            # Named parameter, such as fail=label
+            parameter, word = word.split("=", maxsplit=1)
+            if parameter in ("fail", "jumpto", "label"):
+                kind = SYMBOL_LABEL
+        elif word.startswith("{"):
+            # Macro call inside of a string, such as {macro_name}
+            kind = SYMBOL_MACRO
+        elif is_first_word:
+            kind = SYMBOL_MACRO
+        elif command == "goto":
+            kind = SYMBOL_LABEL
+        elif command in ("script", "include"):
+            kind = SYMBOL_SCRIPT_FILE
+
+        return word.strip("{}?\"“”"), kind
+
     def setup_autocompletion(self):
         # The autocompletion should be used from an API source to have a custom list of proposals
         threshold = IDESettings.get_autocompletion_trigger_threshold() if IDESettings.get_enable_autocompletion_check() else 0
@@ -230,12 +352,173 @@ class IDEScintillaWidget(QsciScintilla):
 
     def supply_builtin_macros_to_lexer(self, builtin_macros: list[str]):
         self._lexer.set_builtin_macros(builtin_macros)
+        self._restyle_document()
 
     def supply_game_macros_to_lexer(self, game_macros: list[str]):
         self._lexer.set_game_macros(game_macros)
+        self._restyle_document()
 
     def supply_case_macros_to_lexer(self, case_macros: list[str]):
         self._lexer.set_case_macros(case_macros)
+        self._restyle_document()
+
+    def _restyle_document(self):
+        """Has the whole text styled again, after the way tokens are classified changed.
+        Scintilla then requests the styles of the lines it shows, through the lazy or background styling."""
+        self._increment_document_version()
+        self.SendScintilla(QsciScintilla.SCI_STARTSTYLING, 0)
+        self.viewport().update()
+
+    def supply_symbol_usage_counts_to_lexer(self, usage_counts: dict[str, int]):
+        self._lexer.set_symbol_usage_counts(usage_counts)
+
+    def supply_completion_indexes_to_lexer(self, asset_catalog: PyWrightAssetCatalog | None, symbol_index: PyWrightSymbolIndex | None):
+        self._lexer.set_completion_indexes(asset_catalog, symbol_index)
+
+    def supply_file_path_to_lexer(self, file_path: str):
+        self._lexer.set_file_path(file_path)
+
+    def set_background_styling(self, enabled: bool):
+        """Enables or disables computing the styles in a background thread, the text staying unstyled until they arrive."""
+        self._lexer.background_styling = enabled
+
+    def _position_from_line(self, line: int) -> int:
+        if line >= self.lines():
+            return self.length()
+        return self.SendScintilla(QsciScintilla.SCI_POSITIONFROMLINE, line)
+
+    def _get_visible_lines(self) -> tuple[int, int]:
+        """:return: The [first, last) document lines on screen, extended by the lazy styling margin."""
+        first_visible = self.SendScintilla(QsciScintilla.SCI_GETFIRSTVISIBLELINE)
+        first = self.SendScintilla(QsciScintilla.SCI_DOCLINEFROMVISIBLE, first_visible)
+        last = self.SendScintilla(QsciScintilla.SCI_DOCLINEFROMVISIBLE,
+                                  first_visible + self.SendScintilla(QsciScintilla.SCI_LINESONSCREEN))
+        return max(0, first - _LAZY_STYLING_MARGIN_LINES), last + 1 + _LAZY_STYLING_MARGIN_LINES
+
+    def _style_lines(self, start_line: int, end_line: int):
+        """Styles the [start_line, end_line) lines right away, without changing which part of the document
+        Scintilla considers as styled, and removes them from the pending lines."""
+        end_styled = self.SendScintilla(QsciScintilla.SCI_GETENDSTYLED)
+        self._lexer.style_range(self._position_from_line(start_line), self._position_from_line(end_line))
+        self.SendScintilla(QsciScintilla.SCI_STARTSTYLING, end_styled)
+
+        remaining: list[tuple[int, int]] = []
+        for start, end in self._pending_styling_lines:
+            if start < start_line:
+                remaining.append((start, min(end, start_line)))
+            if end > end_line:
+                remaining.append((max(start, end_line), end))
+        self._pending_styling_lines = remaining
+
+    def _add_pending_styling_lines(self, start_line: int, end_line: int):
+        if end_line <= start_line:
+            return
+
+        merged: list[tuple[int, int]] = []
+        for start, end in sorted([*self._pending_styling_lines, (start_line, end_line)]):
+            if merged and start <= merged[-1][1]:
+                merged[-1] = (merged[-1][0], max(merged[-1][1], end))
+            else:
+                merged.append((start, end))
+        self._pending_styling_lines = merged
+
+        self._lazy_styling_timer.start()
+
+    def _handle_lazy_styling_request(self, start: int, end: int):
+        start_line = self.SendScintilla(QsciScintilla.SCI_LINEFROMPOSITION, start)
+        end_line = self.SendScintilla(QsciScintilla.SCI_LINEFROMPOSITION, end - 1) + 1
+
+        if end_line - start_line <= _LAZY_STYLING_CHUNK_LINES:
+            self._lexer.style_range(start, end)
+            return
+
+        # Only style the visible part of the range, and leave the rest for later
+        visible_start, visible_end = self._get_visible_lines()
+        visible_start = max(visible_start, start_line)
+        visible_end = min(visible_end, end_line)
+
+        if visible_start < visible_end:
+            self._add_pending_styling_lines(start_line, visible_start)
+            self._add_pending_styling_lines(visible_end, end_line)
+            self._lexer.style_range(self._position_from_line(visible_start), self._position_from_line(visible_end))
+        else:
+            self._add_pending_styling_lines(start_line, end_line)
+
+        # Tell Scintilla the whole range is handled
+        self.SendScintilla(QsciScintilla.SCI_STARTSTYLING, end)
+
+    def _style_pending_visible_lines(self):
+        visible_start, visible_end = self._get_visible_lines()
+        for start, end in list(self._pending_styling_lines):
+            if start < visible_end and end > visible_start:
+                self._style_lines(max(start, visible_start), min(end, visible_end))
+
+    def _style_next_pending_chunk(self):
+        # Drop what is past the end of the document
+        line_count = self.lines()
+        self._pending_styling_lines = [(start, min(end, line_count))
+                                       for start, end in self._pending_styling_lines if start < line_count]
+        if not self._pending_styling_lines:
+            self._lazy_styling_timer.stop()
+            return
+
+        # Style the chunk that is the closest to the visible lines, so the styling follows the scroll position
+        visible_start, visible_end = self._get_visible_lines()
+
+        def distance(line_range: tuple[int, int]) -> int:
+            start, end = line_range
+            return max(start - visible_end, visible_start - end, 0)
+
+        start, end = min(self._pending_styling_lines, key=distance)
+        if end <= visible_start:
+            # The range is above the visible lines: style its end first
+            self._style_lines(max(start, end - _LAZY_STYLING_CHUNK_LINES), end)
+        else:
+            self._style_lines(max(start, visible_start), min(end, max(start, visible_start) + _LAZY_STYLING_CHUNK_LINES))
+
+    def _shift_pending_styling_lines(self, position: int, modification_type: int, text, length: int, lines_added: int, *args):
+        """Moves the pending lines after an edit, so they still match the text they belong to."""
+        if lines_added == 0 or not self._pending_styling_lines:
+            return
+
+        edit_line = self.SendScintilla(QsciScintilla.SCI_LINEFROMPOSITION, position)
+
+        shifted: list[tuple[int, int]] = []
+        for start, end in self._pending_styling_lines:
+            if start > edit_line:
+                start = max(edit_line + 1, start + lines_added)
+            if end > edit_line:
+                end = max(edit_line + 1, end + lines_added)
+            if end > start:
+                shifted.append((start, end))
+        self._pending_styling_lines = shifted
+
+    def _increment_document_version(self):
+        self._document_version += 1
+
+    def _start_background_styling(self, start: int, end: int):
+        # Take a snapshot of the range, the document may change while the task is running
+        text = bytes(self.bytes(start, end))[:end - start]
+
+        task = _BackgroundStylingTask(self._lexer.copy_tokenizer(), text, start, self._document_version)
+        task.signals.finished.connect(self._apply_background_styling)
+        QThreadPool.globalInstance().start(task)
+
+    def _apply_background_styling(self, version: int, start: int, styles: bytes):
+        end_styled = self.SendScintilla(QsciScintilla.SCI_GETENDSTYLED)
+
+        if version != self._document_version:
+            # The styles are outdated: have the range requested again, unless the document already needs to be restyled from before it
+            if start < end_styled:
+                self.SendScintilla(QsciScintilla.SCI_STARTSTYLING, start)
+                self.viewport().update()
+            return
+
+        self.SendScintilla(QsciScintilla.SCI_STARTSTYLING, start)
+        self.SendScintilla(QsciScintilla.SCI_SETSTYLINGEX, len(styles), styles)
+
+        # Other ranges may have been requested after this one, don't request them again
+        self.SendScintilla(QsciScintilla.SCI_STARTSTYLING, max(end_styled, start + len(styles)))
 
     def supply_font_properties_to_lexer(self, font_name: str, font_size: int, bold_font: bool):
         self._lexer.set_font_properties(font_name, font_size, bold_font)
@@ -251,6 +534,10 @@ class IDEScintillaWidget(QsciScintilla):
                                          _HIGHLIGHT_INDICATOR_ID)
         self.setIndicatorOutlineColor(QColor(EditorThemes.current_editor_theme.match_highlight_color.paper_color),
                                       _HIGHLIGHT_INDICATOR_ID)
+        self.setIndicatorForegroundColor(QColor(EditorThemes.current_editor_theme.match_highlight_color.paper_color),
+                                         _FIND_ALL_INDICATOR_ID)
+        self.setIndicatorOutlineColor(QColor(EditorThemes.current_editor_theme.match_highlight_color.paper_color),
+                                      _FIND_ALL_INDICATOR_ID)
 
         # Parameter boxes:
         parameterBoxColor = EditorThemes.current_editor_theme.parameter_boxes_color.paper_color
@@ -258,46 +545,112 @@ class IDEScintillaWidget(QsciScintilla):
         self.setIndicatorOutlineColor(   QColor("#ff000000"),       _PARAM_HILIGHT_INDICATOR_ID) # Only the alpha channel is used for some reason, as RGB values are taken from the foreground color.
 
     def highlight_all_occurrences(self):
-        """Highlights all occurrences of the selected text.
+        """Highlights all occurrences of the selected text, once the selection stopped changing for a moment.
         :return: None"""
+        self._occurrence_highlighting_timer.start()
+
+    def _update_occurrence_highlights(self):
+        # Clear previous highlights (if there's any)
+        self.SendScintilla(QsciScintilla.SCI_SETINDICATORCURRENT, _HIGHLIGHT_INDICATOR_ID)
+        self.SendScintilla(QsciScintilla.SCI_INDICATORCLEARRANGE, 0, self.SendScintilla(QsciScintilla.SCI_GETLENGTH))
+        self._occurrence_text = b""
+        self._occurrence_searched_ranges = []
+
         # Don't highlight anything if the setting is not enabled.
         if not IDESettings.get_highlight_matching_text():
-            self._clear_all_highlights()
             return
 
-        if self._highlight_in_progress:
+        # Obtain the text from selection, in bytes like the positions Scintilla works with
+        selection_start = self.SendScintilla(QsciScintilla.SCI_GETSELECTIONSTART)
+        selection_end = self.SendScintilla(QsciScintilla.SCI_GETSELECTIONEND)
+        if selection_end - selection_start > _OCCURRENCE_MAX_LENGTH:
             return
+        text_to_highlight = bytes(self.bytes(selection_start, selection_end))[:selection_end - selection_start]
 
-        self._highlight_in_progress = True
-
-        # Clear previous highlights (if there's any)
-        self._clear_all_highlights()
+        if text_to_highlight == b"" or text_to_highlight.isspace():
+            return
 
-        # Obtain the text from selection
-        (sel_start_line, sel_start_index, sel_end_line, sel_end_index) = self.getSelection()
-        start_pos = self.positionFromLineIndex(sel_start_line, sel_start_index)
-        end_pos = self.positionFromLineIndex(sel_end_line, sel_end_index)
-        text_to_highlight = self.text(start_pos, end_pos)
+        self._occurrence_text = text_to_highlight
+        self._occurrence_selection_start = selection_start
+        self._highlight_visible_occurrences()
 
-        text = self.text()
+    def _highlight_visible_occurrences(self):
+        """Highlights the occurrences of the selected text on the visible lines, where it wasn't searched yet."""
+        if self._occurrence_text == b"":
+            return
 
-        # We cannot use findFirst() and findNext() here as they will make the text area jump all over the place
-        # All we need here is to only highlight the matching text
+        start_line, end_line = self._get_visible_lines()
+        start = self._position_from_line(start_line)
+        end = self._position_from_line(end_line)
+
+        # Only search the parts of the visible range that weren't searched yet
+        ranges_to_search = []
+        for searched_start, searched_end in self._occurrence_searched_ranges:
+            if searched_end <= start or searched_start >= end:
+                continue
+            if searched_start > start:
+                ranges_to_search.append((start, searched_start))
+            start = max(start, searched_end)
+        if start < end:
+            ranges_to_search.append((start, end))
+        if not ranges_to_search:
+            return
 
-        if text_to_highlight != "" and not text_to_highlight.isspace():
-            pos = text.find(text_to_highlight, 0)
+        self.SendScintilla(QsciScintilla.SCI_SETINDICATORCURRENT, _HIGHLIGHT_INDICATOR_ID)
+        length = len(self._occurrence_text)
+        for range_start, range_end in ranges_to_search:
+            # Read a bit past the end of the range, to find the occurrences that start right before it
+            read_end = min(range_end + length - 1, self.SendScintilla(QsciScintilla.SCI_GETLENGTH))
+            text = bytes(self.bytes(range_start, read_end))[:read_end - range_start]
 
-            while pos != -1:
-                (start_line, start_index) = self.lineIndexFromPosition(pos)
-                (end_line, end_index) = self.lineIndexFromPosition(pos + len(text_to_highlight))
+            pos = text.find(self._occurrence_text)
+            while pos != -1 and range_start + pos < range_end:
                 # Skip the selected text
-                if not (sel_start_line == start_line and sel_start_index == start_index):
-                    self.fillIndicatorRange(start_line, start_index, end_line, end_index, _HIGHLIGHT_INDICATOR_ID)
-                pos = text.find(text_to_highlight, pos + 1)
-        else:
-            self._clear_all_highlights()
-
-        self._highlight_in_progress = False
+                if range_start + pos != self._occurrence_selection_start:
+                    self.SendScintilla(QsciScintilla.SCI_INDICATORFILLRANGE, range_start + pos, length)
+                pos = text.find(self._occurrence_text, pos + 1)
+
+            self._add_occurrence_searched_range(range_start, range_end)
+
+    def _add_occurrence_searched_range(self, start: int, end: int):
+        ranges = []
+        for searched_start, searched_end in self._occurrence_searched_ranges:
+            if searched_end < start or searched_start > end:
+                ranges.append((searched_start, searched_end))
+            else:
+                start = min(start, searched_start)
+                end = max(end, searched_end)
+        ranges.append((start, end))
+        ranges.sort()
+        self._occurrence_searched_ranges = ranges
+
+    def _handle_modification_for_occurrences(self, position: int, modification_type: int, *args):
+        # Positions after the edit changed, search everything again the next time
+        if modification_type & (QsciScintilla.SC_MOD_INSERTTEXT | QsciScintilla.SC_MOD_DELETETEXT):
+            self._occurrence_searched_ranges = []
+            if self._occurrence_text != b"":
+                self._occurrence_highlighting_timer.start()
+
+    def mark_matches(self, match_ranges: list[tuple[int, int]]):
+        """Marks the results of Find All, replacing the previous ones.
+        :param match_ranges: Start and end of each match, in bytes, sorted."""
+        # The positions are already in bytes, so the indicator is filled directly with no conversion
+        self.SendScintilla(QsciScintilla.SCI_SETINDICATORCURRENT, _FIND_ALL_INDICATOR_ID)
+        self.SendScintilla(QsciScintilla.SCI_INDICATORCLEARRANGE, 0, self.SendScintilla(QsciScintilla.SCI_GETLENGTH))
+
+        # Matches next to each other are filled as a single range
+        range_start = range_end = -1
+        for start, end in match_ranges:
+            if start != range_end:
+                if range_end > range_start:
+                    self.SendScintilla(QsciScintilla.SCI_INDICATORFILLRANGE, range_start, range_end - range_start)
+                range_start = start
+            range_end = end
+        if range_end > range_start:
+            self.SendScintilla(QsciScintilla.SCI_INDICATORFILLRANGE, range_start, range_end - range_start)
+
+    def clear_marked_matches(self):
+        self.mark_matches([])
 
     def _clear_all_highlights(self, id=_HIGHLIGHT_INDICATOR_ID):
         last_line = self.lines() - 1
@@ -1,17 +1,15 @@
 # Custom Icon Picker Dialog.
 # Checks through the subfolders in {PyWright Dir}/art/
 
-from pathlib import Path
-
 from PyQt6.QtWidgets import (QDialog, QDialogButtonBox, QComboBox, QCheckBox,
-                             QListView, QFileIconProvider,
                              QHBoxLayout, QVBoxLayout, QMessageBox)
-from PyQt6.QtGui import QPixmap, QIcon, QFileSystemModel
-from PyQt6.QtCore import QDir, QSize, Qt
+from PyQt6.QtCore import QSize, Qt
 
 from data.PyWrightGame import PyWrightGameInfo
+from data.PyWrightAssetCatalog import ROOT_GLOBAL, ROOT_GAME, get_asset_catalog_service
+from .ThumbnailService import THUMBNAIL_IMAGE_SUFFIXES
+from .TextureGridView import TextureGridView, TextureListModel
 
-accepted_types = (".png", ".jpg")
 ICON_SIZE = QSize(128, 128)
 
 
@@ -33,18 +31,19 @@ class IconPickerDialog(QDialog):
 
         self._global_folder_checkbox = QCheckBox("Check the global art folder?")
         self._global_folder_checkbox.setChecked(True)
-        enabled_condition = self._selected_game_info is not None and (self._selected_game_info.game_path / "art").exists()
+        asset_catalog = get_asset_catalog_service().catalog
+        enabled_condition = self._selected_game_info is not None and asset_catalog is not None \
+            and asset_catalog.has_folder(ROOT_GAME, "art")
         self._global_folder_checkbox.setEnabled(enabled_condition)
         self._global_folder_checkbox.clicked.connect(self._refresh_subfolders)
         self._global_folder_checkbox.setWhatsThis("If checked, the icon picker will query the jpg and png files in the "
                                                   "art folder of PyWright installation, otherwise it will "
                                                   "query the selected game's art folder instead, if it exists.")
 
-        self._icons_list_view = QListView()
-        self._icons_list_view.setViewMode(QListView.ViewMode.IconMode)
-        self._icons_list_view.setResizeMode(QListView.ResizeMode.Adjust)
-        self._icons_list_view.setUniformItemSizes(True)
-        self._icons_list_view.setSpacing(5)
+        self._icons_model = TextureListModel(ICON_SIZE, self)
+
+        self._icons_list_view = TextureGridView()
+        self._icons_list_view.setModel(self._icons_model)
         self._icons_list_view.doubleClicked.connect(self._handle_accept)
 
         self._dialog_box = QDialogButtonBox(QDialogButtonBox.StandardButton.Ok | QDialogButtonBox.StandardButton.Cancel)
@@ -54,6 +53,12 @@ class IconPickerDialog(QDialog):
         self._art_subfolders = []
         self._refresh_subfolders()
 
+        # Art folders are listed from the asset catalog of the open game, which may still be building
+        asset_catalog_service = get_asset_catalog_service()
+        asset_catalog_service.catalog_ready.connect(self._refresh_subfolders)
+        asset_catalog_service.folder_changed.connect(self._handle_asset_folder_changed)
+        self.finished.connect(self._disconnect_asset_catalog_service)
+
         self.selected_icon = ""
 
         self.setLayout(self._prepare_layout())
@@ -73,52 +78,63 @@ class IconPickerDialog(QDialog):
         return result
 
     def _refresh_subfolders(self):
+        current_subfolder = self._subfolder_combobox.currentText()
+
         self._art_subfolders = self._query_subfolders()
+        self._subfolder_combobox.blockSignals(True)
         self._subfolder_combobox.clear()
         self._subfolder_combobox.addItems(self._art_subfolders)
+        if current_subfolder in self._art_subfolders:
+            self._subfolder_combobox.setCurrentText(current_subfolder)
+        self._subfolder_combobox.blockSignals(False)
         self._refresh_icon_view()
 
-    def _query_subfolders(self):
+    def _disconnect_asset_catalog_service(self):
+        asset_catalog_service = get_asset_catalog_service()
+        asset_catalog_service.catalog_ready.disconnect(self._refresh_subfolders)
+        asset_catalog_service.folder_changed.disconnect(self._handle_asset_folder_changed)
+
+    def _handle_asset_folder_changed(self, root: str, folder: str):
         checking_root_art = self._global_folder_checkbox.isChecked()
+        if root != (ROOT_GLOBAL if checking_root_art else ROOT_GAME):
+            return
 
-        selected_root_folder = self._pywright_root_dir if checking_root_art else str(self._selected_game_info.game_path)
+        if folder in ("", "art"):
+            self._refresh_subfolders()
+        elif folder == "art/" + self._subfolder_combobox.currentText():
+            self._refresh_icon_view()
 
-        art_folder_path = Path("{}/art/".format(selected_root_folder))
+    def _query_subfolders(self):
+        checking_root_art = self._global_folder_checkbox.isChecked()
 
-        if not art_folder_path.exists() or not art_folder_path.is_dir():
-            raise FileNotFoundError("art folder doesn't exist!")
+        asset_catalog = get_asset_catalog_service().catalog
+        if asset_catalog is None:
+            return []
 
         result = []
 
-        for x in art_folder_path.iterdir():
-            if x.is_dir():
-                if len(self._limit_to_folders) > 0 and x.name not in self._limit_to_folders:
-                    continue
+        for x in asset_catalog.get_subfolders(ROOT_GLOBAL if checking_root_art else ROOT_GAME, "art"):
+            if len(self._limit_to_folders) > 0 and x not in self._limit_to_folders:
+                continue
 
-                result.append(x.name)
+            result.append(x)
 
         return result
 
     def _refresh_icon_view(self):
         subfolder_name = self._subfolder_combobox.currentText()
 
-        checking_root_art = self._global_folder_checkbox.isChecked()
-        selected_root_folder = self._pywright_root_dir if checking_root_art else str(self._selected_game_info.game_path)
-
-        folder_path = Path("{}/art/{}".format(selected_root_folder, subfolder_name))
-
-        fs_model = QFileSystemModel()
-        icon_provider = ThumbnailIconProvider()
-
-        fs_model.setIconProvider(icon_provider)
+        asset_catalog = get_asset_catalog_service().catalog
+        if asset_catalog is None or subfolder_name == "":
+            self._icons_model.set_files("", [])
+            return
 
-        name_filters = ["*.png", "*.jpg"]
-        fs_model.setFilter(QDir.Filter.Files)
-        fs_model.setNameFilters(name_filters)
-        fs_model.setNameFilterDisables(False)
+        checking_root_art = self._global_folder_checkbox.isChecked()
+        root = ROOT_GLOBAL if checking_root_art else ROOT_GAME
+        folder = "art/" + subfolder_name
 
-        self._icons_list_view.setModel(fs_model)
-        self._icons_list_view.setRootIndex(fs_model.setRootPath(str(folder_path)))
+        self._icons_model.set_files(str(asset_catalog.get_folder_path(root, folder)),
+                                    asset_catalog.get_files(root, folder, THUMBNAIL_IMAGE_SUFFIXES))
 
     def _handle_accept(self):
         if len(self._icons_list_view.selectedIndexes()) <= 0:
@@ -130,19 +146,3 @@ class IconPickerDialog(QDialog):
         self.selected_icon = "art/" + self._subfolder_combobox.currentText() + "/" + name
         self.accept()
 
-
-class ThumbnailIconProvider(QFileIconProvider):
-    """Custom Icon Provider class that also provides thumbnails for image files"""
-
-    def __init__(self):
-        super().__init__()
-
-    def icon(self, icon_type: QFileIconProvider.IconType) -> QIcon:
-        fn: str = icon_type.filePath()
-
-        if fn.endswith(accepted_types):
-            a = QPixmap(ICON_SIZE)
-            a.load(fn)
-            return QIcon(a)
-
-        return super().icon(icon_type)
@@ -5,14 +5,198 @@ Qt's mouse/touch event handling is broken. For SOME REASON it can detect ACTUAL-
 
 This sadly prevents us from using `event.device()` to detect touchpads to handle panning using only two fingers on Linux."""
 
-from PyQt6.QtCore import Qt, QEvent
-from PyQt6.QtGui import QPalette, QImageReader, QPixmap, QWheelEvent, QNativeGestureEvent, QInputDevice
-from PyQt6.QtWidgets import QMessageBox, QGraphicsView, QGraphicsScene, QGraphicsPixmapItem
+from collections import OrderedDict
+
+from PyQt6.QtCore import Qt, QEvent, QObject, QRunnable, QThreadPool, QTimer, QRectF, QRect, QSize, pyqtSignal
+from PyQt6.QtGui import (QPalette, QImage, QImageReader, QPixmap, QPainter, QWheelEvent, QNativeGestureEvent, QInputDevice,
+                         QAction)
+from PyQt6.QtWidgets import (QMessageBox, QGraphicsView, QGraphicsScene, QGraphicsItem, QStyleOptionGraphicsItem,
+                             QWidget, QMenu)
 
 from data import IDESettings
+from data.PyWrightAnimation import PyWrightAnimationInfo
 
 from pathlib import Path
 
+# Images bigger than this get a downscaled version decoded first, shown while the whole image is being decoded
+_PREVIEW_MAX_SIZE = QSize(1024, 1024)
+
+# Size of the tiles the image is drawn with, so that zooming in only converts the visible part of the image to pixmaps
+_TILE_SIZE = 256
+
+# Memory the tiles of a viewer can use, the least recently drawn ones being freed past it
+_TILE_MEMORY_MAX_BYTES = 48 * 1024 * 1024
+
+
+class _ImageDecodingSignals(QObject):
+    size_read = pyqtSignal(int, QSize)  # Load id, size of the image (invalid if unknown before decoding it)
+    animation_read = pyqtSignal(int, object)  # Load id, PyWrightAnimationInfo of the image
+    preview_decoded = pyqtSignal(int, QImage)  # Load id, downscaled image
+    finished = pyqtSignal(int, QImage, str)  # Load id, image (null if it couldn't be read), error
+
+
+class _ImageDecodingTask(QRunnable):
+
+    def __init__(self, load_id: int, image_path: str):
+        super().__init__()
+        self.signals = _ImageDecodingSignals()
+        self._load_id = load_id
+        self._image_path = image_path
+
+    def run(self):
+        reader = QImageReader(self._image_path)
+        reader.setAutoTransform(True)
+        image_size = reader.size()
+        self.signals.size_read.emit(self._load_id, image_size)
+
+        # Images with a .txt file next to them are animations
+        animation_file_path = PyWrightAnimationInfo.get_animation_file_path(Path(self._image_path))
+        if animation_file_path.is_file():
+            try:
+                self.signals.animation_read.emit(self._load_id, PyWrightAnimationInfo.load_from_file(animation_file_path))
+            except (OSError, UnicodeDecodeError):
+                pass
+
+        if image_size.isValid() and (image_size.width() > _PREVIEW_MAX_SIZE.width()
+                                     or image_size.height() > _PREVIEW_MAX_SIZE.height()):
+            preview_reader = QImageReader(self._image_path)
+            preview_reader.setAutoTransform(True)
+            preview_reader.setScaledSize(image_size.scaled(_PREVIEW_MAX_SIZE, Qt.AspectRatioMode.KeepAspectRatio))
+            preview = preview_reader.read()
+            if not preview.isNull():
+                self.signals.preview_decoded.emit(self._load_id, preview)
+
+        image = reader.read()
+        self.signals.finished.emit(self._load_id, image, reader.errorString() if image.isNull() else "")
+
+
+class _TiledImageItem(QGraphicsItem):
+    """Draws an image tile by tile, from the downscaled preview until the whole image is decoded.
+    Only the tiles that are drawn are turned into pixmaps, and the ones that weren't drawn for a while are freed."""
+
+    def __init__(self):
+        super().__init__()
+        # Needed to know which part of the item is being drawn
+        self.setFlag(QGraphicsItem.GraphicsItemFlag.ItemUsesExtendedStyleOption)
+
+        self._size = QSize()
+        # Levels of detail as (scale compared to the full image, image), the most detailed first
+        self._levels: list[tuple[float, QImage]] = []
+
+        # Maps (scale, tile column, tile row) to pixmaps, the most recently drawn last
+        self._tiles: OrderedDict[tuple[float, int, int], QPixmap] = OrderedDict()
+        self._tile_memory_used = 0
+
+    def set_image_size(self, size: QSize):
+        self.prepareGeometryChange()
+        self._size = QSize(size)
+
+    def add_level(self, image: QImage, is_full_image: bool):
+        """Adds a decoded version of the image, either the whole image or a downscaled one.
+        The view never zooms out below the size of the image, so the whole image replaces the downscaled one."""
+        if is_full_image:
+            self.set_image_size(image.size())
+            self._levels.clear()
+            self._tiles.clear()
+            self._tile_memory_used = 0
+        elif not self._size.isValid():
+            return
+
+        self._levels.append((image.width() / self._size.width(), image))
+        self._levels.sort(key=lambda level: level[0], reverse=True)
+        self.update()
+
+    def get_tile_memory_used(self) -> int:
+        return self._tile_memory_used
+
+    def boundingRect(self) -> QRectF:
+        if not self._size.isValid():
+            return QRectF()
+        return QRectF(0, 0, self._size.width(), self._size.height())
+
+    def paint(self, painter: QPainter, option: QStyleOptionGraphicsItem, widget: QWidget | None = None):
+        if len(self._levels) == 0:
+            # Nothing is decoded yet
+            painter.fillRect(self.boundingRect(), option.palette.mid())
+            painter.drawText(self.boundingRect(), Qt.AlignmentFlag.AlignCenter, "Loading image...")
+            return
+
+        level_of_detail = option.levelOfDetailFromTransform(painter.worldTransform())
+        scale, image = self._pick_level(level_of_detail)
+
+        exposed_rect = option.exposedRect.intersected(self.boundingRect())
+        first_column = max(0, int(exposed_rect.left() * scale) // _TILE_SIZE)
+        last_column = min((image.width() - 1) // _TILE_SIZE, int(exposed_rect.right() * scale) // _TILE_SIZE)
+        first_row = max(0, int(exposed_rect.top() * scale) // _TILE_SIZE)
+        last_row = min((image.height() - 1) // _TILE_SIZE, int(exposed_rect.bottom() * scale) // _TILE_SIZE)
+
+        drawn_tile_count = 0
+        for row in range(first_row, last_row + 1):
+            for column in range(first_column, last_column + 1):
+                pixmap = self._get_tile(scale, image, column, row)
+                # Sized from the tile, which is cut to the image on the edges
+                target_rect = QRectF(column * _TILE_SIZE / scale, row * _TILE_SIZE / scale,
+                                     pixmap.width() / scale, pixmap.height() / scale)
+                painter.drawPixmap(target_rect, pixmap, QRectF(pixmap.rect()))
+                drawn_tile_count += 1
+
+        # Free the tiles that weren't just drawn, the least recently drawn first
+        while self._tile_memory_used > _TILE_MEMORY_MAX_BYTES and len(self._tiles) > drawn_tile_count:
+            _, dropped_pixmap = self._tiles.popitem(last=False)
+            self._tile_memory_used -= dropped_pixmap.width() * dropped_pixmap.height() * 4
+
+    def _pick_level(self, level_of_detail: float) -> tuple[float, QImage]:
+        # The least detailed level that still has at least one pixel per screen pixel
+        result = self._levels[0]
+        for scale, image in self._levels:
+            if scale < level_of_detail:
+                break
+            result = (scale, image)
+        return result
+
+    def _get_tile(self, scale: float, image: QImage, column: int, row: int) -> QPixmap:
+        key = (scale, column, row)
+        pixmap = self._tiles.get(key)
+        if pixmap is not None:
+            self._tiles.move_to_end(key)
+            return pixmap
+
+        # Tiles on the right and bottom edges are smaller, QImage.copy() would fill the rest with black
+        tile_rect = QRect(column * _TILE_SIZE, row * _TILE_SIZE, _TILE_SIZE, _TILE_SIZE).intersected(image.rect())
+        pixmap = QPixmap.fromImage(image.copy(tile_rect))
+        self._tiles[key] = pixmap
+        self._tile_memory_used += pixmap.width() * pixmap.height() * 4
+        return pixmap
+
+
+class _AnimationItem(QGraphicsItem):
+    """Draws the current frame of an animation straight from the region of the image holding it,
+    so playing the animation never copies or decodes anything."""
+
+    def __init__(self, image: QImage, animation_info: PyWrightAnimationInfo):
+        super().__init__()
+        self._image = image
+        self._animation_info = animation_info
+        self._frame = 0
+
+        frame_width, frame_height = animation_info.get_frame_size(image.width(), image.height())
+        self._frame_rect = QRectF(0, 0, frame_width, frame_height)
+
+    def get_frame(self) -> int:
+        return self._frame
+
+    def set_frame(self, frame: int):
+        self._frame = frame
+        self.update()
+
+    def boundingRect(self) -> QRectF:
+        return self._frame_rect
+
+    def paint(self, painter: QPainter, option: QStyleOptionGraphicsItem, widget: QWidget | None = None):
+        x, y, width, height = self._animation_info.get_frame_rect(self._frame, self._image.width(), self._image.height())
+        painter.drawImage(self._frame_rect, self._image, QRectF(x, y, width, height))
+
+
 class ImageViewerWidget(QGraphicsView):
     """A simple image viewer"""
 
@@ -25,8 +209,18 @@ class ImageViewerWidget(QGraphicsView):
         self._image_width = 0
         self._image_height = 0
         self._zoom_level = 0
+        # Tells the decoded images of the latest load apart from the ones of a previous one
+        self._load_id = 0
+
+        # Animation of the image, if it has a .txt file, played instead of showing the whole image
+        self._animation_info: PyWrightAnimationInfo | None = None
+        self._animation_item: _AnimationItem | None = None
+        self._animation_timer = QTimer(self)
+        self._animation_timer.setSingleShot(True)
+        self._animation_timer.timeout.connect(self._show_next_animation_frame)
+        self._decoded_memory = 0
 
-        self._photo = QGraphicsPixmapItem()
+        self._photo = _TiledImageItem()
 
         self._graphics_scene.addItem(self._photo)
         self.setScene(self._graphics_scene)
@@ -37,30 +231,151 @@ class ImageViewerWidget(QGraphicsView):
 
         self.setDragMode(QGraphicsView.DragMode.ScrollHandDrag)
 
+        self.setContextMenuPolicy(Qt.ContextMenuPolicy.CustomContextMenu)
+        self.customContextMenuRequested.connect(self._handle_context_menu)
+
         if str(image_path) != "":
             self.load_image()
 
     def get_image_path(self):
         return self._image_path
 
+    def get_decoded_memory(self) -> int:
+        """Returns how many bytes the decoded image takes, the frames of an animation being parts of it."""
+        return self._decoded_memory
+
+    def is_animation(self) -> bool:
+        return self._animation_info is not None
+
+    def is_playing_animation(self) -> bool:
+        return self._animation_item is not None and self._animation_item.isVisible()
+
+    def set_animation_preview(self, enabled: bool):
+        """Plays the animation of the image, or shows the whole image with all the frames."""
+        if self._animation_item is None:
+            return
+
+        self._animation_item.setVisible(enabled)
+        self._photo.setVisible(not enabled)
+        self._graphics_scene.setSceneRect(self._animation_item.boundingRect() if enabled else self._photo.boundingRect())
+
+        if enabled:
+            self._animation_item.set_frame(0)
+            self._animation_timer.start(self._animation_info.get_frame_delay_ms(0))
+        else:
+            self._animation_timer.stop()
+
     def load_image(self):
-        reader = QImageReader(str(self._image_path))
-        reader.setAutoTransform(True)
-        new_image = reader.read()
+        """Starts decoding the image in the background. A downscaled version is shown first for big images."""
+        self._load_id += 1
+        self.resetTransform()
+        self._zoom_level = 1
+
+        self._graphics_scene.removeItem(self._photo)
+        self._photo = _TiledImageItem()
+        self._graphics_scene.addItem(self._photo)
+
+        self._animation_timer.stop()
+        self._animation_info = None
+        if self._animation_item is not None:
+            self._graphics_scene.removeItem(self._animation_item)
+            self._animation_item = None
+        self._decoded_memory = 0
+        self.setToolTip("")
+
+        task = _ImageDecodingTask(self._load_id, str(self._image_path))
+        task.signals.size_read.connect(self._handle_image_size_read)
+        task.signals.animation_read.connect(self._handle_animation_read)
+        task.signals.preview_decoded.connect(self._handle_preview_decoded)
+        task.signals.finished.connect(self._handle_image_decoded)
+        QThreadPool.globalInstance().start(task)
+
+    def _handle_image_size_read(self, load_id: int, size: QSize):
+        if load_id != self._load_id or not size.isValid():
+            return
+
+        self._image_width = size.width()
+        self._image_height = size.height()
+        self._photo.set_image_size(size)
+        self._graphics_scene.setSceneRect(self._photo.boundingRect())
+
+    def _handle_animation_read(self, load_id: int, animation_info: PyWrightAnimationInfo):
+        if load_id != self._load_id:
+            return
+
+        self._animation_info = animation_info
+
+    def _handle_preview_decoded(self, load_id: int, preview: QImage):
+        if load_id != self._load_id:
+            return
+
+        self._photo.add_level(preview, False)
+
+    def _handle_image_decoded(self, load_id: int, new_image: QImage, error: str):
+        if load_id != self._load_id:
+            return
 
         if new_image.isNull():
-            error = reader.errorString()
             QMessageBox.information(self, "Error", "Cannot read the image file {}. Error: {}".format(str(self._image_path), error),
                                     QMessageBox.StandardButton.Ok, QMessageBox.StandardButton.Ok)
             return
         self._image_width = new_image.width()
         self._image_height = new_image.height()
-        self._set_image(new_image)
+        self._photo.add_level(new_image, True)
+        self._graphics_scene.setSceneRect(self._photo.boundingRect())
 
-    def _set_image(self, new_image):
-        self._image = new_image
-        self._photo.setPixmap(QPixmap.fromImage(self._image))
-        self._zoom_level = 1
+        self._decoded_memory = new_image.sizeInBytes()
+        tool_tip = "{}x{}, {:.1f} MB decoded".format(self._image_width, self._image_height, self._decoded_memory / (1024 * 1024))
+
+        if self._animation_info is not None:
+            # The animation shares the decoded image with the whole image view
+            self._animation_item = _AnimationItem(new_image, self._animation_info)
+            self._graphics_scene.addItem(self._animation_item)
+            self.set_animation_preview(True)
+            tool_tip += ", {} frames".format(self._animation_info.get_frame_count())
+
+        self.setToolTip(tool_tip)
+
+    def _show_next_animation_frame(self):
+        if not self.is_playing_animation():
+            return
+
+        frame = self._animation_item.get_frame() + 1
+        if frame >= self._animation_info.get_frame_count():
+            if self._animation_info.loops == 0:
+                # Stays on the last frame
+                return
+            frame = 0
+
+        self._animation_item.set_frame(frame)
+        self._animation_timer.start(self._animation_info.get_frame_delay_ms(frame))
+
+    def _handle_context_menu(self, position):
+        if not self.is_animation() or self._animation_item is None:
+            return
+
+        menu = QMenu()
+
+        if self.is_playing_animation():
+            show_sheet_action = QAction("Show Whole Sprite Sheet", self)
+            show_sheet_action.triggered.connect(lambda: self.set_animation_preview(False))
+            menu.addAction(show_sheet_action)
+        else:
+            play_animation_action = QAction("Play Animation", self)
+            play_animation_action.triggered.connect(lambda: self.set_animation_preview(True))
+            menu.addAction(play_animation_action)
+
+        menu.exec(self.viewport().mapToGlobal(position))
+
+    def showEvent(self, event):
+        super().showEvent(event)
+        # Resume the animation where it was paused when the tab was hidden
+        if self.is_playing_animation() and not self._animation_timer.isActive():
+            self._animation_timer.start(self._animation_info.get_frame_delay_ms(self._animation_item.get_frame()))
+
+    def hideEvent(self, event):
+        super().hideEvent(event)
+        self._animation_timer.stop()
 
     def wheelEvent(self, event):
         # Mousewheel events are managed in event() instead
@@ -1,20 +1,35 @@
+import os
 from pathlib import Path
 
-from PyQt6.QtCore import pyqtSignal
+from PyQt6.QtCore import QTimer, pyqtSignal
 from PyQt6.QtWidgets import QWidget, QTabWidget, QVBoxLayout, QMessageBox
 
 from data import IDESettings, EditorThemes
+from data.PyWrightAssetCatalog import PyWrightAssetCatalog
 from data.PyWrightGame import PyWrightGameInfo
+from data.PyWrightProjectSearch import SearchMatch
+from data.PyWrightProjectReplace import ReplaceJournal, ReplaceJournalEntry, get_digest
+from data.PyWrightSymbolIndex import PyWrightSymbolIndex
 from .FileEditWidget import FileEditWidget
 from .FindReplaceDialog import SearchScope, FindType, ReplaceType
 from .GamePropertiesWidget import GamePropertiesWidget
 from .ImageViewerWidget import ImageViewerWidget
 
+# Cursor and selection changes are shown at most once per this many ms, about once per frame
+_STATUS_UPDATE_INTERVAL = 16
+
 
 class MainWindowCentralWidget(QWidget):
     update_save_button_requested = pyqtSignal(bool)
     current_tab_cursor_position_changed = pyqtSignal(int, int)
     selection_length_changed = pyqtSignal(int)
+    # File path, symbol name and symbol kind, forwarded from the file editing tabs
+    definition_requested = pyqtSignal(str, str, str)
+    # File path, symbol name, forwarded from the file editing tabs
+    references_requested = pyqtSignal(str, str)
+    file_saved = pyqtSignal(str)
+    # Text that was looked for, and a list of (FileEditWidget, list of SearchMatch)
+    find_all_results_ready = pyqtSignal(str, object)
 
     def __init__(self, parent=None):
         """Central widget for the main window. Handles the open tabs.
@@ -39,6 +54,23 @@ class MainWindowCentralWidget(QWidget):
         self.pywright_installation_path: str = ""
         self.selected_game_info: PyWrightGameInfo | None = None
         self._game_properties_widget: GamePropertiesWidget | None = None
+        # How many times each name is used in the game, to rank the autocompletion of the tabs
+        self._symbol_usage_counts: dict[str, int] = {}
+        # Indexes the autocompletion of the tabs proposes asset, script and label names from
+        self._asset_catalog: PyWrightAssetCatalog | None = None
+        self._symbol_index: PyWrightSymbolIndex | None = None
+
+        # Cursor and selection changes come in bursts (holding shift+arrow for example),
+        # they are coalesced into a single update of the status bar per frame
+        self._cursor_position_update_pending = False
+        self._selection_length_update_pending = False
+        self._status_update_timer = QTimer(self)
+        self._status_update_timer.setSingleShot(True)
+        self._status_update_timer.setInterval(_STATUS_UPDATE_INTERVAL)
+        self._status_update_timer.timeout.connect(self._flush_status_updates)
+        # How many cursor/selection changes were received, and how many of them were merged into another update
+        self.status_events_received = 0
+        self.status_events_dropped = 0
 
     def set_selected_game(self, selected_game_info: PyWrightGameInfo):
         self.selected_game_info = selected_game_info
@@ -81,7 +113,7 @@ class MainWindowCentralWidget(QWidget):
 
             opened_tab: FileEditWidget = self.tab_widget.widget(i)
 
-            if opened_tab.file_path == file_path:
+            if opened_tab.file_path != "" and Path(opened_tab.file_path) == Path(file_path):
                 self.tab_widget.setCurrentIndex(i)
                 return
         # Create a new FileEditWidget, and add it to the tab widget
@@ -99,12 +131,17 @@ class MainWindowCentralWidget(QWidget):
             case_name = Path(file_path).parent.name
             if case_name in self.selected_game_info.case_macros:
                 file_edit_widget.supply_case_macros_to_lexer(self.selected_game_info.case_macros[case_name])
+        file_edit_widget.supply_symbol_usage_counts_to_lexer(self._symbol_usage_counts)
+        file_edit_widget.supply_completion_indexes_to_lexer(self._asset_catalog, self._symbol_index)
 
         file_edit_widget.supply_editor_color_theme_to_lexer()
         file_edit_widget.move_to_tab_requested.connect(self._handle_move_to_tab)
         file_edit_widget.replace_next_in_next_tabs_requested.connect(self.replace_next_in_next_tabs)
         file_edit_widget.cursor_position_changed.connect(self._update_line_and_col)
         file_edit_widget.selected_text_changed.connect(self._handle_text_selection_changed)
+        file_edit_widget.definition_requested.connect(self.definition_requested)
+        file_edit_widget.references_requested.connect(self.references_requested)
+        file_edit_widget.file_saved.connect(self.file_saved)
         file_name = Path(file_path).name
         # Append folder name if two tabs with the same name are open
         for i in range(self.tab_widget.count()):
@@ -119,6 +156,61 @@ class MainWindowCentralWidget(QWidget):
                 self.tab_widget.setTabText(i, opened_tab.file_name + " @ " + opened_tab.file_folder)
         self.open_new_tab(file_edit_widget, file_name if file_name != "" else "New File")
 
+    def set_builtin_macros(self, builtin_macros: list[str]):
+        """Supplies the built-in macros of the game to all the tabs, once they are loaded."""
+        for idx in range(self.tab_widget.count()):
+            if self.is_file_editing_tab(idx):
+                self.tab_widget.widget(idx).supply_builtin_macros_to_lexer(builtin_macros)
+
+    def set_game_macros(self, game_macros: list[str]):
+        """Supplies the macros of the game folder to all the tabs, once they are loaded."""
+        for idx in range(self.tab_widget.count()):
+            if self.is_file_editing_tab(idx):
+                self.tab_widget.widget(idx).supply_game_macros_to_lexer(game_macros)
+
+    def set_case_macros(self, case_name: str, case_macros: list[str]):
+        """Supplies the macros of a case to the tabs of the scripts of that case, once they are loaded."""
+        for idx in range(self.tab_widget.count()):
+            if not self.is_file_editing_tab(idx):
+                continue
+            tab: FileEditWidget = self.tab_widget.widget(idx)
+            if tab.file_path != "" and Path(tab.file_path).parent.name == case_name:
+                tab.supply_case_macros_to_lexer(case_macros)
+
+    def set_symbol_usage_counts(self, usage_counts: dict[str, int]):
+        """Sets how many times each name is used in the game, for the autocompletion of all the tabs."""
+        self._symbol_usage_counts = usage_counts
+        for idx in range(self.tab_widget.count()):
+            if self.is_file_editing_tab(idx):
+                self.tab_widget.widget(idx).supply_symbol_usage_counts_to_lexer(usage_counts)
+
+    def set_completion_indexes(self, asset_catalog: PyWrightAssetCatalog | None, symbol_index: PyWrightSymbolIndex | None):
+        """Sets the indexes of the game the autocompletion of all the tabs proposes asset, script and label names from."""
+        self._asset_catalog = asset_catalog
+        self._symbol_index = symbol_index
+        for idx in range(self.tab_widget.count()):
+            if self.is_file_editing_tab(idx):
+                self.tab_widget.widget(idx).supply_completion_indexes_to_lexer(asset_catalog, symbol_index)
+
+    def open_file_at_line(self, file_path: str, line: int):
+        """Opens a file (or switches to its tab if it is already open) and moves the cursor to the start of a line.
+            :param file_path: Path of the file to open.
+            :param line: The line to move to, 0-based.
+        """
+        self.open_new_editing_tab(file_path)
+
+        if not self.is_file_editing_tab(self.tab_widget.currentIndex()):
+            return
+
+        file_edit_widget: FileEditWidget = self.tab_widget.currentWidget()
+        if file_edit_widget.file_path == "" or Path(file_edit_widget.file_path) != Path(file_path):
+            # The file couldn't be opened
+            return
+
+        file_edit_widget.sci.setCursorPosition(line, 0)
+        file_edit_widget.sci.ensureLineVisible(line)
+        file_edit_widget.sci.setFocus()
+
     def _try_loading_editor_theme(self, theme_name: str):
         """Try loading the editor theme named {theme_name}, on the case of theme missing, load the default editor theme instead.
             :param theme_name: Name of the editor theme.
@@ -143,7 +235,30 @@ class MainWindowCentralWidget(QWidget):
         self._update_line_and_col()
         self._handle_text_selection_changed()
 
+    def get_status_event_counters(self) -> tuple[int, int]:
+        """Returns how many cursor/selection changes were received, and how many didn't need an update of their own."""
+        return self.status_events_received, self.status_events_dropped
+
+    def _schedule_status_update(self):
+        self.status_events_received += 1
+        if self._status_update_timer.isActive():
+            self.status_events_dropped += 1
+            return
+        self._status_update_timer.start()
+
+    def _flush_status_updates(self):
+        if self._cursor_position_update_pending:
+            self._cursor_position_update_pending = False
+            self._emit_line_and_col()
+        if self._selection_length_update_pending:
+            self._selection_length_update_pending = False
+            self._emit_selection_length()
+
     def _update_line_and_col(self):
+        self._cursor_position_update_pending = True
+        self._schedule_status_update()
+
+    def _emit_line_and_col(self):
         if self.tabs_count() == 0:
             self.current_tab_cursor_position_changed.emit(-1, -1)
         elif self.is_file_editing_tab(self.tab_widget.currentIndex()):
@@ -153,6 +268,10 @@ class MainWindowCentralWidget(QWidget):
             self.current_tab_cursor_position_changed.emit(-1, -1)
 
     def _handle_text_selection_changed(self):
+        self._selection_length_update_pending = True
+        self._schedule_status_update()
+
+    def _emit_selection_length(self):
         if self.tabs_count() == 0 or not self.is_file_editing_tab(self.tab_widget.currentIndex()):
             self.selection_length_changed.emit(-1)
         else:
@@ -256,10 +375,41 @@ class MainWindowCentralWidget(QWidget):
             # If nothing is open, inform the user and do nothing.
             QMessageBox.information(self, "Find/Replace", "There are no tabs open.")
             return
+        if find_type == FindType.FIND_ALL:
+            self.find_all_in_tabs(text, search_scope)
+            return
         if self.is_file_editing_tab(self.tab_widget.currentIndex()):
             file_widget: FileEditWidget = self.tab_widget.currentWidget()
             file_widget.search_in_file(text, find_type, search_scope)
 
+    def find_all_in_tabs(self, text_to_find: str, search_scope: SearchScope):
+        """Finds every occurrence of a text in the current tab, or in all the open tabs."""
+        if search_scope == SearchScope.OPEN_TABS:
+            tab_indexes = range(self.tab_widget.count())
+        else:
+            tab_indexes = [self.tab_widget.currentIndex()]
+
+        results = []
+        for idx in tab_indexes:
+            if not self.is_file_editing_tab(idx):
+                continue
+
+            tab: FileEditWidget = self.tab_widget.widget(idx)
+            matches = tab.find_all_in_file(text_to_find)
+            if len(matches) > 0:
+                results.append((tab, matches))
+
+        self.find_all_results_ready.emit(text_to_find, results)
+
+    def show_match(self, tab: FileEditWidget, position: int, length: int):
+        """Switches to a tab and selects a match found by Find All in it, unless the tab was closed since."""
+        idx = self.tab_widget.indexOf(tab)
+        if idx == -1:
+            return
+
+        self.tab_widget.setCurrentIndex(idx)
+        tab.show_match(position, length)
+
     def handle_replace_signals(self, text_to_find: str, text_to_replace: str, replace_type: ReplaceType,
                                search_scope: SearchScope):
         if self.tab_widget.count() == 0:
@@ -363,14 +513,101 @@ class MainWindowCentralWidget(QWidget):
 
     def replace_all_in_all_open_tabs(self, text_to_find: str, text_to_replace: str):
         tab_count = self.tab_widget.count()
+        replacement_count = 0
 
         for idx in range(tab_count):
             if not self.is_file_editing_tab(idx):
                 continue
 
             curr_tab: FileEditWidget = self.tab_widget.widget(idx)
-            curr_tab.replace_all_in_file(text_to_find, text_to_replace)
+            replacement_count += curr_tab.replace_all_in_file(text_to_find, text_to_replace)
+        self._update_tab_modified_infos()
+
+        QMessageBox.information(self, "Find/Replace", "{} occurrences replaced".format(replacement_count))
+
+    def get_file_editing_tab(self, file_path: str) -> FileEditWidget | None:
+        """Returns the tab a file is open in, or None if it isn't open."""
+        for idx in range(self.tab_widget.count()):
+            if not self.is_file_editing_tab(idx):
+                continue
+
+            tab: FileEditWidget = self.tab_widget.widget(idx)
+            if tab.file_path != "" and Path(tab.file_path) == Path(file_path):
+                return tab
+        return None
+
+    def find_in_open_files(self, text_to_find: str) -> dict[str, list[SearchMatch]]:
+        """Returns the matches of a text in the open files, as they are in the editor (possibly unsaved).
+            :return: The matches, for each file path of an open tab."""
+        result = {}
+
+        for idx in range(self.tab_widget.count()):
+            if not self.is_file_editing_tab(idx):
+                continue
+
+            tab: FileEditWidget = self.tab_widget.widget(idx)
+            if tab.file_path != "":
+                # Normalized like the paths of the project search
+                file_path = os.path.normpath(tab.file_path)
+                matches = tab.find_matches_in_file(text_to_find)
+                for match in matches:
+                    match.file_path = file_path
+                result[file_path] = matches
+        return result
+
+    def replace_in_open_files(self, journal: ReplaceJournal, file_paths: list[str]) -> list[str]:
+        """Replaces the text of a project-wide replace in the files that are open, through their tabs,
+        and adds them to the journal. The tabs are left modified and unsaved.
+            :param journal: Journal of the replace.
+            :param file_paths: Files to replace the text in.
+            :return: The files that aren't open, to be replaced on disk."""
+        files_not_open = []
+
+        for file_path in file_paths:
+            tab = self.get_file_editing_tab(file_path)
+            if tab is None:
+                files_not_open.append(file_path)
+                continue
+
+            original_data = tab.get_text_bytes()
+            replacement_count = tab.replace_all_in_file(journal.text_to_find, journal.text_to_replace)
+            if replacement_count == 0:
+                continue
+
+            journal.add_entry(tab.file_path, original_data, tab.get_text_bytes(), replacement_count)
+
+        self._update_tab_modified_infos()
+        return files_not_open
+
+    def undo_replace_in_open_files(self, journal: ReplaceJournal) -> tuple[list[str], list[str], list[ReplaceJournalEntry]]:
+        """Undoes a project-wide replace in the files that are open now, through their tabs.
+        Tabs that were edited since the replace are left as they are.
+            :param journal: Journal of the replace to undo.
+            :return: The restored file paths, the file paths that were left as they are,
+            and the entries of the files that aren't open, to be restored on disk."""
+        restored_file_paths = []
+        skipped_file_paths = []
+        entries_not_open = []
+
+        for entry in journal.entries:
+            tab = self.get_file_editing_tab(entry.file_path)
+            if tab is None:
+                entries_not_open.append(entry)
+                continue
+
+            if get_digest(tab.get_text_bytes()) != entry.replaced_digest:
+                skipped_file_paths.append(entry.file_path)
+                continue
+
+            try:
+                tab.replace_whole_text(entry.read_backup().decode("utf-8", errors="replace"))
+            except OSError:
+                skipped_file_paths.append(entry.file_path)
+                continue
+            restored_file_paths.append(entry.file_path)
+
         self._update_tab_modified_infos()
+        return restored_file_paths, skipped_file_paths, entries_not_open
 
     def tabs_count(self) -> int:
         return self.tab_widget.count()
@@ -415,6 +652,7 @@ class MainWindowCentralWidget(QWidget):
                 tab.supply_editor_color_theme_to_lexer()
                 tab.setup_autocompletion()
                 tab.set_highlight_style(IDESettings.get_highlight_fill_rect())
+                tab.set_background_styling(IDESettings.get_background_styling())
 
     def handle_insert_into_cursor(self, command: str):
         # Don't do anything if there are no tabs open
@@ -1,6 +1,6 @@
 """Just a status bar with a custom separator"""
 
-from PyQt6.QtWidgets import QStatusBar, QLabel, QFrame
+from PyQt6.QtWidgets import QStatusBar, QLabel, QFrame, QProgressBar
 
 
 class MainWindowStatusBar(QStatusBar):
@@ -14,10 +14,17 @@ class MainWindowStatusBar(QStatusBar):
         self._line_col_info_label = QLabel()
         self._installation_path_label = QLabel("No PyWright folder selected")
 
+        # Shown while the macros of a game are loaded in the background
+        self._loading_progress_bar = QProgressBar()
+        self._loading_progress_bar.setMaximumWidth(150)
+        self._loading_progress_bar.setFormat("Loading macros %v/%m")
+        self._loading_progress_bar.hide()
+
         self._selection_length_info_label.setContentsMargins(4, 0, 4, 0)
         self._line_col_info_label.setContentsMargins(4, 0, 4, 0)
         self._installation_path_label.setContentsMargins(4, 0, 4, 0)
 
+        self.addPermanentWidget(self._loading_progress_bar)
         self.addPermanentWidget(self._selection_length_info_label)
         self.addPermanentWidget(self._line_col_info_label)
         self.addPermanentWidget(self._installation_path_label)
@@ -30,6 +37,14 @@ class MainWindowStatusBar(QStatusBar):
         else:
             self._selection_length_info_label.setText("")
 
+    def set_loading_progress(self, loaded: int, to_load: int):
+        """Shows how much of the game is loaded, hiding the progress bar once everything is.
+        :param loaded: Number of parts loaded so far
+        :param to_load: Number of parts to load"""
+        self._loading_progress_bar.setMaximum(to_load)
+        self._loading_progress_bar.setValue(loaded)
+        self._loading_progress_bar.setVisible(loaded < to_load)
+
     def set_installation_path_info(self, installation_path: str):
         self._installation_path_label.setText(installation_path)
 
@@ -1,12 +1,11 @@
 # A Dialog that allows the user to pick the PyWright Game they wish to edit.
 
-from pathlib import Path
-
 from PyQt6.QtCore import QSize
 from PyQt6.QtGui import QStandardItemModel, QStandardItem, QIcon
 from PyQt6.QtWidgets import QDialog, QDialogButtonBox, QVBoxLayout, QListView
 
 from data import IconThemes
+from data.PyWrightAssetCatalog import list_game_folder_names
 
 
 class OpenGameDialog(QDialog):
@@ -43,14 +42,13 @@ class OpenGameDialog(QDialog):
         self._populate_list(pywright_root_dir)
 
     def _populate_list(self, pywright_root_dir: str):
-        p = Path("{}/games".format(pywright_root_dir))
-
-        games = [x for x in p.iterdir() if x.is_dir()]
+        # No game is open yet, so there is no asset catalog to ask
+        games = list_game_folder_names(pywright_root_dir)
 
         game_icon_path = IconThemes.icon_path_from_theme(IconThemes.ICON_NAME_OPEN_GAME)
 
         for game in games:
-            self._add_item_to_model(game_icon_path, game.stem)
+            self._add_item_to_model(game_icon_path, game)
 
     def _add_item_to_model(self, icon_path: str, item_text: str):
         item = QStandardItem(QIcon(icon_path), item_text)
@@ -0,0 +1,67 @@
+import html
+import os
+from pathlib import Path
+
+from PyQt6.QtWidgets import QDialog, QWidget, QDialogButtonBox, QListWidget, QVBoxLayout, QLabel
+
+from data.PyWrightProjectSearch import SearchMatch, compile_search_pattern
+
+
+class ProjectReplacePreviewDialog(QDialog):
+    def __init__(self, parent: QWidget, matches_by_file: dict[str, list[SearchMatch]], text_to_find: str,
+                 text_to_replace: str, game_path: Path):
+        """Shows the lines a project-wide replace is going to change, and asks whether to go on with it.
+            :param parent: The parent widget.
+            :param matches_by_file: Matches of the text to find, for each file to change.
+            :param text_to_find: The text to find.
+            :param text_to_replace: The text it will be replaced with.
+            :param game_path: Folder the file paths are shown relative to.
+        """
+        super().__init__(parent)
+
+        self.setWindowTitle("Replace in Entire Project")
+        self.setMinimumSize(720, 400)
+
+        match_count = sum(len(matches) for matches in matches_by_file.values())
+        self._text_label = QLabel("Replace <b>{}</b> with <b>{}</b>: {} matches in {} files.<br>"
+                                  "Files that are open are changed in their tabs, the other ones are saved right away."
+                                  .format(html.escape(text_to_find), html.escape(text_to_replace), match_count, len(matches_by_file)), self)
+
+        self._lines_list_widget = QListWidget(self)
+        self._lines_list_widget.setUniformItemSizes(True)
+
+        # Previews are replaced with the pattern of the search, so that they show what will really be written
+        pattern = compile_search_pattern(text_to_find)
+        encoded_text_to_replace = text_to_replace.encode("utf-8")
+
+        lines = []
+        for file_path, matches in matches_by_file.items():
+            try:
+                shown_path = os.path.relpath(file_path, game_path)
+            except ValueError:
+                # On another drive
+                shown_path = file_path
+
+            previous_line = -1
+            for match in matches:
+                # A line with several matches is only shown once
+                if match.line == previous_line:
+                    continue
+                previous_line = match.line
+                replaced_preview = pattern.sub(lambda _: encoded_text_to_replace, match.preview.encode("utf-8"))
+                lines.append("{}:{}  {}  →  {}".format(shown_path, match.line + 1, match.preview,
+                                                           replaced_preview.decode("utf-8", errors="replace")))
+        self._lines_list_widget.addItems(lines)
+
+        self._dialog_box = QDialogButtonBox(QDialogButtonBox.StandardButton.Cancel)
+        self._dialog_box.addButton("Replace All", QDialogButtonBox.ButtonRole.AcceptRole)
+        self._dialog_box.accepted.connect(self.accept)
+        self._dialog_box.rejected.connect(self.reject)
+
+        main_layout = QVBoxLayout()
+
+        main_layout.addWidget(self._text_label)
+        main_layout.addWidget(self._lines_list_widget)
+        main_layout.addWidget(self._dialog_box)
+
+        self.setLayout(main_layout)
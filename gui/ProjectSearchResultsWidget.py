@@ -0,0 +1,223 @@
+import os
+from pathlib import Path
+
+from PyQt6.QtWidgets import (QDockWidget, QListWidget, QListWidgetItem, QWidget, QVBoxLayout, QHBoxLayout,
+                             QLabel, QPushButton)
+from PyQt6.QtCore import Qt, QObject, pyqtSignal
+
+from data.PyWrightProjectSearch import SearchMatch
+from data.PyWrightProjectReplace import ReplaceJournal
+
+# Past this many matches the search is stopped, as the list wouldn't be of much use anyway
+_MAX_SHOWN_MATCHES = 20000
+
+# Item data of the matches found by Find All in the tabs: (tab, position, length), to select them without searching
+_TAB_MATCH_ROLE = Qt.ItemDataRole.UserRole + 1
+
+
+class ProjectSearchResultsWidget(QDockWidget):
+    """Dock listing the matches of a search in the entire project, filled while the search runs.
+    Double-clicking a match opens it."""
+
+    # File path and line (0-based) to open
+    open_location_requested = pyqtSignal(str, int)
+    # Tab, position and length (in bytes) of a match found by Find All
+    open_match_requested = pyqtSignal(QObject, int, int)
+    cancel_requested = pyqtSignal()
+    undo_replace_requested = pyqtSignal()
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+
+        self.setWindowTitle("Search Results")
+        self.setObjectName("ProjectSearchResultsWidget")
+
+        self._text_to_find = ""
+        self._game_path = Path()
+        self._match_count = 0
+        self._file_count = 0
+        self._truncated = False
+
+        self._status_label = QLabel()
+        self._cancel_button = QPushButton("Cancel")
+        self._cancel_button.setEnabled(False)
+        self._cancel_button.pressed.connect(self.cancel_requested.emit)
+        self._undo_replace_button = QPushButton("Undo Replace")
+        self._undo_replace_button.setEnabled(False)
+        self._undo_replace_button.pressed.connect(self.undo_replace_requested.emit)
+
+        self._list_widget = QListWidget()
+        self._list_widget.setUniformItemSizes(True)
+        self._list_widget.itemActivated.connect(self._handle_item_activated)
+
+        status_layout = QHBoxLayout()
+        status_layout.addWidget(self._status_label, 1)
+        status_layout.addWidget(self._cancel_button)
+        status_layout.addWidget(self._undo_replace_button)
+
+        main_layout = QVBoxLayout()
+        main_layout.setContentsMargins(0, 0, 0, 0)
+        main_layout.addLayout(status_layout)
+        main_layout.addWidget(self._list_widget)
+
+        main_widget = QWidget()
+        main_widget.setLayout(main_layout)
+        self.setWidget(main_widget)
+
+    def start_search(self, text_to_find: str, game_path: Path):
+        """Clears the previous results, and shows the dock.
+        :param text_to_find: The searched text.
+        :param game_path: Folder the file paths are shown relative to."""
+        self._text_to_find = text_to_find
+        self._game_path = game_path
+        self._match_count = 0
+        self._file_count = 0
+        self._truncated = False
+
+        self._list_widget.clear()
+        self._cancel_button.setEnabled(True)
+        self.setWindowTitle("Search Results - {}".format(text_to_find))
+        self._status_label.setText("Listing the files...")
+
+        self.show()
+        self.raise_()
+
+    def set_file_count(self, file_count: int):
+        self._file_count = file_count
+        self.set_progress(0, file_count)
+
+    def set_progress(self, files_searched: int, file_count: int):
+        self._status_label.setText("Searching... {}/{} files, {} matches".format(files_searched, file_count,
+                                                                                  self._match_count))
+
+    def add_matches(self, matches: list[SearchMatch]):
+        """Adds matches at the end of the list.
+        :return: False if too many matches were found, and the search should be stopped."""
+        if self._truncated:
+            return False
+
+        room = _MAX_SHOWN_MATCHES - self._match_count
+        if len(matches) > room:
+            matches = matches[:room]
+            self._truncated = True
+
+        # Adding many items at once with updates disabled keeps the list from relaying itself out for each of them
+        self._list_widget.setUpdatesEnabled(False)
+        for match in matches:
+            item = QListWidgetItem("{}:{}:{}  {}".format(self._get_shown_path(match.file_path), match.line + 1,
+                                                         match.column + 1, match.preview))
+            item.setData(Qt.ItemDataRole.UserRole, (match.file_path, match.line))
+            self._list_widget.addItem(item)
+        self._list_widget.setUpdatesEnabled(True)
+
+        self._match_count += len(matches)
+        return not self._truncated
+
+    def finish_search(self, cancelled: bool):
+        self._cancel_button.setEnabled(False)
+
+        if self._truncated:
+            status = "Stopped after {} matches".format(self._match_count)
+        elif cancelled:
+            status = "Search cancelled, {} matches".format(self._match_count)
+        else:
+            status = "{} matches in {} files".format(self._match_count, self._file_count)
+        self._status_label.setText(status)
+        self.setWindowTitle("Search Results - {} ({})".format(self._text_to_find, self._match_count))
+
+    def show_find_all_results(self, text_to_find: str, results: list[tuple[QObject, list[SearchMatch]]],
+                              game_path: Path):
+        """Lists the matches Find All found in the tabs, and shows the dock.
+        :param text_to_find: The searched text.
+        :param results: Each tab with matches, and its matches.
+        :param game_path: Folder the file paths are shown relative to."""
+        self._text_to_find = text_to_find
+        self._game_path = game_path
+        self._list_widget.clear()
+        self._cancel_button.setEnabled(False)
+
+        match_count = 0
+
+        self._list_widget.setUpdatesEnabled(False)
+        for tab, matches in results:
+            shown_path = self._get_shown_path(tab.file_path) if tab.file_path != "" else tab.file_name
+            for match in matches:
+                item = QListWidgetItem("{}:{}:{}  {}".format(shown_path, match.line + 1, match.column + 1,
+                                                             match.preview))
+                item.setData(_TAB_MATCH_ROLE, (tab, match.position, match.length))
+                self._list_widget.addItem(item)
+            match_count += len(matches)
+        self._list_widget.setUpdatesEnabled(True)
+
+        self._status_label.setText("{} matches in {} files".format(match_count, len(results)))
+        self.setWindowTitle("Search Results - {} ({})".format(text_to_find, match_count))
+        self.show()
+        self.raise_()
+
+    def show_replace_result(self, journal: ReplaceJournal, game_path: Path):
+        """Lists the files a project-wide replace changed, and allows undoing it.
+        :param journal: Journal of the replace.
+        :param game_path: Folder the file paths are shown relative to."""
+        self._game_path = game_path
+        self._list_widget.clear()
+        self.setWindowTitle("Search Results - {} → {}".format(journal.text_to_find, journal.text_to_replace))
+
+        status = "Replaced {} matches in {} files".format(journal.get_replacement_count(), len(journal.entries))
+        if len(journal.failed_file_paths) > 0:
+            status += ", {} files couldn't be changed".format(len(journal.failed_file_paths))
+        if len(journal.changed_file_paths) > 0:
+            status += ", {} files were changed since the preview and were left as they are".format(
+                len(journal.changed_file_paths))
+        self._status_label.setText(status)
+
+        for entry in journal.entries:
+            item = QListWidgetItem("{}  ({} replaced)".format(self._get_shown_path(entry.file_path),
+                                                              entry.replacement_count))
+            item.setData(Qt.ItemDataRole.UserRole, (entry.file_path, 0))
+            self._list_widget.addItem(item)
+        for file_path in journal.failed_file_paths:
+            item = QListWidgetItem("{}  (couldn't be changed)".format(self._get_shown_path(file_path)))
+            item.setData(Qt.ItemDataRole.UserRole, (file_path, 0))
+            self._list_widget.addItem(item)
+        for file_path in journal.changed_file_paths:
+            item = QListWidgetItem("{}  (changed since the preview)".format(self._get_shown_path(file_path)))
+            item.setData(Qt.ItemDataRole.UserRole, (file_path, 0))
+            self._list_widget.addItem(item)
+
+        self._undo_replace_button.setEnabled(True)
+        self.show()
+        self.raise_()
+
+    def show_undo_result(self, restored_file_paths: list[str], skipped_file_paths: list[str]):
+        """Lists the files a project-wide replace was undone in, and the ones that changed since."""
+        self._list_widget.clear()
+        self._undo_replace_button.setEnabled(False)
+
+        status = "Undid the replace in {} files".format(len(restored_file_paths))
+        if len(skipped_file_paths) > 0:
+            status += ", {} files were changed since and were left as they are".format(len(skipped_file_paths))
+        self._status_label.setText(status)
+
+        for file_path in skipped_file_paths:
+            item = QListWidgetItem("{}  (changed since the replace)".format(self._get_shown_path(file_path)))
+            item.setData(Qt.ItemDataRole.UserRole, (file_path, 0))
+            self._list_widget.addItem(item)
+
+    def set_undo_replace_enabled(self, enabled: bool):
+        self._undo_replace_button.setEnabled(enabled)
+
+    def _get_shown_path(self, file_path: str) -> str:
+        try:
+            return os.path.relpath(file_path, self._game_path)
+        except ValueError:
+            # On another drive
+            return file_path
+
+    def _handle_item_activated(self, item: QListWidgetItem):
+        tab_match = item.data(_TAB_MATCH_ROLE)
+        if tab_match is not None:
+            self.open_match_requested.emit(*tab_match)
+            return
+
+        file_path, line = item.data(Qt.ItemDataRole.UserRole)
+        self.open_location_requested.emit(file_path, line)
@@ -62,6 +62,9 @@ class SettingsDialog(QDialog):
         self.highlight_matching_text_checkbox = QCheckBox("Highlight other occurrences of the selected text")
         self.highlight_matching_text_checkbox.setChecked(IDESettings.get_highlight_matching_text())
 
+        self.background_styling_checkbox = QCheckBox("Color scripts in the background (for very big scripts)")
+        self.background_styling_checkbox.setChecked(IDESettings.get_background_styling())
+
         self.highlight_style_combobox = QComboBox()
         self.highlight_style_combobox.addItems(["Hollow", "Filled"])
         self.highlight_style_combobox.setCurrentIndex(IDESettings.get_highlight_fill_rect())
@@ -129,6 +132,7 @@ class SettingsDialog(QDialog):
         editor_group_layout.addLayout(editor_theme_selection_layout)
         editor_group_layout.addWidget(self.highlight_matching_text_checkbox)
         editor_group_layout.addLayout(highlight_style_layout)
+        editor_group_layout.addWidget(self.background_styling_checkbox)
         editor_group_box.setLayout(editor_group_layout)
 
         # Image viewer Options
@@ -228,6 +232,7 @@ class SettingsDialog(QDialog):
         self.autocompletion_threshold_spinbox.setValue(IDESettings.get_autocompletion_trigger_threshold())
         self.highlight_matching_text_checkbox.setChecked(IDESettings.get_highlight_matching_text())
         self.highlight_style_combobox.setCurrentIndex(IDESettings.get_highlight_fill_rect())
+        self.background_styling_checkbox.setChecked(IDESettings.get_background_styling())
         self.zoom_style_combobox.setCurrentIndex(IDESettings.get_image_viewer_zoom_style())
 
 
@@ -244,6 +249,7 @@ class SettingsDialog(QDialog):
         IDESettings.set_autocompletion_trigger_threshold(self.autocompletion_threshold_spinbox.value())
         IDESettings.set_hightlight_matching_text(self.highlight_matching_text_checkbox.isChecked())
         IDESettings.set_highlight_fill_rect(self.highlight_style_combobox.currentIndex())
+        IDESettings.set_background_styling(self.background_styling_checkbox.isChecked())
         IDESettings.set_image_viewer_zoom_style(self.zoom_style_combobox.currentIndex())
         self.settings_changed.emit()
 
@@ -0,0 +1,66 @@
+import os
+from pathlib import Path
+
+from PyQt6.QtWidgets import QDockWidget, QListWidget, QListWidgetItem
+from PyQt6.QtCore import Qt, pyqtSignal
+
+from data.PyWrightSymbolIndex import Symbol, SYMBOL_LABEL, SYMBOL_MACRO, SYMBOL_FLAG_SET, SYMBOL_FLAG_CHECK, \
+    SYMBOL_VARIABLE_SET, SYMBOL_SCRIPT_REFERENCE, SYMBOL_GOTO, SYMBOL_MACRO_CALL, SYMBOL_SCRIPT_FILE
+
+# How each kind of symbol is described in the list
+_SYMBOL_KIND_DESCRIPTIONS = {
+    SYMBOL_LABEL: "label definition",
+    SYMBOL_MACRO: "macro definition",
+    SYMBOL_FLAG_SET: "setflag",
+    SYMBOL_FLAG_CHECK: "flag",
+    SYMBOL_VARIABLE_SET: "set",
+    SYMBOL_SCRIPT_REFERENCE: "script",
+    SYMBOL_GOTO: "goto",
+    SYMBOL_MACRO_CALL: "macro call",
+    SYMBOL_SCRIPT_FILE: "script file",
+}
+
+
+class SymbolReferencesWidget(QDockWidget):
+    """Dock listing everywhere a label, macro or script is used. Double-clicking an entry opens it."""
+
+    # File path and line (0-based) to open
+    open_location_requested = pyqtSignal(str, int)
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+
+        self.setWindowTitle("References")
+        self.setObjectName("SymbolReferencesWidget")
+
+        self._list_widget = QListWidget()
+        self._list_widget.itemActivated.connect(self._handle_item_activated)
+
+        self.setWidget(self._list_widget)
+
+    def show_references(self, name: str, symbols: list[Symbol], game_path: Path):
+        """Fills the list with the given symbols, and shows the dock.
+        :param name: The name the references are for.
+        :param symbols: The references.
+        :param game_path: Folder the file paths are shown relative to."""
+        self._list_widget.clear()
+        self.setWindowTitle("References - {} ({})".format(name, len(symbols)))
+
+        for symbol in symbols:
+            try:
+                shown_path = os.path.relpath(symbol.file_path, game_path)
+            except ValueError:
+                # On another drive
+                shown_path = symbol.file_path
+
+            item = QListWidgetItem("{}:{}  [{}]".format(shown_path, symbol.line + 1,
+                                                        _SYMBOL_KIND_DESCRIPTIONS.get(symbol.kind, symbol.kind)))
+            item.setData(Qt.ItemDataRole.UserRole, (symbol.file_path, symbol.line))
+            self._list_widget.addItem(item)
+
+        self.show()
+        self.raise_()
+
+    def _handle_item_activated(self, item: QListWidgetItem):
+        file_path, line = item.data(Qt.ItemDataRole.UserRole)
+        self.open_location_requested.emit(file_path, line)
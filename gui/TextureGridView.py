@@ -0,0 +1,192 @@
+# Grid of the textures of an art folder, used by the texture browser and the icon picker.
+# Files come from the asset catalog and are handed to the view in batches, so a folder with thousands of images
+# doesn't lay out thousands of items at once. Thumbnails are only requested for the rows the view shows,
+# plus a few screens around them, every other row sharing the placeholder of the thumbnail service.
+
+import os
+
+from PyQt6.QtCore import QAbstractListModel, QModelIndex, QObject, QSize, QTimer, Qt
+from PyQt6.QtWidgets import QListView
+
+from data.PyWrightAssetCatalog import AssetFile
+from .ThumbnailService import get_thumbnail_service
+
+# Number of rows handed to the view each time it scrolls to the end of the ones it has
+_FETCH_BATCH_SIZE = 256
+
+# Number of rows before and after the visible ones whose thumbnails are requested too, so scrolling doesn't show placeholders
+_PREFETCH_ROWS = 48
+
+
+class TextureListModel(QAbstractListModel):
+    """Images of a single folder of the asset catalog, with their thumbnails as icons."""
+
+    def __init__(self, thumbnail_size: QSize, parent: QObject | None = None):
+        super().__init__(parent)
+        self._thumbnail_size = thumbnail_size
+        self._thumbnail_service = get_thumbnail_service()
+        self._thumbnail_service.thumbnail_ready.connect(self._handle_thumbnail_ready)
+
+        self._folder_path = ""
+        self._files: list[AssetFile] = []
+        # Paths of the files, and the rows of each path
+        self._file_paths: list[str] = []
+        self._rows_by_path: dict[str, int] = {}
+        # Number of files handed to the view so far
+        self._fetched_count = 0
+
+    def set_files(self, folder_path: str, files: list[AssetFile]):
+        """Replaces the shown images.
+        :param folder_path: Path of the folder the files are in.
+        :param files: The files, in the order they are shown."""
+        # Thumbnails of the previous files that haven't started being made aren't needed anymore
+        self._thumbnail_service.cancel_pending(self)
+
+        self.beginResetModel()
+        self._folder_path = str(folder_path)
+        self._files = files
+        self._file_paths = [os.path.join(self._folder_path, asset_file.name) for asset_file in files]
+        self._rows_by_path = {file_path: row for row, file_path in enumerate(self._file_paths)}
+        self._fetched_count = min(len(files), _FETCH_BATCH_SIZE)
+        self.endResetModel()
+
+    def get_folder_path(self) -> str:
+        return self._folder_path
+
+    def get_file_path(self, index: QModelIndex) -> str:
+        return self._file_paths[index.row()]
+
+    def get_file_name(self, index: QModelIndex) -> str:
+        """Returns the name of the file of a row, with its extension."""
+        return self._files[index.row()].name
+
+    def rowCount(self, parent: QModelIndex = QModelIndex()) -> int:
+        return 0 if parent.isValid() else self._fetched_count
+
+    def canFetchMore(self, parent: QModelIndex) -> bool:
+        return not parent.isValid() and self._fetched_count < len(self._files)
+
+    def fetchMore(self, parent: QModelIndex):
+        if parent.isValid():
+            return
+
+        count = min(_FETCH_BATCH_SIZE, len(self._files) - self._fetched_count)
+        if count <= 0:
+            return
+
+        self.beginInsertRows(QModelIndex(), self._fetched_count, self._fetched_count + count - 1)
+        self._fetched_count += count
+        self.endInsertRows()
+
+    def data(self, index: QModelIndex, role: int = Qt.ItemDataRole.DisplayRole):
+        if not index.isValid() or index.row() >= self._fetched_count:
+            return None
+
+        asset_file = self._files[index.row()]
+
+        if role == Qt.ItemDataRole.DisplayRole:
+            return asset_file.name
+        if role == Qt.ItemDataRole.DecorationRole:
+            # Thumbnails are only requested by set_visible_rows(), painting a row never starts decoding an image
+            pixmap = self._thumbnail_service.find_thumbnail(self._file_paths[index.row()], asset_file.mtime_ns,
+                                                            asset_file.size, self._thumbnail_size)
+            return pixmap if pixmap is not None else self._thumbnail_service.get_placeholder(self._thumbnail_size)
+        if role == Qt.ItemDataRole.ToolTipRole:
+            return asset_file.name
+
+        return None
+
+    def set_visible_rows(self, first_row: int, last_row: int):
+        """Requests the thumbnails of the rows shown by the view, and of the ones around them, the closest first."""
+        if self._fetched_count == 0:
+            return
+
+        first_row = max(0, first_row)
+        last_row = min(self._fetched_count - 1, last_row)
+        prefetch_first_row = max(0, first_row - _PREFETCH_ROWS)
+        prefetch_last_row = min(self._fetched_count - 1, last_row + _PREFETCH_ROWS)
+
+        # The thumbnail service makes the latest requests first, so the visible rows are requested last
+        rows = list(range(prefetch_last_row, last_row, -1)) + list(range(prefetch_first_row, first_row))
+        rows += range(last_row, first_row - 1, -1)
+        for row in rows:
+            asset_file = self._files[row]
+            self._thumbnail_service.request_thumbnail(self._file_paths[row], asset_file.mtime_ns, asset_file.size,
+                                                      self._thumbnail_size, self)
+
+    def _handle_thumbnail_ready(self, file_path: str):
+        row = self._rows_by_path.get(file_path)
+        if row is None or row >= self._fetched_count:
+            return
+
+        index = self.index(row)
+        self.dataChanged.emit(index, index, [Qt.ItemDataRole.DecorationRole])
+
+
+class TextureGridView(QListView):
+    """Icon mode list view telling its TextureListModel which rows it shows whenever it scrolls or is resized."""
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.setViewMode(QListView.ViewMode.IconMode)
+        self.setResizeMode(QListView.ResizeMode.Adjust)
+        self.setUniformItemSizes(True)
+        self.setSpacing(5)
+        # Lay the items out a batch at a time, so showing a big folder doesn't freeze the IDE
+        self.setLayoutMode(QListView.LayoutMode.Batched)
+        self.setBatchSize(_FETCH_BATCH_SIZE)
+
+        # Several scroll or resize events in a row only update the visible rows once
+        self._visible_rows_timer = QTimer(self)
+        self._visible_rows_timer.setSingleShot(True)
+        self._visible_rows_timer.setInterval(0)
+        self._visible_rows_timer.timeout.connect(self._update_visible_rows)
+
+    def setModel(self, model):
+        previous_model = self.model()
+        if previous_model is not None:
+            previous_model.modelReset.disconnect(self._visible_rows_timer.start)
+            previous_model.rowsInserted.disconnect(self._visible_rows_timer.start)
+
+        super().setModel(model)
+
+        if model is not None:
+            model.modelReset.connect(self._visible_rows_timer.start)
+            model.rowsInserted.connect(self._visible_rows_timer.start)
+            self._visible_rows_timer.start()
+
+    def scrollContentsBy(self, dx: int, dy: int):
+        super().scrollContentsBy(dx, dy)
+        self._visible_rows_timer.start()
+
+    def resizeEvent(self, event):
+        super().resizeEvent(event)
+        self._visible_rows_timer.start()
+
+    def _update_visible_rows(self):
+        model = self.model()
+        if not isinstance(model, TextureListModel):
+            return
+
+        row_count = model.rowCount()
+        if row_count == 0:
+            return
+
+        # Items are all the same size, so the first one tells how the grid is laid out
+        first_rect = self.visualRect(model.index(0))
+        if not first_rect.isValid():
+            return
+
+        column_count = 1
+        while column_count < row_count and self.visualRect(model.index(column_count)).top() == first_rect.top():
+            column_count += 1
+
+        line_height = first_rect.height() + self.spacing()
+        if column_count < row_count:
+            line_height = max(1, self.visualRect(model.index(column_count)).top() - first_rect.top())
+
+        # visualRect() is relative to the viewport, so the first item is above it once the view is scrolled
+        first_line = max(0, -first_rect.top() // line_height)
+        line_count = self.viewport().height() // line_height + 2
+
+        model.set_visible_rows(first_line * column_count, (first_line + line_count) * column_count - 1)
@@ -0,0 +1,187 @@
+# Thumbnails of the images of the art folders, shared by every texture browser and icon picker of the IDE.
+# Images are decoded directly at thumbnail size on a thread pool, a placeholder being shown until they are ready.
+# Thumbnails are kept in memory (the least recently used ones being dropped past a budget)
+# and on disk in the cache folder of the IDE, so an image is decoded again only when it changes.
+
+import hashlib
+import os
+from collections import OrderedDict
+
+from PyQt6.QtCore import QObject, QRunnable, QThreadPool, QSize, Qt, pyqtSignal
+from PyQt6.QtGui import QImage, QImageReader, QPixmap
+
+from data import IDESettings
+
+# Images the thumbnails are made for
+THUMBNAIL_IMAGE_SUFFIXES = (".png", ".jpg", ".jpeg")
+
+# Memory the thumbnails kept in memory can use, the least recently used ones being dropped past it
+_MEMORY_CACHE_MAX_BYTES = 64 * 1024 * 1024
+
+
+def _get_disk_cache_path(key: tuple) -> str:
+    """Returns where the thumbnail of a given path, modification time, file size and thumbnail size is saved."""
+    digest = hashlib.sha1(repr(key).encode("utf-8")).hexdigest()
+    return str(IDESettings.get_cache_folder_path() / "thumbnails" / digest[:2] / "{}.png".format(digest))
+
+
+class _ThumbnailSignals(QObject):
+    finished = pyqtSignal(object, QImage)  # Thumbnail key, thumbnail (null if the image couldn't be read)
+
+
+class _ThumbnailTask(QRunnable):
+
+    def __init__(self, key: tuple):
+        super().__init__()
+        # Kept by the service until it is done, so that it can still be taken back from the thread pool
+        self.setAutoDelete(False)
+        self.signals = _ThumbnailSignals()
+        self._key = key
+
+    def run(self):
+        file_path, _, _, width, height = self._key
+        disk_cache_path = _get_disk_cache_path(self._key)
+
+        image = QImage()
+        if os.path.exists(disk_cache_path):
+            image.load(disk_cache_path)
+
+        if image.isNull():
+            reader = QImageReader(file_path)
+            reader.setAutoTransform(True)
+            # Only decode the pixels needed, instead of the whole image
+            image_size = reader.size()
+            if image_size.isValid() and (image_size.width() > width or image_size.height() > height):
+                reader.setScaledSize(image_size.scaled(QSize(width, height), Qt.AspectRatioMode.KeepAspectRatio))
+            image = reader.read()
+
+            if not image.isNull():
+                self._save_to_disk_cache(image, disk_cache_path)
+
+        self.signals.finished.emit(self._key, image)
+
+    @staticmethod
+    def _save_to_disk_cache(image: QImage, disk_cache_path: str):
+        try:
+            os.makedirs(os.path.dirname(disk_cache_path), exist_ok=True)
+            # Write to a temporary file first, so that the cache never holds half-written thumbnails
+            temporary_path = disk_cache_path + ".tmp"
+            if image.save(temporary_path, "PNG"):
+                os.replace(temporary_path, disk_cache_path)
+        except OSError:
+            pass
+
+
+class ThumbnailService(QObject):
+    """Makes and keeps the thumbnails of images, use get_thumbnail_service() to get the one shared by the whole IDE."""
+
+    # Emitted with the path of an image once one of its thumbnails is ready
+    thumbnail_ready = pyqtSignal(str)
+
+    def __init__(self, parent: QObject | None = None):
+        super().__init__(parent)
+        self._thread_pool = QThreadPool(self)
+
+        # Maps (file path, modification time, file size, width, height) to thumbnails, the most recently used last
+        self._pixmaps: OrderedDict[tuple, QPixmap] = OrderedDict()
+        self._memory_used = 0
+
+        # Tasks of the thumbnails being made, with the consumers that requested them, and images that couldn't be read
+        self._pending_tasks: dict[tuple, _ThumbnailTask] = {}
+        self._pending_owners: dict[tuple, set] = {}
+        self._failed_keys: set[tuple] = set()
+
+        # Maps (width, height) to an empty pixmap, shown until the thumbnails are ready
+        self._placeholders: dict[tuple[int, int], QPixmap] = {}
+
+        # The latest requests are served first, as they are the ones for what is shown right now
+        self._request_priority = 0
+
+    def get_thumbnail(self, file_path: str, modification_time: int, file_size: int, size: QSize) -> QPixmap:
+        """Returns the thumbnail of an image if it is ready, otherwise starts making it and returns a placeholder.
+        thumbnail_ready is emitted once the thumbnail is ready.
+        :param file_path: Path of the image.
+        :param modification_time: Modification time of the image, in any unit, so that a changed image gets a new thumbnail.
+        :param file_size: Size of the image file, for the same reason.
+        :param size: Size the thumbnail must fit in."""
+        pixmap = self.find_thumbnail(file_path, modification_time, file_size, size)
+        if pixmap is not None:
+            return pixmap
+
+        self.request_thumbnail(file_path, modification_time, file_size, size)
+        return self.get_placeholder(size)
+
+    def find_thumbnail(self, file_path: str, modification_time: int, file_size: int, size: QSize) -> QPixmap | None:
+        """Returns the thumbnail of an image if it is ready, without making it otherwise."""
+        key = (file_path, modification_time, file_size, size.width(), size.height())
+
+        pixmap = self._pixmaps.get(key)
+        if pixmap is not None:
+            self._pixmaps.move_to_end(key)
+        return pixmap
+
+    def request_thumbnail(self, file_path: str, modification_time: int, file_size: int, size: QSize,
+                          owner: object = None):
+        """Starts making the thumbnail of an image, unless it is ready or being made already.
+        thumbnail_ready is emitted once the thumbnail is ready.
+        :param owner: Consumer requesting the thumbnail, so that cancel_pending() only drops its own requests."""
+        key = (file_path, modification_time, file_size, size.width(), size.height())
+
+        if key in self._pixmaps or key in self._failed_keys:
+            return
+        if key in self._pending_tasks:
+            self._pending_owners[key].add(owner)
+            return
+
+        self._request_priority += 1
+        task = _ThumbnailTask(key)
+        task.signals.finished.connect(self._handle_thumbnail_finished)
+        self._pending_tasks[key] = task
+        self._pending_owners[key] = {owner}
+        self._thread_pool.start(task, self._request_priority)
+
+    def get_placeholder(self, size: QSize) -> QPixmap:
+        placeholder = self._placeholders.get((size.width(), size.height()))
+        if placeholder is None:
+            placeholder = QPixmap(size)
+            placeholder.fill(Qt.GlobalColor.transparent)
+            self._placeholders[(size.width(), size.height())] = placeholder
+        return placeholder
+
+    def cancel_pending(self, owner: object):
+        """Drops the thumbnails a consumer requested that haven't started being made, for instance when it shows
+        another folder. Thumbnails other consumers requested too are still made."""
+        for key, owners in list(self._pending_owners.items()):
+            owners.discard(owner)
+            if len(owners) == 0 and self._thread_pool.tryTake(self._pending_tasks[key]):
+                del self._pending_tasks[key]
+                del self._pending_owners[key]
+
+    def _handle_thumbnail_finished(self, key: tuple, image: QImage):
+        self._pending_tasks.pop(key, None)
+        self._pending_owners.pop(key, None)
+
+        if image.isNull():
+            self._failed_keys.add(key)
+            return
+
+        pixmap = QPixmap.fromImage(image)
+        self._pixmaps[key] = pixmap
+        self._memory_used += pixmap.width() * pixmap.height() * 4
+        while self._memory_used > _MEMORY_CACHE_MAX_BYTES and len(self._pixmaps) > 1:
+            _, dropped_pixmap = self._pixmaps.popitem(last=False)
+            self._memory_used -= dropped_pixmap.width() * dropped_pixmap.height() * 4
+
+        self.thumbnail_ready.emit(key[0])
+
+
+_thumbnail_service: ThumbnailService | None = None
+
+
+def get_thumbnail_service() -> ThumbnailService:
+    """Returns the thumbnail service shared by the whole IDE, creating it the first time."""
+    global _thumbnail_service
+    if _thumbnail_service is None:
+        _thumbnail_service = ThumbnailService()
+    return _thumbnail_service
+